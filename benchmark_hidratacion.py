@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+⚡ MICROBENCHMARK: from_dict fila por fila vs hidratación en lote
+================================================================
+
+Genera filas sintéticas con la forma que devuelve Supabase (incluyendo
+objetos embebidos) y compara:
+
+    [Model.from_dict(f) for f in filas]   vs   hidratar_*(filas)
+
+Antes de medir verifica la PARIDAD: ambos caminos deben producir los
+mismos modelos para filas de muestra y para casos borde (NULL en la BD,
+claves ausentes, embebidos vacíos, filas que from_dict rechaza).
+No necesita conexión a la base de datos.
+
+Uso:
+    python benchmark_hidratacion.py                 # 5000 filas, 5 repeticiones
+    python benchmark_hidratacion.py --filas 20000 --repeticiones 3
+    python benchmark_hidratacion.py --solo-paridad  # sin medir tiempos
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from dental_system.models import (
+    PacienteModel, ConsultaModel, PagoModel,
+    hidratar_pacientes, hidratar_consultas, hidratar_pagos
+)
+
+NOMBRES = ["José", "María", "Luis", "Ana", "Carlos", "Lucía", "Pedro", "Carmen"]
+APELLIDOS = ["González", "Pérez", "Rodríguez", "Hernández", "García", "Martínez"]
+
+
+def filas_pacientes(n: int):
+    inicio = date(1940, 1, 1)
+    return [{
+        "id": f"pac-{i}",
+        "numero_historia": f"HC{i:06d}",
+        "primer_nombre": random.choice(NOMBRES),
+        "segundo_nombre": random.choice(NOMBRES + [None]),
+        "primer_apellido": random.choice(APELLIDOS),
+        "segundo_apellido": random.choice(APELLIDOS + [None]),
+        "tipo_documento": "CI",
+        "numero_documento": str(10_000_000 + i),
+        "fecha_nacimiento": (inicio + timedelta(days=random.randint(0, 30_000))).isoformat(),
+        "genero": random.choice(["masculino", "femenino"]),
+        "celular_1": f"0414{i:07d}",
+        "celular_2": None,
+        "email": f"paciente{i}@correo.com",
+        "direccion": "Av. Principal",
+        "ciudad": "Caracas",
+        "alergias": ["Penicilina"] if i % 7 == 0 else [],
+        "medicamentos_actuales": [],
+        "condiciones_medicas": ["Hipertensión"] if i % 11 == 0 else [],
+        "contacto_emergencia": {"nombre": "Contacto", "telefono": "0412", "relacion": "madre"},
+        "fecha_registro": "2025-10-01T08:00:00",
+        "fecha_actualizacion": "2025-10-01T08:00:00",
+        "activo": True,
+    } for i in range(n)]
+
+
+def filas_consultas(n: int):
+    return [{
+        "id": f"con-{i}",
+        "numero_consulta": f"20251019-{i:03d}",
+        "paciente_id": f"pac-{i}",
+        "primer_odontologo_id": f"per-{i % 5}",
+        "fecha_llegada": "2025-10-19T08:30:00",
+        "orden_cola_odontologo": i % 20 + 1,
+        "estado": "en_espera",
+        "tipo_consulta": "general",
+        "motivo_consulta": "Control",
+        "observaciones": "Sin observaciones",
+        "fecha_creacion": "2025-10-19T08:30:00",
+        "fecha_actualizacion": "2025-10-19T08:30:00",
+        "paciente": {
+            "primer_nombre": random.choice(NOMBRES), "segundo_nombre": "",
+            "primer_apellido": random.choice(APELLIDOS), "segundo_apellido": "",
+            "numero_documento": str(10_000_000 + i), "celular": "04140000000"
+        },
+        "personal": {
+            "primer_nombre": "Ana", "segundo_nombre": "", "primer_apellido": "Díaz",
+            "segundo_apellido": "", "especialidad": "Ortodoncia"
+        },
+    } for i in range(n)]
+
+
+def filas_pagos(n: int):
+    return [{
+        "id": f"pag-{i}",
+        "numero_recibo": f"REC20251019{i:04d}",
+        "consulta_id": f"con-{i}",
+        "paciente_id": f"pac-{i}",
+        "fecha_pago": "2025-10-19T10:00:00",
+        "monto_total_usd": 40.0, "monto_pagado_usd": 20.0, "saldo_pendiente_usd": 20.0,
+        "monto_total_bs": 1460.0, "monto_pagado_bs": 730.0, "saldo_pendiente_bs": 730.0,
+        "tasa_cambio_bs_usd": 36.5,
+        "metodos_pago": [
+            {"tipo": "efectivo", "moneda": "USD", "monto": 20.0, "referencia": "N/A"},
+            {"tipo": "transferencia", "moneda": "BS", "monto": 730.0, "referencia": "0001"},
+        ],
+        "concepto": "Consulta",
+        "estado_pago": "pendiente",
+        "descuento_aplicado": 0.0,
+        "motivo_descuento": "",
+        "procesado_por": "usr-1",
+        "paciente": {"primer_nombre": "José", "primer_apellido": "Pérez", "numero_documento": "12345678"},
+    } for i in range(n)]
+
+
+# ==========================================
+# 🧪 CASOS BORDE (NULL / claves ausentes)
+# ==========================================
+
+def bordes_pacientes():
+    return [
+        {"id": "pac-null", "activo": None, "segundo_nombre": None, "fecha_nacimiento": None,
+         "tipo_documento": None, "numero_documento": None, "fecha_registro": None,
+         "alergias": None, "contacto_emergencia": None},
+        {"id": "pac-min", "primer_nombre": "Ana"},
+        {"id": "pac-inactivo", "activo": False, "fecha_nacimiento": "1990-02-30"},
+        {"id": "pac-hora", "fecha_nacimiento": "1990-05-04T00:00:00", "genero": ""},
+        {"id": "pac-corta", "fecha_nacimiento": "1990-5-4", "celular_1": 4141234567},
+    ]
+
+
+def bordes_consultas():
+    return [
+        {"id": "con-null", "estado": None, "primer_odontologo_id": None, "odontologo_id": None,
+         "fecha_llegada": None, "motivo_consulta": None, "paciente": None, "personal": None,
+         "paciente_nombre": None},
+        {"id": "con-legado", "odontologo_id": "per-1", "fecha_programada": "2025-10-19T09:00:00",
+         "paciente_nombre_completo": "José Pérez", "paciente_telefono": "0414"},
+        {"id": "con-embebidos", "paciente": {"primer_nombre": None, "primer_apellido": "Díaz", "telefono": "0212"},
+         "personal": {"primer_nombre": "Luis", "especialidad": None}},
+        {},
+    ]
+
+
+def bordes_pagos():
+    return [
+        {"id": "pag-null", "paciente": None, "consulta_id": None, "metodos_pago": None,
+         "motivo_descuento": None, "estado_pago": None, "concepto": None},
+        {"id": "pag-legado", "paciente": {}, "monto_total": 10, "monto_pagado": 5, "saldo_pendiente": 5,
+         "metodos_pago": [{"tipo": "efectivo", "monto": 5}]},
+        {"id": "pag-sin-paciente"},                          # from_dict falla: fila omitida
+        {"id": "pag-monto-null", "paciente": None, "monto_total_usd": None},  # float(None): omitida
+    ]
+
+
+def por_fila(modelo, filas):
+    """Camino de referencia: from_dict fila por fila, omitiendo filas inválidas"""
+    modelos = []
+    for fila in filas:
+        try:
+            modelos.append(modelo.from_dict(dict(fila)))
+        except Exception:
+            pass
+    return modelos
+
+
+def verificar_paridad(nombre: str, modelo, filas, hidratar):
+    """Ambos caminos deben producir exactamente los mismos modelos"""
+    esperados = [m.dict() for m in por_fila(modelo, filas)]
+    obtenidos = [m.dict() for m in hidratar([dict(f) for f in filas])]
+    assert len(esperados) == len(obtenidos), f"{nombre}: {len(esperados)} vs {len(obtenidos)} modelos"
+    for esperado, obtenido in zip(esperados, obtenidos):
+        distintos = {k: (esperado[k], obtenido.get(k)) for k in esperado if esperado[k] != obtenido.get(k)}
+        assert not distintos, f"{nombre} {esperado.get('id')}: campos distintos {distintos}"
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor tiempo (segundos) de `repeticiones` ejecuciones"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de hidratación de modelos")
+    parser.add_argument("--filas", type=int, default=5000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--solo-paridad", action="store_true", help="Verificar paridad sin medir tiempos")
+    args = parser.parse_args()
+
+    random.seed(42)
+    casos = [
+        ("PacienteModel", PacienteModel, filas_pacientes(args.filas), bordes_pacientes(), hidratar_pacientes),
+        ("ConsultaModel", ConsultaModel, filas_consultas(args.filas), bordes_consultas(), hidratar_consultas),
+        ("PagoModel", PagoModel, filas_pagos(args.filas), bordes_pagos(), hidratar_pagos),
+    ]
+
+    for nombre, modelo, filas, bordes, hidratar in casos:
+        verificar_paridad(nombre, modelo, filas[:200], hidratar)
+        verificar_paridad(f"{nombre} (bordes)", modelo, filas[:20] + bordes, hidratar)
+        for borde in bordes:
+            verificar_paridad(f"{nombre} (borde)", modelo, [borde], hidratar)
+    print("✅ Paridad verificada: hidratación en lote == from_dict (muestra y casos borde)")
+
+    if args.solo_paridad:
+        return
+
+    print(f"\n⚡ Hidratación de {args.filas} filas (mejor de {args.repeticiones})\n")
+    print(f"{'Modelo':<16}{'from_dict':>12}{'lote':>12}{'mejora':>10}")
+
+    for nombre, modelo, filas, _, hidratar in casos:
+        t_fila = medir(lambda: [modelo.from_dict(f) for f in filas], args.repeticiones)
+        t_lote = medir(lambda: hidratar(filas), args.repeticiones)
+        print(f"{nombre:<16}{t_fila * 1000:>10.1f}ms{t_lote * 1000:>10.1f}ms{t_fila / t_lote:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+🗄️ COMPACTACIÓN DEL HISTORIAL DE CONDICIONES DENTALES
+=====================================================
+
+Mueve las filas inactivas de `diente` más viejas que el horizonte a
+`diente_historial` (migración 20261019_archivo_historial_diente.sql) y
+reporta filas movidas y tamaño de índices/tabla antes y después.
+
+Pensado para ejecutarse periódicamente (cron / tarea programada):
+
+    python compactar_historial_diente.py                       # 180 días, 1 lote
+    python compactar_historial_diente.py --horizonte-dias 90 --todo
+
+Los tamaños bajan de verdad después del siguiente VACUUM de la tabla
+(autovacuum o `VACUUM (ANALYZE) public.diente;` desde el SQL Editor).
+"""
+
+import argparse
+import asyncio
+
+from dental_system.constants import HORIZONTE_HISTORIAL_DIENTE_DIAS, LOTE_COMPACTACION_DIENTE
+from dental_system.services.odontologia_service import odontologia_service
+
+
+def megabytes(valor) -> str:
+    return f"{(valor or 0) / (1024 * 1024):.2f} MB"
+
+
+async def compactar(horizonte_dias: int, lote: int, todo: bool):
+    total_movidas = 0
+    primero = None
+    ultimo = None
+
+    while True:
+        resultado = await odontologia_service.compactar_historial_dientes(horizonte_dias, lote)
+        primero = primero or resultado
+        ultimo = resultado
+        total_movidas += resultado.get("movidas", 0)
+
+        print(f"  Lote: {resultado.get('movidas', 0)} filas movidas, {resultado.get('pendientes', 0)} pendientes")
+        if not todo or not resultado.get("movidas") or not resultado.get("pendientes"):
+            break
+
+    print(f"\n🗄️ Historial anterior a {ultimo.get('limite')} ({horizonte_dias} días)")
+    print(f"   Filas movidas a diente_historial: {total_movidas}")
+    print(f"   Pendientes:                       {ultimo.get('pendientes', 0)}")
+    print(f"   Índices de diente: {megabytes(primero.get('indices_bytes_antes'))} → {megabytes(ultimo.get('indices_bytes_despues'))}")
+    print(f"   Tabla diente:      {megabytes(primero.get('tabla_bytes_antes'))} → {megabytes(ultimo.get('tabla_bytes_despues'))}")
+    if total_movidas:
+        print("   (el espacio se libera en el próximo VACUUM de public.diente)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivar historial viejo de condiciones dentales")
+    parser.add_argument("--horizonte-dias", type=int, default=HORIZONTE_HISTORIAL_DIENTE_DIAS)
+    parser.add_argument("--lote", type=int, default=LOTE_COMPACTACION_DIENTE)
+    parser.add_argument("--todo", action="store_true", help="Repetir lotes hasta no dejar pendientes")
+    args = parser.parse_args()
+
+    asyncio.run(compactar(args.horizonte_dias, args.lote, args.todo))
+
+
+if __name__ == "__main__":
+    main()
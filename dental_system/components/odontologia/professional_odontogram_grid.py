@@ -21,6 +21,7 @@ from dental_system.components.odontologia.simple_tooth import (
     get_tooth_color,
 )
 from dental_system.styles.medical_design_system import DARK_COLORS
+from dental_system.utils.odontograma_compacto import indice_diente
 
 
 # Organización de dientes por cuadrantes FDI
@@ -88,7 +89,7 @@ def odontogram_legend() -> rx.Component:
 
 def professional_odontogram_grid(
     selected_tooth: int = None,
-    teeth_data: Dict[int, Dict[str, Any]] = {},
+    teeth_data: List[Dict[str, Any]] = [],
     on_tooth_click = None,
 ) -> rx.Component:
     """
@@ -96,11 +97,12 @@ def professional_odontogram_grid(
 
     Args:
         selected_tooth: Número del diente seleccionado (resaltado)
-        teeth_data: Diccionario con data de cada diente
-            Ejemplo: {
-                12: {"status": "caries", "has_conditions": True},
-                16: {"status": "endodoncia", "has_conditions": False},
-            }
+        teeth_data: Lista fija de 32 dientes en orden FDI (ver get_teeth_data)
+            Ejemplo: [
+                {"number": 11, "status": "sano", "has_conditions": False},
+                {"number": 12, "status": "caries", "has_conditions": True},
+                ...
+            ]
         on_tooth_click: Callback(tooth_number) al hacer click en un diente
 
     Returns:
@@ -119,8 +121,8 @@ def professional_odontogram_grid(
                 tooth_with_tooltip(
                     tooth_number=tooth_num,
                     tooth_name=TOOTH_NAMES.get(tooth_num, f"Diente {tooth_num}"),
-                    status=teeth_data.get(tooth_num, {}).get("status", "sano"),
-                    has_conditions=teeth_data.get(tooth_num, {}).get("has_conditions", False),
+                    status=teeth_data[indice_diente(tooth_num)]["status"],
+                    has_conditions=teeth_data[indice_diente(tooth_num)]["has_conditions"],
                     is_selected=(tooth_num == selected_tooth),
                     on_click=(lambda t=tooth_num: lambda: on_tooth_click(t))() if on_tooth_click else lambda: None,
                 )
@@ -170,6 +170,85 @@ def empty_state(title: str, subtitle: str, icon: str) -> rx.Component:
         padding=SPACING["12"]
     )
 
+def pagination_controls(pagina_actual, total_paginas, on_anterior, on_siguiente) -> rx.Component:
+    """Controles Anterior / Página X de Y / Siguiente (paginación en servidor)"""
+    return rx.cond(
+        total_paginas > 1,
+        rx.hstack(
+            rx.button(
+                "Anterior",
+                on_click=on_anterior,
+                disabled=pagina_actual == 1,
+                size="2",
+                variant="soft"
+            ),
+            rx.text(
+                f"Página {pagina_actual} de {total_paginas}",
+                size="2",
+                style={"color": DARK_THEME["colors"]["text_secondary"]}
+            ),
+            rx.button(
+                "Siguiente",
+                on_click=on_siguiente,
+                disabled=pagina_actual >= total_paginas,
+                size="2",
+                variant="soft"
+            ),
+            width="100%",
+            justify="center",
+            align="center",
+            spacing="4"
+        )
+    )
+
+def sortable_header_cell(titulo: str, columna: str, orden_actual, orden_desc, on_sort) -> rx.Component:
+    """Encabezado que ordena en el servidor al hacer clic"""
+    return rx.table.column_header_cell(
+        rx.hstack(
+            rx.text(titulo),
+            rx.cond(
+                orden_actual == columna,
+                rx.cond(orden_desc, rx.icon("chevron-down", size=14), rx.icon("chevron-up", size=14)),
+                rx.icon("chevrons-up-down", size=14, opacity="0.4")
+            ),
+            spacing="1",
+            align="center"
+        ),
+        on_click=lambda: on_sort(columna),
+        style={**COLUMN_HEADER, "cursor": "pointer"}
+    )
+
+def virtualized_table(header_cells: List[rx.Component], items, render_row, row_height: int = 72, max_height: str = "calc(100vh - 420px)") -> rx.Component:
+    """
+    Tabla con scroll propio y filas virtualizadas por el navegador
+
+    El encabezado queda fijo y cada fila usa content-visibility: auto con su
+    altura estimada: las filas fuera de la vista no se maquetan ni se pintan.
+    Junto con la paginación en servidor, el DOM queda acotado al tamaño de página.
+    """
+    return rx.box(
+        rx.table.root(
+            rx.table.header(
+                rx.table.row(*header_cells),
+                style={"position": "sticky", "top": "0", "z_index": "1"}
+            ),
+            rx.table.body(
+                rx.foreach(items, render_row)
+            ),
+        ),
+        style={
+            **TABLE_STYLE,
+            "max_height": max_height,
+            "overflow_y": "auto",
+            "overflow_x": "auto",
+            # Filas fuera de la vista: sin layout ni paint
+            "& tbody tr": {
+                "content_visibility": "auto",
+                "contain_intrinsic_size": f"auto {row_height}px"
+            }
+        }
+    )
+
 # ==========================================
 # 👥 TABLA DE PACIENTES
 # ==========================================
@@ -225,7 +304,18 @@ def patients_table() -> rx.Component:
             align="center",
             spacing="3"
         ),
-        
+
+        # Búsqueda con más coincidencias de las que se muestran
+        rx.cond(
+            AppState.busqueda_pacientes_truncada,
+            rx.callout(
+                "Se muestran solo las coincidencias más relevantes. Refina tu búsqueda para ver el resto.",
+                icon="info",
+                color_scheme="amber",
+                size="1"
+            )
+        ),
+
         # Tabla
         rx.cond(
             AppState.cargando_operacion_paciente,
@@ -234,29 +324,19 @@ def patients_table() -> rx.Component:
             rx.cond(
                 AppState.pacientes_filtrados_display.length() > 0,
                 
-                # Tabla con datos
-                rx.box(
-                    rx.table.root(
-                        rx.table.header(
-                            rx.table.row(
-                                rx.table.column_header_cell("Paciente", style=COLUMN_HEADER),
-                                rx.table.column_header_cell("Edad", style=COLUMN_HEADER),
-                                rx.table.column_header_cell("Género", style=COLUMN_HEADER),
-                                rx.table.column_header_cell("Documento", style=COLUMN_HEADER),
-                                rx.table.column_header_cell("Contacto", style=COLUMN_HEADER),
-                                rx.table.column_header_cell("Registro", style=COLUMN_HEADER),
-                                rx.table.column_header_cell("Acciones", style=COLUMN_HEADER),
-                            )
-                        ),
-                        
-                        rx.table.body(
-                            rx.foreach(
-                                AppState.pacientes_filtrados_display,
-                                patient_row
-                            )
-                        ),
-                    ),
-                    style=TABLE_STYLE
+                # Tabla con datos (página actual, filas virtualizadas)
+                virtualized_table(
+                    header_cells=[
+                        sortable_header_cell("Paciente", "primer_apellido", AppState.orden_pacientes, AppState.orden_pacientes_desc, AppState.ordenar_pacientes),
+                        sortable_header_cell("Edad", "fecha_nacimiento", AppState.orden_pacientes, AppState.orden_pacientes_desc, AppState.ordenar_pacientes),
+                        rx.table.column_header_cell("Género", style=COLUMN_HEADER),
+                        rx.table.column_header_cell("Documento", style=COLUMN_HEADER),
+                        rx.table.column_header_cell("Contacto", style=COLUMN_HEADER),
+                        sortable_header_cell("Registro", "fecha_registro", AppState.orden_pacientes, AppState.orden_pacientes_desc, AppState.ordenar_pacientes),
+                        rx.table.column_header_cell("Acciones", style=COLUMN_HEADER),
+                    ],
+                    items=AppState.pacientes_filtrados_display,
+                    render_row=patient_row
                 ),
                 
                 # Estado vacío
@@ -267,6 +347,14 @@ def patients_table() -> rx.Component:
                 )
             )
         ),
+
+        # Paginación (servidor)
+        pagination_controls(
+            AppState.pagina_actual_pacientes,
+            AppState.total_paginas_pacientes,
+            AppState.pagina_anterior_pacientes,
+            AppState.pagina_siguiente_pacientes
+        ),
         
         class_name="space-y-6",
         padding="20px"
@@ -1250,7 +1338,7 @@ def pagos_table() -> rx.Component:
                 rx.icon("receipt", size=24, color=COLORS["primary"]["500"]),
                 rx.heading("Historial de Pagos", size="5", weight="bold", color=DARK_THEME["colors"]["text_primary"]),
                 rx.badge(
-                    f"{AppState.lista_pagos.length()} pagos",
+                    f"{AppState.total_pagos} pagos",
                     color_scheme="cyan",
                     variant="soft"
                 ),
@@ -1333,6 +1421,14 @@ def pagos_table() -> rx.Component:
             )
         ),
 
+        # Paginación (servidor)
+        pagination_controls(
+            AppState.pagina_actual_pagos,
+            AppState.total_paginas_pagos,
+            AppState.pagina_anterior_pagos,
+            AppState.pagina_siguiente_pagos
+        ),
+
         class_name="space-y-6",
         padding="20px"
     )
@@ -24,6 +24,12 @@ ESTADOS_PAGO = [
     "reembolsado"
 ]
 
+# Tasa BS/USD usada solo si no hay ninguna tasa registrada en tasa_cambio
+TASA_CAMBIO_DEFAULT = 36.50
+
+# Días de historial de tasas que se mantienen en memoria del proceso
+VENTANA_CACHE_TASAS_DIAS = 400
+
 # ==========================================
 # 🦷 CONSTANTES DE ODONTOLOGÍA (V2.0)
 # ==========================================
@@ -61,6 +67,11 @@ CUADRANTE_4 = list(range(41, 49))  # Inferior derecho
 # Todos los dientes permanentes FDI
 DIENTES_FDI_PERMANENTES = CUADRANTE_1 + CUADRANTE_2 + CUADRANTE_3 + CUADRANTE_4
 
+# Historial de condiciones (tabla diente) que se mantiene en la tabla caliente;
+# lo inactivo más viejo pasa a diente_historial (compactar_historial_diente)
+HORIZONTE_HISTORIAL_DIENTE_DIAS = 180
+LOTE_COMPACTACION_DIENTE = 50000
+
 # Colores por condición (UI)
 COLORES_CONDICION = {
     'sano': '#90EE90',           # Verde claro
@@ -69,6 +69,13 @@ from .dashboard_models import (
     KPIModel
 )
 
+# ⚡ HIDRATACIÓN EN LOTE (listas grandes desde BD)
+from .hidratacion import (
+    hidratar_pacientes,
+    hidratar_consultas,
+    hidratar_pagos
+)
+
 # ✅ FORMULARIOS AHORA INTEGRADOS EN SUS MÓDULOS RESPECTIVOS
 
 # ✅ MODELOS DE AUTENTICACIÓN (Mantener separado)
@@ -121,6 +128,11 @@ __all__ = [
     "ReporteModel",
     "KPIModel",
     
+    # ⚡ HIDRATACIÓN EN LOTE
+    "hidratar_pacientes",
+    "hidratar_consultas",
+    "hidratar_pagos",
+
     # ✅ MODELOS DE FORMULARIOS
     "PacienteFormModel",
     "ConsultaFormModel", 
@@ -0,0 +1,262 @@
+"""
+⚡ HIDRATACIÓN EN LOTE DE MODELOS (filas de Supabase → rx.Base)
+================================================================
+
+Conversión de listas de filas de la BD; from_dict sigue siendo la
+referencia para filas sueltas y formularios.
+
+- Conversión por columnas: cada campo se resuelve para todas las filas
+  con una sola comprensión de lista
+- Mapeos campo → conversor precompilados una vez por modelo
+- Edad calculada una sola vez por fecha de nacimiento (lru_cache)
+- Sin validación de pydantic (Model.construct): SOLO para filas que vienen
+  de la BD; los datos ingresados por el usuario pasan por el constructor
+
+Cada conversor reproduce EXACTAMENTE la expresión de from_dict del modelo
+(mismos valores por defecto, incluidos los NULL: str(None) → "None",
+bool(None) → False). Si el lote falla por alguna fila inesperada se repite
+fila por fila con from_dict (la fila inválida se omite, igual que antes).
+
+PARIDAD: benchmark_hidratacion.py (raíz del proyecto) compara ambos
+caminos sobre filas de muestra y casos borde antes de medir.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import date, datetime
+from functools import lru_cache
+import logging
+
+from .pacientes_models import PacienteModel
+from .consultas_models import ConsultaModel
+from .pagos_models import PagoModel, MetodoPagoModel
+
+logger = logging.getLogger(__name__)
+
+# (campo del modelo, conversor que recibe la fila completa)
+Mapeo = List[Tuple[str, Callable[[Dict[str, Any]], Any]]]
+
+
+# ==========================================
+# 🔧 CONVERSORES (mismas expresiones que from_dict)
+# ==========================================
+
+def _str(columna: str, defecto: str = "") -> Callable[[Dict[str, Any]], str]:
+    """str(data.get(columna, defecto))"""
+    return lambda fila: str(fila.get(columna, defecto))
+
+
+def _str_si(columna: str) -> Callable[[Dict[str, Any]], str]:
+    """str(data.get(columna)) si tiene valor, si no "" """
+    return lambda fila: str(fila.get(columna)) if fila.get(columna) else ""
+
+
+def _float(columna: str, defecto: float = 0) -> Callable[[Dict[str, Any]], float]:
+    """float(data.get(columna, defecto))"""
+    return lambda fila: float(fila.get(columna, defecto))
+
+
+def _lista(columna: str) -> Callable[[Dict[str, Any]], list]:
+    return lambda fila: fila.get(columna, []) if isinstance(fila.get(columna), list) else []
+
+
+def _diccionario(columna: str) -> Callable[[Dict[str, Any]], dict]:
+    return lambda fila: fila.get(columna, {}) if isinstance(fila.get(columna), dict) else {}
+
+
+@lru_cache(maxsize=8192)
+def _edad(fecha_nacimiento: str, hoy: date) -> int:
+    """Edad cumplida a `hoy` (cacheada por valor: muchos pacientes comparten fecha)"""
+    if not fecha_nacimiento:
+        return 0
+    try:
+        fecha = datetime.strptime(fecha_nacimiento, "%Y-%m-%d").date()
+    except ValueError:
+        return 0
+    edad = hoy.year - fecha.year
+    if (hoy.month, hoy.day) < (fecha.month, fecha.day):
+        edad -= 1
+    return max(0, edad)
+
+
+def _nombre_completo(obj: Dict[str, Any], campos: Tuple[str, ...]) -> str:
+    if not obj:
+        return ""
+    return " ".join(p for p in (obj.get(c, "") for c in campos) if p).strip()
+
+
+def _embebido(fila: Dict[str, Any], clave: str) -> Dict[str, Any]:
+    return fila.get(clave, {}) or {}
+
+
+_CAMPOS_NOMBRE = ("primer_nombre", "segundo_nombre", "primer_apellido", "segundo_apellido")
+
+
+# ==========================================
+# 🗺️ MAPEOS PRECOMPILADOS
+# ==========================================
+
+MAPEO_PACIENTE: Mapeo = [
+    ("id", _str("id")),
+    ("numero_historia", _str("numero_historia")),
+    ("primer_nombre", _str("primer_nombre")),
+    ("segundo_nombre", _str_si("segundo_nombre")),
+    ("primer_apellido", _str("primer_apellido")),
+    ("segundo_apellido", _str_si("segundo_apellido")),
+    ("numero_documento", _str("numero_documento")),
+    ("tipo_documento", _str("tipo_documento", "CI")),
+    ("fecha_nacimiento", _str_si("fecha_nacimiento")),
+    ("genero", _str_si("genero")),
+    ("celular_1", _str_si("celular_1")),
+    ("celular_2", _str_si("celular_2")),
+    ("email", _str_si("email")),
+    ("direccion", _str_si("direccion")),
+    ("ciudad", _str_si("ciudad")),
+    ("alergias", _lista("alergias")),
+    ("medicamentos_actuales", _lista("medicamentos_actuales")),
+    ("condiciones_medicas", _lista("condiciones_medicas")),
+    ("fecha_registro", _str("fecha_registro")),
+    ("fecha_actualizacion", _str("fecha_actualizacion")),
+    ("activo", lambda fila: bool(fila.get("activo", True))),
+    ("contacto_emergencia", _diccionario("contacto_emergencia")),
+]
+
+MAPEO_CONSULTA: Mapeo = [
+    ("id", _str("id")),
+    ("numero_consulta", _str("numero_consulta")),
+    ("paciente_id", _str("paciente_id")),
+    ("primer_odontologo_id", lambda f: str(f.get("primer_odontologo_id", "") or f.get("odontologo_id", ""))),
+    ("fecha_llegada", lambda f: str(f.get("fecha_llegada", "") or f.get("fecha_programada", ""))),
+    ("orden_cola_odontologo", lambda f: f.get("orden_cola_odontologo")),
+    ("estado", _str("estado", "en_espera")),
+    ("tipo_consulta", _str("tipo_consulta", "general")),
+    ("motivo_consulta", _str_si("motivo_consulta")),
+    ("observaciones", _str_si("observaciones")),
+    ("fecha_creacion", _str("fecha_creacion")),
+    ("fecha_actualizacion", _str("fecha_actualizacion")),
+    ("paciente_nombre", lambda f: _nombre_completo(_embebido(f, "paciente"), _CAMPOS_NOMBRE)
+        or str(f.get("paciente_nombre_completo", "") or f.get("paciente_nombre", ""))),
+    ("odontologo_nombre", lambda f: _nombre_completo(_embebido(f, "personal"), _CAMPOS_NOMBRE)
+        or str(f.get("odontologo_nombre_completo", "") or f.get("odontologo_nombre", ""))),
+    ("paciente_telefono", lambda f: str(
+        _embebido(f, "paciente").get("celular", "") or _embebido(f, "paciente").get("telefono", "")
+        or f.get("paciente_telefono", ""))),
+    ("paciente_documento", lambda f: str(
+        _embebido(f, "paciente").get("numero_documento", "") or f.get("paciente_documento", ""))),
+    ("odontologo_especialidad", lambda f: str(
+        _embebido(f, "personal").get("especialidad", "") or f.get("odontologo_especialidad", ""))),
+]
+
+
+def _metodos_pago(fila: Dict[str, Any]) -> List[MetodoPagoModel]:
+    metodos = fila.get("metodos_pago", []) if isinstance(fila.get("metodos_pago"), list) else []
+    construir = MetodoPagoModel.construct
+    return [
+        construir(
+            tipo=str(m.get("tipo", "efectivo")),
+            moneda=str(m.get("moneda", "USD")),
+            monto=float(m.get("monto", 0)),
+            referencia=str(m.get("referencia", ""))
+        )
+        for m in metodos
+    ]
+
+
+def _paciente_nombre_pago(fila: Dict[str, Any]) -> str:
+    # from_dict usa data["paciente"]: sin la clave la fila falla (y se omite)
+    paciente = fila["paciente"]
+    if not paciente:
+        return ""
+    return f"{paciente.get('primer_nombre', '')} {paciente.get('primer_apellido', '')}".strip()
+
+
+MAPEO_PAGO: Mapeo = [
+    ("id", _str("id")),
+    ("numero_recibo", _str("numero_recibo")),
+    ("consulta_id", _str_si("consulta_id")),
+    ("paciente_id", _str("paciente_id")),
+    ("fecha_pago", _str("fecha_pago")),
+    ("monto_total_usd", lambda f: float(f.get("monto_total_usd", f.get("monto_total", 0)))),
+    ("monto_pagado_usd", lambda f: float(f.get("monto_pagado_usd", f.get("monto_pagado", 0)))),
+    ("saldo_pendiente_usd", lambda f: float(f.get("saldo_pendiente_usd", f.get("saldo_pendiente", 0)))),
+    ("monto_total_bs", _float("monto_total_bs")),
+    ("monto_pagado_bs", _float("monto_pagado_bs")),
+    ("saldo_pendiente_bs", _float("saldo_pendiente_bs")),
+    ("tasa_cambio_bs_usd", _float("tasa_cambio_bs_usd", 36.50)),
+    ("metodos_pago", _metodos_pago),
+    ("concepto", _str("concepto")),
+    ("estado_pago", _str("estado_pago", "completado")),
+    ("descuento_aplicado", _float("descuento_aplicado")),
+    ("motivo_descuento", _str_si("motivo_descuento")),
+    ("procesado_por", _str("procesado_por")),
+    ("paciente_nombre", _paciente_nombre_pago),
+    ("paciente_documento", lambda f: str(f["paciente"].get("numero_documento", "")) if f["paciente"] else ""),
+]
+
+
+# ==========================================
+# ⚡ HIDRATACIÓN
+# ==========================================
+
+def _por_fila(modelo, filas: List[Dict[str, Any]]) -> list:
+    """Camino de referencia: from_dict fila por fila, omitiendo filas inválidas"""
+    modelos = []
+    for fila in filas:
+        try:
+            modelos.append(modelo.from_dict(fila))
+        except Exception as error_fila:
+            logger.warning(f"Error convirtiendo {modelo.__name__}: {error_fila}")
+    return modelos
+
+
+def _hidratar(modelo, mapeo: Mapeo, filas: List[Dict[str, Any]],
+              derivados: Optional[Callable[[Dict[str, list]], Dict[str, list]]] = None) -> list:
+    """
+    Columnas primero, instancias después
+
+    Args:
+        modelo: Clase rx.Base con from_dict (respaldo fila por fila)
+        mapeo: Mapeo precompilado del modelo
+        filas: Filas de Supabase (confiables)
+        derivados: Campos calculados a partir de columnas ya convertidas
+    """
+    if not filas:
+        return []
+
+    # from_dict devuelve el modelo por defecto para filas vacías o no dict
+    if not all(fila and isinstance(fila, dict) for fila in filas):
+        return _por_fila(modelo, filas)
+
+    try:
+        columnas: Dict[str, list] = {
+            campo: [conversor(fila) for fila in filas]
+            for campo, conversor in mapeo
+        }
+        if derivados:
+            columnas.update(derivados(columnas))
+
+        campos = list(columnas)
+        construir = modelo.construct
+        return [construir(**dict(zip(campos, valores))) for valores in zip(*columnas.values())]
+
+    except Exception as e:
+        logger.warning(f"⚠️ Hidratación en lote de {modelo.__name__} falló ({e}); usando from_dict por fila")
+        return _por_fila(modelo, filas)
+
+
+def hidratar_pacientes(filas: List[Dict[str, Any]]) -> List[PacienteModel]:
+    """👥 Filas de paciente → PacienteModel (con edad calculada)"""
+    hoy = date.today()
+    return _hidratar(
+        PacienteModel, MAPEO_PACIENTE, filas,
+        derivados=lambda columnas: {"edad": [_edad(f, hoy) for f in columnas["fecha_nacimiento"]]}
+    )
+
+
+def hidratar_consultas(filas: List[Dict[str, Any]]) -> List[ConsultaModel]:
+    """🏥 Filas de consulta (con paciente/personal embebidos) → ConsultaModel"""
+    return _hidratar(ConsultaModel, MAPEO_CONSULTA, filas)
+
+
+def hidratar_pagos(filas: List[Dict[str, Any]]) -> List[PagoModel]:
+    """💳 Filas de pago (con paciente embebido) → PagoModel"""
+    return _hidratar(PagoModel, MAPEO_PAGO, filas)
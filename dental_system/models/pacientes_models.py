@@ -371,8 +371,9 @@ class ConsultaHistorial(rx.Base):
     primer_odontologo_id: str = ""
     primer_odontologo_nombre: str = ""
 
-    # Intervenciones realizadas en la consulta
+    # Intervenciones realizadas en la consulta (el detalle se carga al expandir)
     intervenciones: List[IntervencionHistorial] = []
+    cantidad_intervenciones: int = 0
 
     # Totales de la consulta
     costo_total_usd: float = 0.0
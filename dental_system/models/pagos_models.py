@@ -155,7 +155,7 @@ class PagoFormModel(rx.Base):
 
     # 💱 TASA DE CONVERSIÓN
     tasa_cambio: float = 36.50             # Tasa del día
-    tasa_cambio_del_dia: str = "36.50"     # Tasa editable por usuario (string para input)
+    tasa_cambio_del_dia: str = ""          # Tasa editable por usuario (string para input; vacía = tasa registrada del día)
 
     # 💵 PAGOS EN AMBAS MONEDAS
     monto_pagado_usd: float = 0.0          # Cuánto paga en USD
@@ -196,7 +196,7 @@ class PagoFormModel(rx.Base):
             total_usd = float(self.monto_total_usd)
             pago_usd = float(self.pago_usd)
             pago_bs = float(self.pago_bs)
-            tasa = float(self.tasa_cambio_del_dia)
+            tasa = float(self.tasa_cambio_del_dia or self.tasa_cambio)
             descuento = float(self.descuento_usd)
 
             # Validar rangos
@@ -240,7 +240,7 @@ class PagoFormModel(rx.Base):
         try:
             total = float(self.monto_total_usd)
             pagado_usd = float(self.pago_usd)
-            pagado_bs = float(self.pago_bs) / float(self.tasa_cambio_del_dia)
+            pagado_bs = float(self.pago_bs) / float(self.tasa_cambio_del_dia or self.tasa_cambio)
             descuento = float(self.descuento_usd)
 
             return max(0, total - descuento - pagado_usd - pagado_bs)
@@ -250,7 +250,7 @@ class PagoFormModel(rx.Base):
     @property
     def saldo_pendiente_bs(self) -> float:
         """Saldo pendiente en BS"""
-        return self.saldo_pendiente_usd * float(self.tasa_cambio_del_dia) if self.tasa_cambio_del_dia else 0.0
+        return self.saldo_pendiente_usd * float(self.tasa_cambio_del_dia or self.tasa_cambio)
 
     @property
     def total_pagado_equivalente_usd(self) -> float:
@@ -258,7 +258,7 @@ class PagoFormModel(rx.Base):
         try:
             pagado_usd = float(self.pago_usd)
             pagado_bs = float(self.pago_bs)
-            tasa = float(self.tasa_cambio_del_dia)
+            tasa = float(self.tasa_cambio_del_dia or self.tasa_cambio)
 
             bs_to_usd = pagado_bs / tasa if tasa > 0 else 0
             return pagado_usd + bs_to_usd
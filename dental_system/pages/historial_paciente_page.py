@@ -429,27 +429,55 @@ def medical_info_section() -> rx.Component:
 
 
 def odontogram_section() -> rx.Component:
-    """Odontograma actual del paciente (solo lectura)"""
+    """Odontograma del paciente (solo lectura): actual o al inicio del período elegido"""
     return rx.box(
         rx.vstack(
             rx.hstack(
                 rx.icon("scan", size=20, color=COLORS["success"]["400"]),
                 rx.text(
-                    "Odontograma Actual",
+                    rx.cond(
+                        AppState.hay_odontograma_en_fecha,
+                        f"Odontograma al {AppState.odontograma_fecha_corte_texto}",
+                        "Odontograma Actual"
+                    ),
                     size="4",
                     weight="bold",
                     color=DARK_THEME["colors"]["text_primary"]
                 ),
+                rx.cond(
+                    AppState.odontograma_corte_cargando,
+                    rx.spinner(size="2"),
+                ),
+                rx.spacer(),
+                # Período del timeline: odontograma como estaba hace N días
+                rx.segmented_control.root(
+                    rx.segmented_control.item("Actual", value="all"),
+                    rx.segmented_control.item("Hace 7 días", value="7"),
+                    rx.segmented_control.item("Hace 30 días", value="30"),
+                    rx.segmented_control.item("Hace 90 días", value="90"),
+                    value=AppState.timeline_filter_period,
+                    on_change=AppState.cambiar_periodo_timeline,
+                    radius="full"
+                ),
                 spacing="2",
-                align="center"
+                align="center",
+                width="100%"
             ),
 
             # Odontograma con leyenda horizontal
             rx.box(
-                professional_odontogram_grid(
-                    selected_tooth=AppState.selected_tooth,
-                    teeth_data=AppState.get_teeth_data,
-                    on_tooth_click=AppState.select_tooth,
+                rx.cond(
+                    AppState.hay_odontograma_en_fecha,
+                    professional_odontogram_grid(
+                        selected_tooth=AppState.selected_tooth,
+                        teeth_data=AppState.get_teeth_data_corte,
+                        on_tooth_click=AppState.select_tooth,
+                    ),
+                    professional_odontogram_grid(
+                        selected_tooth=AppState.selected_tooth,
+                        teeth_data=AppState.get_teeth_data,
+                        on_tooth_click=AppState.select_tooth,
+                    ),
                 ),
                 width="100%"
             ),
@@ -469,35 +497,56 @@ def odontogram_section() -> rx.Component:
 # ==========================================
 
 def tab_historial_consultas() -> rx.Component:
-    """Tab de historial de consultas"""
+    """Tab de historial de consultas (páginas bajo demanda, más recientes primero)"""
     return rx.vstack(
         rx.cond(
-            AppState.historial_completo.consultas.length() > 0,
+            AppState.consultas_historial.length() > 0,
             rx.vstack(
                 rx.foreach(
-                    AppState.historial_completo.consultas,
+                    AppState.consultas_historial,
                     consulta_card
                 ),
+                rx.cond(
+                    AppState.hay_mas_consultas_historial,
+                    rx.button(
+                        rx.hstack(
+                            rx.icon("chevrons-down", size=16),
+                            rx.text("Cargar más consultas"),
+                            spacing="2",
+                            align="center"
+                        ),
+                        variant="soft",
+                        color_scheme="cyan",
+                        loading=AppState.cargando_consultas_historial,
+                        on_click=AppState.cargar_mas_consultas_historial,
+                        width="100%"
+                    ),
+                    rx.box()
+                ),
                 spacing="4",
                 width="100%",
             ),
-            rx.box(
-                rx.vstack(
-                    rx.icon("inbox", size=48, color=DARK_THEME["colors"]["text_muted"]),
-                    rx.text(
-                        "No hay consultas registradas",
-                        size="3",
-                        color=DARK_THEME["colors"]["text_muted"],
-                        weight="medium"
+            rx.cond(
+                AppState.cargando_consultas_historial,
+                rx.center(rx.spinner(size="3"), padding=SPACING["8"], width="100%"),
+                rx.box(
+                    rx.vstack(
+                        rx.icon("inbox", size=48, color=DARK_THEME["colors"]["text_muted"]),
+                        rx.text(
+                            "No hay consultas registradas",
+                            size="3",
+                            color=DARK_THEME["colors"]["text_muted"],
+                            weight="medium"
+                        ),
+                        spacing="3",
+                        align="center"
                     ),
-                    spacing="3",
-                    align="center"
-                ),
-                style={
-                    **glassmorphism_card(opacity="80", blur="10px"),
-                    "padding": SPACING["8"],
-                    "text_align": "center"
-                }
+                    style={
+                        **glassmorphism_card(opacity="80", blur="10px"),
+                        "padding": SPACING["8"],
+                        "text_align": "center"
+                    }
+                )
             )
         ),
 
@@ -506,6 +555,100 @@ def tab_historial_consultas() -> rx.Component:
     )
 
 
+def intervencion_historial_item(intervencion) -> rx.Component:
+    """Intervención dentro del detalle expandido de una consulta"""
+    return rx.box(
+        rx.vstack(
+            rx.hstack(
+                rx.icon("stethoscope", size=16, color=COLORS["success"]["400"]),
+                rx.text(
+                    intervencion.odontologo_nombre,
+                    weight="bold",
+                    size="2",
+                    color=DARK_THEME["colors"]["text_primary"]
+                ),
+                rx.spacer(),
+                rx.text(
+                    f"${intervencion.total_usd:.2f}",
+                    weight="bold",
+                    size="2",
+                    color=COLORS["success"]["500"]
+                ),
+                width="100%",
+                align="center"
+            ),
+            rx.text(
+                intervencion.procedimiento_realizado,
+                size="2",
+                color=DARK_THEME["colors"]["text_muted"]
+            ),
+            rx.hstack(
+                rx.foreach(
+                    intervencion.servicios,
+                    lambda servicio: rx.badge(servicio.nombre, color_scheme="blue", variant="soft", size="1")
+                ),
+                spacing="2",
+                wrap="wrap"
+            ),
+            spacing="2",
+            align="start",
+            width="100%"
+        ),
+        style={
+            "padding": SPACING["3"],
+            "border_radius": RADIUS["md"],
+            "border_left": f"3px solid {COLORS['success']['500']}",
+            "background": f"{COLORS['success']['500']}08"
+        },
+        width="100%"
+    )
+
+
+def detalle_intervenciones_consulta(consulta) -> rx.Component:
+    """Botón para expandir + detalle de intervenciones (se carga al abrirlo)"""
+    expandida = AppState.consulta_historial_expandida == consulta.id
+    return rx.cond(
+        consulta.cantidad_intervenciones > 0,
+        rx.vstack(
+            rx.button(
+                rx.hstack(
+                    rx.cond(
+                        expandida,
+                        rx.icon("chevron-up", size=14),
+                        rx.icon("chevron-down", size=14)
+                    ),
+                    rx.text(f"Intervenciones ({consulta.cantidad_intervenciones})"),
+                    spacing="1",
+                    align="center"
+                ),
+                variant="ghost",
+                size="1",
+                on_click=AppState.alternar_detalle_consulta_historial(consulta.id)
+            ),
+            rx.cond(
+                expandida,
+                rx.cond(
+                    AppState.cargando_intervenciones_historial,
+                    rx.spinner(size="2"),
+                    rx.vstack(
+                        rx.foreach(
+                            AppState.intervenciones_consulta_expandida,
+                            intervencion_historial_item
+                        ),
+                        spacing="2",
+                        width="100%"
+                    )
+                ),
+                rx.box()
+            ),
+            spacing="2",
+            align="start",
+            width="100%"
+        ),
+        rx.box()
+    )
+
+
 def consulta_card(consulta) -> rx.Component:
     """Card de consulta individual (mantiene diseño original mejorado)"""
     return rx.box(
@@ -615,6 +758,9 @@ def consulta_card(consulta) -> rx.Component:
                 rx.box()
             ),
 
+            # Intervenciones (detalle perezoso)
+            detalle_intervenciones_consulta(consulta),
+
             spacing="3",
             width="100%",
         ),
@@ -671,6 +817,7 @@ def historial_tabs() -> rx.Component:
         ),
 
         default_value="info",
+        on_change=AppState.cambiar_tab_historial,
         width="100%"
     )
 
@@ -79,7 +79,7 @@ def patients_stats() -> rx.Component:
     return rx.grid(
         stat_card(
             title="Total Pacientes",
-            value=AppState.lista_pacientes.length().to_string(),
+            value=AppState.total_pacientes_registrados.to_string(),
             icon="users",
             color=COLORS["primary"]["600"]
         ),
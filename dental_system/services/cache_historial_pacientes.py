@@ -0,0 +1,126 @@
+"""
+📋 CACHE DEL HISTORIAL CLÍNICO POR PACIENTE
+===========================================
+
+Cache en memoria compartido por todo el proceso para la página de historial:
+
+- resumen: totales del encabezado (consultas, intervenciones, balance)
+- páginas de consultas ya pedidas (clave: limit, offset)
+- detalle de intervenciones por consulta (carga perezosa al expandir)
+
+Cada paciente expira a los MODULE_CACHE_TTL['pacientes'] segundos y se
+invalida completo cuando se escribe un pago o una intervención suya.
+Se conservan como máximo MAX_PACIENTES_CACHE_HISTORIAL pacientes (LRU).
+
+USADO POR: PacientesService (lectura), PagosService / OdontologiaService /
+           ConsultasService (invalidación)
+"""
+
+from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+import threading
+import time
+import logging
+
+from .cache_invalidation_hooks import MODULE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Pacientes con historial en memoria a la vez
+MAX_PACIENTES_CACHE_HISTORIAL = 100
+
+
+class CacheHistorialPacientes:
+    """
+    🗄️ Entradas por paciente: {"creado", "resumen", "paginas", "intervenciones"}
+    """
+
+    def __init__(self, max_pacientes: int = MAX_PACIENTES_CACHE_HISTORIAL, ttl: int = MODULE_CACHE_TTL['pacientes']):
+        self._lock = threading.Lock()
+        self.max_pacientes = max_pacientes
+        self.ttl = ttl
+        self.entradas: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _entrada(self, paciente_id: str, crear: bool = False) -> Optional[Dict[str, Any]]:
+        """Entrada vigente del paciente (se descarta si venció el TTL)"""
+        entrada = self.entradas.get(paciente_id)
+        if entrada is not None and time.time() - entrada["creado"] > self.ttl:
+            del self.entradas[paciente_id]
+            entrada = None
+
+        if entrada is None and crear:
+            entrada = {"creado": time.time(), "resumen": None, "paginas": {}, "intervenciones": {}}
+            self.entradas[paciente_id] = entrada
+            while len(self.entradas) > self.max_pacientes:
+                self.entradas.popitem(last=False)
+
+        if entrada is not None:
+            self.entradas.move_to_end(paciente_id)
+        return entrada
+
+    # ==========================================
+    # 📊 RESUMEN
+    # ==========================================
+
+    def get_resumen(self, paciente_id: str) -> Optional[Any]:
+        with self._lock:
+            entrada = self._entrada(paciente_id)
+            return entrada["resumen"] if entrada else None
+
+    def set_resumen(self, paciente_id: str, resumen: Any):
+        with self._lock:
+            self._entrada(paciente_id, crear=True)["resumen"] = resumen
+
+    # ==========================================
+    # 📄 PÁGINAS DE CONSULTAS
+    # ==========================================
+
+    def get_pagina(self, paciente_id: str, limit: int, offset: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entrada = self._entrada(paciente_id)
+            return entrada["paginas"].get((limit, offset)) if entrada else None
+
+    def set_pagina(self, paciente_id: str, limit: int, offset: int, pagina: Dict[str, Any]):
+        with self._lock:
+            self._entrada(paciente_id, crear=True)["paginas"][(limit, offset)] = pagina
+
+    # ==========================================
+    # 🦷 DETALLE DE INTERVENCIONES
+    # ==========================================
+
+    def get_intervenciones(self, paciente_id: str, consulta_id: str) -> Optional[List[Any]]:
+        with self._lock:
+            entrada = self._entrada(paciente_id)
+            return entrada["intervenciones"].get(consulta_id) if entrada else None
+
+    def set_intervenciones(self, paciente_id: str, consulta_id: str, intervenciones: List[Any]):
+        with self._lock:
+            self._entrada(paciente_id, crear=True)["intervenciones"][consulta_id] = intervenciones
+
+    # ==========================================
+    # 🔄 INVALIDACIÓN
+    # ==========================================
+
+    def invalidar(self, paciente_id: Optional[str]):
+        """Descartar todo lo cacheado de un paciente (pago o intervención nueva)"""
+        if not paciente_id:
+            return
+        with self._lock:
+            if self.entradas.pop(paciente_id, None) is not None:
+                logger.debug(f"🔄 Historial en cache invalidado para paciente {paciente_id}")
+
+    def invalidar_todo(self):
+        with self._lock:
+            self.entradas.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pacientes": len(self.entradas),
+                "max_pacientes": self.max_pacientes,
+                "ttl": self.ttl
+            }
+
+
+# Instancia global (una por proceso)
+cache_historial_pacientes = CacheHistorialPacientes()
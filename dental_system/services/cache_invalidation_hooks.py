@@ -151,13 +151,17 @@ def invalidate_after_staff_operation(operation_type: str = "unknown"):
     """
     👨‍⚕️ DECORADOR: Invalidar cache después de operaciones de personal
     
-    Afecta: dashboard, personal
+    Afecta: dashboard, personal (+ recarga del directorio de personal)
     """
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
             result = await func(*args, **kwargs)
             
+            # Recargar directorio de personal en el próximo acceso
+            from .directorio_personal import directorio_personal
+            directorio_personal.invalidar()
+
             # Invalidar cache relevante
             affected_modules = ['dashboard', 'personal']
             affected_data = {
@@ -180,13 +184,17 @@ def invalidate_after_service_operation(operation_type: str = "unknown"):
     """
     🦷 DECORADOR: Invalidar cache después de operaciones de servicios
     
-    Afecta: dashboard, servicios
+    Afecta: dashboard, servicios (+ recarga del catálogo de servicios)
     """
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
             result = await func(*args, **kwargs)
             
+            # Recargar catálogo de servicios en el próximo acceso
+            from .catalogo_servicios import catalogo_servicios
+            catalogo_servicios.invalidar()
+
             # Invalidar cache relevante
             affected_modules = ['dashboard', 'servicios']
             affected_data = {
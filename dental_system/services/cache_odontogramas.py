@@ -0,0 +1,114 @@
+"""
+🦷 CACHE DE ODONTOGRAMAS POR PACIENTE (VERSIONADO)
+==================================================
+
+Cache en memoria compartido por todo el proceso para el odontograma
+actual (arreglo compacto de 160 códigos) de cada paciente.
+
+Cada entrada guarda la versión con la que se cargó:
+
+    version = "<filas activas>|<fecha_registro más reciente>"
+
+Antes de usar una entrada, OdontologiaService pide solo esa versión a la
+BD (1 fila + count). Si coincide se devuelve la copia en memoria; si no,
+se recarga el odontograma completo. Las escrituras hechas a través de
+OdontologiaService descartan la entrada del paciente al momento.
+
+Las entradas expiran a los MODULE_CACHE_TTL['pacientes'] segundos y se
+conservan como máximo MAX_PACIENTES_CACHE_ODONTOGRAMA pacientes (LRU).
+
+USADO POR: OdontologiaService (lectura e invalidación)
+"""
+
+from typing import Dict, Optional, Any, Iterable
+from collections import OrderedDict
+import threading
+import time
+import logging
+
+from .cache_invalidation_hooks import MODULE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Odontogramas en memoria a la vez
+MAX_PACIENTES_CACHE_ODONTOGRAMA = 200
+
+
+def version_odontograma(total_filas: int, fecha_mas_reciente: Optional[str]) -> str:
+    """Versión comparable entre la carga completa y la verificación rápida"""
+    return f"{total_filas}|{fecha_mas_reciente or ''}"
+
+
+class CacheOdontogramas:
+    """
+    🗄️ Entradas por paciente: {"creado", "version", "resultado"}
+    """
+
+    def __init__(self, max_pacientes: int = MAX_PACIENTES_CACHE_ODONTOGRAMA, ttl: int = MODULE_CACHE_TTL['pacientes']):
+        self._lock = threading.Lock()
+        self.max_pacientes = max_pacientes
+        self.ttl = ttl
+        self.entradas: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.aciertos = 0
+        self.recargas = 0
+
+    def get(self, paciente_id: str, version: str) -> Optional[Dict[str, Any]]:
+        """
+        Odontograma en cache si sigue en la versión indicada
+
+        Retorna una copia (el estado modifica los códigos en sitio).
+        """
+        with self._lock:
+            entrada = self.entradas.get(paciente_id)
+            if entrada is not None and time.time() - entrada["creado"] > self.ttl:
+                del self.entradas[paciente_id]
+                entrada = None
+
+            if entrada is None or entrada["version"] != version:
+                self.recargas += 1
+                return None
+
+            self.entradas.move_to_end(paciente_id)
+            self.aciertos += 1
+            resultado = entrada["resultado"]
+            return {**resultado, "codigos": list(resultado["codigos"])}
+
+    def set(self, paciente_id: str, version: str, resultado: Dict[str, Any]):
+        with self._lock:
+            self.entradas[paciente_id] = {
+                "creado": time.time(),
+                "version": version,
+                "resultado": {**resultado, "codigos": list(resultado["codigos"])}
+            }
+            self.entradas.move_to_end(paciente_id)
+            while len(self.entradas) > self.max_pacientes:
+                self.entradas.popitem(last=False)
+
+    # ==========================================
+    # 🔄 INVALIDACIÓN
+    # ==========================================
+
+    def invalidar(self, paciente_ids: Iterable[Optional[str]]):
+        """Descartar odontogramas tras una escritura de condiciones"""
+        with self._lock:
+            for paciente_id in paciente_ids:
+                if paciente_id and self.entradas.pop(paciente_id, None) is not None:
+                    logger.debug(f"🔄 Odontograma en cache invalidado para paciente {paciente_id}")
+
+    def invalidar_todo(self):
+        with self._lock:
+            self.entradas.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pacientes": len(self.entradas),
+                "max_pacientes": self.max_pacientes,
+                "ttl": self.ttl,
+                "aciertos": self.aciertos,
+                "recargas": self.recargas
+            }
+
+
+# Instancia global (una por proceso)
+cache_odontogramas = CacheOdontogramas()
@@ -0,0 +1,148 @@
+"""
+🦷 CATÁLOGO DE SERVICIOS EN MEMORIA
+===================================
+
+El catálogo de servicios (decenas de filas) se leía en cada filtro del
+módulo de servicios y el modal de intervención lo recorría por nombre
+varias veces por render. Este catálogo se carga completo UNA vez por
+proceso y se indexa por id y por nombre:
+
+- ServiciosService.get_filtered_services / get_categorias / get_service_by_id
+  se resuelven en memoria durante MODULE_CACHE_TTL['servicios'] segundos
+- El índice por nombre solo contiene servicios activos (modal de intervención)
+- `version` aumenta en cada recarga: el estado la copia al cargar la lista
+  (catalogo_servicios_version) y los computed vars del modal dependen de ella
+
+Se recarga completo cuando una operación decorada con
+invalidate_after_service_operation termina o cuando vence el TTL.
+
+USADO POR: ServiciosService, EstadoServicios, EstadoOdontologia
+"""
+
+from typing import Dict, List, Optional, Any
+import threading
+import time
+import logging
+
+from dental_system.models import ServicioModel
+from dental_system.supabase.client import get_client
+from .cache_invalidation_hooks import MODULE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogoServicios:
+    """
+    🗂️ Servicios (todos, ordenados por nombre) indexados por id y por nombre
+    """
+
+    def __init__(self, ttl: int = MODULE_CACHE_TTL['servicios']):
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.servicios: List[ServicioModel] = []
+        self.por_id: Dict[str, ServicioModel] = {}
+        self.por_nombre: Dict[str, ServicioModel] = {}
+        self.categorias: List[str] = []
+        self.cargado_en: Optional[float] = None
+        self.version = 0
+
+    # ==========================================
+    # 🔄 CARGA
+    # ==========================================
+
+    def _cargar(self):
+        """Leer la tabla servicio completa (1 query) y reconstruir índices"""
+        response = get_client().table("servicio").select("*").order("nombre").execute()
+
+        servicios = []
+        for item in response.data or []:
+            try:
+                servicios.append(ServicioModel.from_dict(item))
+            except Exception as e:
+                logger.warning(f"Error convirtiendo servicio: {e}")
+
+        self.servicios = servicios
+        self.por_id = {s.id: s for s in servicios if s.id}
+        # Solo servicios activos: un servicio desactivado no se puede seleccionar por nombre
+        self.por_nombre = {s.nombre: s for s in servicios if s.nombre and s.activo}
+        self.categorias = sorted({s.categoria for s in servicios if s.activo and s.categoria})
+        self.cargado_en = time.time()
+        self.version += 1
+        logger.info(f"🦷 Catálogo de servicios cargado: {len(servicios)} servicios (v{self.version})")
+
+    def _asegurar_cargado(self):
+        if self.cargado_en is None or time.time() - self.cargado_en > self.ttl:
+            self._cargar()
+
+    def invalidar(self):
+        """Forzar recarga en el próximo acceso (servicio creado/modificado)"""
+        with self._lock:
+            self.cargado_en = None
+
+    # ==========================================
+    # 🔍 BÚSQUEDAS
+    # ==========================================
+
+    def get(self, servicio_id: Optional[str]) -> Optional[ServicioModel]:
+        if not servicio_id:
+            return None
+        with self._lock:
+            self._asegurar_cargado()
+            return self.por_id.get(servicio_id)
+
+    def get_por_nombre(self, nombre: Optional[str]) -> Optional[ServicioModel]:
+        """Servicio ACTIVO por nombre (None si no existe o está desactivado)"""
+        if not nombre:
+            return None
+        with self._lock:
+            self._asegurar_cargado()
+            return self.por_nombre.get(nombre)
+
+    def filtrar(self,
+                search: Optional[str] = None,
+                categoria: Optional[str] = None,
+                activos_only: Optional[bool] = True) -> List[ServicioModel]:
+        """Mismo filtro que la query original (ilike en código, nombre y descripción)"""
+        with self._lock:
+            self._asegurar_cargado()
+            servicios = self.servicios
+
+        if activos_only:
+            servicios = [s for s in servicios if s.activo]
+
+        if categoria and categoria != "todas":
+            servicios = [s for s in servicios if s.categoria == categoria]
+
+        if search and search.strip():
+            termino = search.strip().lower()
+            servicios = [
+                s for s in servicios
+                if termino in (s.codigo or "").lower()
+                or termino in (s.nombre or "").lower()
+                or termino in (s.descripcion or "").lower()
+            ]
+
+        return list(servicios)
+
+    def get_categorias(self) -> List[str]:
+        with self._lock:
+            self._asegurar_cargado()
+            return list(self.categorias)
+
+    def get_version(self) -> int:
+        with self._lock:
+            self._asegurar_cargado()
+            return self.version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "servicios": len(self.servicios),
+                "version": self.version,
+                "edad_segundos": round(time.time() - self.cargado_en, 1) if self.cargado_en else None,
+                "ttl": self.ttl
+            }
+
+
+# Instancia global (una por proceso)
+catalogo_servicios = CatalogoServicios()
@@ -6,7 +6,9 @@ Elimina duplicación entre boss_state y admin_state
 from typing import Dict, List, Optional, Any
 from datetime import date, datetime
 from .base_service import BaseService
-from dental_system.models import ConsultaModel, ConsultaFormModel
+from .cache_historial_pacientes import cache_historial_pacientes
+from .directorio_personal import directorio_personal
+from dental_system.models import ConsultaModel, ConsultaFormModel, hidratar_consultas
 import logging
 
 logger = logging.getLogger(__name__)
@@ -51,7 +53,7 @@ class ConsultasService(BaseService):
                 # Fallback a tabla consultas
                 logger.debug(f"Vista no disponible, usando tabla consultas: {vista_error}")
 
-                query = self.client.table("consulta").select("*, paciente(*), personal!primer_odontologo_id(*)").gte(
+                query = self.client.table("consulta").select("*, paciente(*)").gte(
                     "fecha_llegada", f"{today}T00:00:00"
                 ).lt(
                     "fecha_llegada", f"{today}T23:59:59"
@@ -65,19 +67,15 @@ class ConsultasService(BaseService):
                 response = query.execute()
                 consultas_data = response.data if response.data else []
             
-            # Convertir a modelos tipados
-            consultas_models = []
+            # Asegurar que tenga orden de llegada; odontólogo desde el directorio
             for i, item in enumerate(consultas_data, 1):
-                try:
-                    # Asegurar que tenga orden de llegada
-                    if not item.get('orden_cola_odontologo'):
-                        item['orden_cola_odontologo'] = i
-                    
-                    model = ConsultaModel.from_dict(item)
-                    consultas_models.append(model)
-                except Exception as e:
-                    logger.warning(f"Error convirtiendo consulta: {e}")
-                    continue
+                if not item.get('orden_cola_odontologo'):
+                    item['orden_cola_odontologo'] = i
+                if not item.get('personal'):
+                    item['personal'] = directorio_personal.get(item.get('primer_odontologo_id'))
+
+            # Convertir a modelos tipados (en lote)
+            consultas_models = hidratar_consultas(consultas_data)
             
             print(f"✅ Consultas del día obtenidas: {len(consultas_models)} registros")
             return consultas_models
@@ -125,9 +123,10 @@ class ConsultasService(BaseService):
             #     datos_consulta = consulta_data or {}
             
             # Crear consulta con esquema v4.1 - INSERT directo
+            # orden_cola_odontologo lo asigna la BD (trigger asignar_orden_llegada)
             consulta_data = {
                 "paciente_id": consulta_data["paciente_id"],
-                "primer_odontologo_id": consulta_data.get("primer_odontologo_id") or datos_consulta.get("odontologo_id"),
+                "primer_odontologo_id": consulta_data.get("primer_odontologo_id") or consulta_data.get("odontologo_id"),
                 "fecha_llegada": datetime.now().isoformat(),
                 "estado": "en_espera",  # Estado inicial v4.1
                 "tipo_consulta": consulta_data.get("tipo_consulta", "primera_vez"),  # ✅ Corregido: default debe ser "primera_vez" según constraint
@@ -142,6 +141,7 @@ class ConsultasService(BaseService):
             if result:
                 # Crear modelo tipado del resultado
                 consulta_model = ConsultaModel.from_dict(result)
+                cache_historial_pacientes.invalidar(consulta_model.paciente_id)
                 
                 logger.info(f"✅ Consulta creada: {consulta_model.numero_consulta}")
    
@@ -368,11 +368,12 @@ class ConsultasService(BaseService):
             # Verificar permisos
             self.require_permission("consultas", "leer")
 
-            # Query con detalles completos (JOIN a pacientes y personal/odontólogos)
-            response = self.client.table("consulta").select("*, paciente(*), personal!primer_odontologo_id(*)").eq("id", consultation_id).execute()
+            # Query con paciente embebido (odontólogo desde el directorio de personal)
+            response = self.client.table("consulta").select("*, paciente(*)").eq("id", consultation_id).execute()
             data = response.data[0] if response.data else None
 
             if data:
+                data["personal"] = directorio_personal.get(data.get("primer_odontologo_id"))
                 return ConsultaModel.from_dict(data)
             return None
             
@@ -436,45 +437,21 @@ class ConsultasService(BaseService):
     # 🔧 MÉTODOS HELPER PARA LÓGICA DE COLAS v4.1
     # ==========================================
 
-    async def _calcular_siguiente_orden_cola_doctor(self, odontologo_id: str) -> int:
-        """👨‍⚕️ Calcular siguiente posición en cola específica del doctor usando modelos tipados"""
-        try:
-            if not odontologo_id:
-                return 1
-                
-            # Usar el método tipado existente
-            consultas_hoy: List[ConsultaModel] = await self.get_today_consultations(odontologo_id)
-            
-            if not consultas_hoy:
-                return 1
-            
-            # Filtrar por este odontólogo específico usando campos v4.1
-            consultas_doctor = [
-                c for c in consultas_hoy 
-                if c.primer_odontologo_id == odontologo_id
-            ]
-            
-            if not consultas_doctor:
-                return 1
-            
-            max_orden_cola = max(
-                (c.orden_cola_odontologo or 0 for c in consultas_doctor),
-                default=0
-            )
-            return max_orden_cola + 1
-            
-        except Exception as e:
-            logger.warning(f"Error calculando orden cola doctor: {e}")
-            return 1
-    
     async def intercambiar_orden_cola(self,
                                   consulta_id: str,
                                   odontologo_id: str,
                                   orden_actual: int,
                                   orden_nuevo: int) -> Dict[str, Any]:
         """
-        🔄 Intercambiar posiciones de dos pacientes en la cola del odontólogo.
-        Usa el método robusto de intercambio de valores de orden_cola_odontologo.
+        🔄 Mover un paciente en la cola del odontólogo (1 RPC atómica).
+
+        mover_consulta_en_cola bloquea la cola del día, la reindexa y mueve
+        la consulta (orden_nuevo - orden_actual) posiciones a partir de su
+        posición REAL en BD, en una sola transacción.
+
+        Returns:
+            {"success", "message", "orden_anterior", "orden_nuevo", "reindexadas",
+             "cola": [{"id": str, "orden": int}, ...]}  # cola completa resultante
         """
         try:
             self.require_permission("consultas", "actualizar")
@@ -482,91 +459,45 @@ class ConsultasService(BaseService):
             if orden_actual == orden_nuevo:
                 return {"success": False, "message": "Las posiciones son iguales."}
 
-            await self.reindexar_cola_doctor(odontologo_id)
-            
-            consultas_doctor: List[ConsultaModel] = await self.get_today_consultations(odontologo_id)
-
-            cola_activa = [
-                c for c in consultas_doctor
-                if c.estado in ["programada", "en_espera"] and c.primer_odontologo_id == odontologo_id
-            ]
-            cola_activa.sort(key=lambda c: c.orden_cola_odontologo or 0)
-
-            consulta_a_mover = next((c for c in cola_activa if c.id == consulta_id), None)
-            consulta_destino = next((c for c in cola_activa if c.orden_cola_odontologo == orden_nuevo), None)
-
-            if not consulta_a_mover:
-                return {"success": False, "message": "Consulta a mover no encontrada en la cola activa."}
-            if not consulta_destino:
-                # Si falla aquí tras la reindexación, es un error de límite o DB.
-                return {"success": False, "message": f"No hay consulta en la posición destino ({orden_nuevo})."}
-
-            response1 = self.client.table("consulta").update({
-                "orden_cola_odontologo": consulta_destino.orden_cola_odontologo
-            }).eq("id", consulta_a_mover.id).execute()
-            resultado_1 = response1.data[0] if response1.data else None
-
-            response2 = self.client.table("consulta").update({
-                "orden_cola_odontologo": consulta_a_mover.orden_cola_odontologo
-            }).eq("id", consulta_destino.id).execute()
-            resultado_2 = response2.data[0] if response2.data else None
-
-            if resultado_1 and resultado_2:
-                logger.info(f"✅ Intercambio exitoso: {consulta_a_mover.paciente_nombre} ↔ {consulta_destino.paciente_nombre}")
-                return {"success": True, "message": f"Paciente {consulta_a_mover.paciente_nombre} movido a posición {orden_nuevo}"}
-            else:
-                raise ValueError("Error actualizando posiciones en la base de datos. Falla en el UPDATE.")
+            response = self.client.rpc("mover_consulta_en_cola", {
+                "p_consulta_id": consulta_id,
+                "p_desplazamiento": orden_nuevo - orden_actual,
+                "p_fecha": date.today().isoformat()
+            }).execute()
+
+            resultado = response.data or {}
+            if resultado.get("success"):
+                logger.info(
+                    f"✅ Cola de {odontologo_id}: consulta {consulta_id} "
+                    f"{resultado.get('orden_anterior')} → {resultado.get('orden_nuevo')}"
+                )
+            return {
+                "success": bool(resultado.get("success")),
+                "message": resultado.get("message", "Error desconocido"),
+                "orden_anterior": resultado.get("orden_anterior"),
+                "orden_nuevo": resultado.get("orden_nuevo"),
+                "reindexadas": int(resultado.get("reindexadas") or 0),
+                "cola": resultado.get("cola") or []
+            }
 
         except PermissionError:
             logger.warning("Usuario sin permisos para reordenar cola")
             return {"success": False, "message": "Permiso denegado."}
         except Exception as e:
             logger.error(f"❌ Error intercambiando orden en cola: {str(e)}")
-            # Aquí puedes llamar a self.handle_error si es una función de tu clase
             return {"success": False, "message": f"Error inesperado: {str(e)}"}
 
     async def reindexar_cola_doctor(self, odontologo_id: str) -> bool:
-        """Sanea la columna 'orden_cola_odontologo' del doctor a 1, 2, 3..."""
+        """Sanea la columna 'orden_cola_odontologo' del doctor a 1, 2, 3... (1 sentencia en BD)"""
         try:
-            logger.info(f"🔄 Saneando/Reindexando cola para odontólogo: {odontologo_id}")
-            
-            # 1. Obtener todas las consultas en cola para ese odontólogo HOY.
-            # Usa el método que trae las consultas del día (asume que están ordenadas por orden_llegada si la orden_cola es None)
-            consultas_raw: List[ConsultaModel] = await self.get_today_consultations(odontologo_id)
-            
-            # 2. Filtrar solo las que están en el estado de cola.
-            cola_activa = [
-                c for c in consultas_raw
-                if c.estado in ["programada", "en_espera"] and c.primer_odontologo_id == odontologo_id
-            ]
-            
-            # 3. Ordenar por la hora de llegada (fecha_llegada) como criterio secundario
-            # y por el orden_cola_odontologo actual como criterio principal.
-            cola_activa.sort(key=lambda c: (c.orden_cola_odontologo or 99999, c.fecha_llegada))
-            
-            updates = []
-            
-            # 4. Iterar y crear una lista de actualizaciones (i+1)
-            for i, consulta in enumerate(cola_activa, 1):
-                if consulta.orden_cola_odontologo != i:
-                    updates.append({
-                        "id": consulta.id,
-                        "orden_cola_odontologo": i
-                    })
-            
-            # 5. Ejecutar la actualización en masa (bucle de updates)
-            if updates:
-                for item in updates:
-                    self.client.table("consulta").update({
-                        "orden_cola_odontologo": item["orden_cola_odontologo"]
-                    }).eq("id", item["id"]).execute()
-
-                logger.info(f"✅ Reindexación completa. {len(updates)} consultas reordenadas.")
-            else:
-                logger.info("✅ Cola ya estaba saneada. No se requirieron cambios.")
-                
+            response = self.client.rpc("reindexar_cola_odontologo", {
+                "p_odontologo_id": odontologo_id,
+                "p_fecha": date.today().isoformat()
+            }).execute()
+
+            logger.info(f"✅ Reindexación de cola {odontologo_id}: {response.data or 0} consultas reordenadas")
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ Fallo crítico en reindexación de cola: {str(e)}")
             return False
@@ -691,6 +622,7 @@ class ConsultasService(BaseService):
                 self.client.table("consulta").update(rollback_data).eq("id", consultation_id).execute()
                 raise ValueError("Error creando registro de pago")
 
+            cache_historial_pacientes.invalidar(paciente_id)
             logger.info(f"✅ Consulta completada + Pago {pago_creado.get('numero_recibo')} creado")
 
 
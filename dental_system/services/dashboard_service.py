@@ -226,8 +226,8 @@ class DashboardService(BaseService):
                 activos=stats.get("activos", 0),
                 hombres=stats.get("hombres", 0),
                 mujeres=stats.get("mujeres", 0),
+                edad_promedio=stats.get("edad_promedio", 0.0),
                 # Estadísticas adicionales (placeholder por ahora)
-                edad_promedio=0.0,
                 pacientes_con_email=0,
                 pacientes_con_telefono=0,
                 registros_ultima_semana=0
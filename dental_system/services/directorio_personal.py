@@ -0,0 +1,123 @@
+"""
+👨‍⚕️ DIRECTORIO DE PERSONAL EN MEMORIA
+=====================================
+
+La tabla personal tiene decenas de filas y casi nunca cambia, pero sus
+nombres y especialidades se pedían en cada fila de historial, ranking,
+consulta y acción (usuario → personal). Este directorio la carga
+completa UNA vez por proceso y la indexa por:
+
+- id de personal     (odontologo_id, primer_odontologo_id, ...)
+- id de usuario      (usuario autenticado → personal)
+
+Se recarga completo cuando:
+- una operación decorada con invalidate_after_staff_operation termina
+- pasan MODULE_CACHE_TTL['personal'] segundos
+- se busca un usuario que no está (personal creado desde otro proceso),
+  como máximo una vez cada RECARGA_MINIMA_SEGUNDOS
+
+USADO POR: PersonalService, PerfilService, OdontologiaService,
+           ConsultasService, PacientesService, PagosService, ReportesService
+"""
+
+from typing import Dict, List, Optional, Any
+import threading
+import time
+import logging
+
+from dental_system.supabase.client import get_client
+from .cache_invalidation_hooks import MODULE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre recargas disparadas por una búsqueda sin resultado
+RECARGA_MINIMA_SEGUNDOS = 30
+
+
+class DirectorioPersonal:
+    """
+    🗂️ Filas completas de personal indexadas por id y por usuario_id
+    """
+
+    def __init__(self, ttl: int = MODULE_CACHE_TTL['personal']):
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.por_id: Dict[str, Dict[str, Any]] = {}
+        self.por_usuario: Dict[str, Dict[str, Any]] = {}
+        self.cargado_en: Optional[float] = None
+        self.recargas = 0
+
+    # ==========================================
+    # 🔄 CARGA
+    # ==========================================
+
+    def _cargar(self):
+        """Leer la tabla personal completa (1 query) y reconstruir índices"""
+        response = get_client().table("personal").select("*").execute()
+        filas = response.data or []
+
+        self.por_id = {fila["id"]: fila for fila in filas if fila.get("id")}
+        self.por_usuario = {fila["usuario_id"]: fila for fila in filas if fila.get("usuario_id")}
+        self.cargado_en = time.time()
+        self.recargas += 1
+        logger.info(f"👨‍⚕️ Directorio de personal cargado: {len(self.por_id)} registros")
+
+    def _asegurar_cargado(self):
+        if self.cargado_en is None or time.time() - self.cargado_en > self.ttl:
+            self._cargar()
+
+    def invalidar(self):
+        """Forzar recarga en el próximo acceso (personal creado/modificado)"""
+        with self._lock:
+            self.cargado_en = None
+
+    # ==========================================
+    # 🔍 BÚSQUEDAS
+    # ==========================================
+
+    def get(self, personal_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Fila de personal por id (None si no existe)"""
+        if not personal_id:
+            return None
+        with self._lock:
+            self._asegurar_cargado()
+            return self.por_id.get(personal_id)
+
+    def get_por_usuario(self, usuario_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Fila de personal asociada a un usuario (None si no tiene)"""
+        if not usuario_id:
+            return None
+        with self._lock:
+            self._asegurar_cargado()
+            fila = self.por_usuario.get(usuario_id)
+            if fila is None and time.time() - self.cargado_en > RECARGA_MINIMA_SEGUNDOS:
+                self._cargar()
+                fila = self.por_usuario.get(usuario_id)
+            return fila
+
+    def personal_id_por_usuario(self, usuario_id: Optional[str]) -> Optional[str]:
+        fila = self.get_por_usuario(usuario_id)
+        return fila.get("id") if fila else None
+
+    def nombre(self, personal_id: Optional[str], default: str = "") -> str:
+        """'Primer nombre Primer apellido' del personal"""
+        fila = self.get(personal_id) or {}
+        return f"{fila.get('primer_nombre', '')} {fila.get('primer_apellido', '')}".strip() or default
+
+    def todos(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._asegurar_cargado()
+            return list(self.por_id.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "registros": len(self.por_id),
+                "recargas": self.recargas,
+                "edad_segundos": round(time.time() - self.cargado_en, 1) if self.cargado_en else None,
+                "ttl": self.ttl
+            }
+
+
+# Instancia global (una por proceso)
+directorio_personal = DirectorioPersonal()
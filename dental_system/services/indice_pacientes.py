@@ -0,0 +1,240 @@
+"""
+🔍 ÍNDICE EN MEMORIA PARA BÚSQUEDA RÁPIDA DE PACIENTES
+======================================================
+
+Índice de trigramas y prefijos compartido por todo el proceso, usado por
+el buscador del modal de nueva consulta.
+
+- Se construye una vez por proceso (todos los pacientes activos) en un
+  hilo aparte: post-login lo programa y la búsqueda nunca espera la carga
+- create_patient / update_patient lo actualizan de forma incremental
+- Una sola construcción a la vez; mientras corre se sigue respondiendo con
+  el índice anterior y los cambios incrementales se reaplican al terminar
+- Búsqueda sin acentos ni mayúsculas: intersección de trigramas + verificación
+
+USADO POR: PacientesService.buscar_pacientes_modal
+"""
+
+from typing import Callable, Dict, List, Optional, Set, Any
+import asyncio
+import threading
+import time
+import unicodedata
+import logging
+
+from dental_system.models import PacienteModel
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin acentos (González → gonzalez)"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def _trigramas(palabra: str) -> Set[str]:
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+class IndicePacientes:
+    """
+    🗂️ Índice invertido de pacientes activos
+
+    trigramas: trigrama → ids de pacientes con alguna palabra que lo contiene
+    prefijos:  primeras 2 letras de cada palabra → ids (términos cortos)
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.construido_en: float = 0.0
+        self.construyendo = False
+        self._cambios_durante_construccion: List[PacienteModel] = []
+        self._tareas: set = set()  # referencias fuertes a las tareas en vuelo
+        self.pacientes: Dict[str, PacienteModel] = {}
+        self.textos: Dict[str, str] = {}
+        self.palabras: Dict[str, List[str]] = {}
+        self.trigramas: Dict[str, Set[str]] = {}
+        self.prefijos: Dict[str, Set[str]] = {}
+
+    @property
+    def construido(self) -> bool:
+        return self.construido_en > 0
+
+    # ==========================================
+    # 🏗️ CONSTRUCCIÓN Y ACTUALIZACIÓN
+    # ==========================================
+
+    def construir(self, pacientes: List[PacienteModel]):
+        """Reemplazar el índice completo (reaplica cambios hechos durante la carga)"""
+        with self._lock:
+            self.pacientes = {}
+            self.textos = {}
+            self.palabras = {}
+            self.trigramas = {}
+            self.prefijos = {}
+            for paciente in pacientes:
+                self._agregar(paciente)
+            for paciente in self._cambios_durante_construccion:
+                self._reemplazar(paciente)
+            self._cambios_durante_construccion = []
+            self.construido_en = time.time()
+        logger.info(f"🔍 Índice de pacientes construido: {len(self.pacientes)} pacientes")
+
+    def programar_construccion(self, cargador: Callable[[], List[PacienteModel]]) -> bool:
+        """
+        Construir en segundo plano con `cargador` (bloqueante, corre en un hilo)
+
+        Retorna False si ya hay una construcción en curso. Las búsquedas
+        siguen usando el índice actual hasta que termina.
+        """
+        with self._lock:
+            if self.construyendo:
+                return False
+            self.construyendo = True
+            self._cambios_durante_construccion = []
+
+        def _construir():
+            try:
+                self.construir(cargador())
+            except Exception as e:
+                logger.error(f"❌ Error construyendo índice de pacientes: {e}")
+            finally:
+                with self._lock:
+                    self.construyendo = False
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            threading.Thread(target=_construir, name="indice-pacientes", daemon=True).start()
+            return True
+
+        tarea = loop.create_task(asyncio.to_thread(_construir))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+        return True
+
+    def actualizar(self, paciente: PacienteModel):
+        """Insertar o reemplazar un paciente (los inactivos salen del índice)"""
+        if not paciente or not paciente.id:
+            return
+        with self._lock:
+            self._reemplazar(paciente)
+            if self.construyendo:
+                self._cambios_durante_construccion.append(paciente)
+
+    def _reemplazar(self, paciente: PacienteModel):
+        self._quitar(paciente.id)
+        if paciente.activo:
+            self._agregar(paciente)
+
+    def eliminar(self, paciente_id: str):
+        with self._lock:
+            self._quitar(paciente_id)
+
+    def _agregar(self, paciente: PacienteModel):
+        palabras = [
+            normalizar(p) for p in (
+                paciente.primer_nombre, paciente.segundo_nombre,
+                paciente.primer_apellido, paciente.segundo_apellido,
+                paciente.numero_documento, paciente.numero_historia
+            ) if p
+        ]
+        palabras = [w for p in palabras for w in p.split()]
+
+        self.pacientes[paciente.id] = paciente
+        self.palabras[paciente.id] = palabras
+        self.textos[paciente.id] = " ".join(palabras)
+
+        for palabra in palabras:
+            self.prefijos.setdefault(palabra[:2], set()).add(paciente.id)
+            for trigrama in _trigramas(palabra):
+                self.trigramas.setdefault(trigrama, set()).add(paciente.id)
+
+    def _quitar(self, paciente_id: str):
+        palabras = self.palabras.pop(paciente_id, None)
+        if palabras is None:
+            return
+        self.pacientes.pop(paciente_id, None)
+        self.textos.pop(paciente_id, None)
+
+        for palabra in palabras:
+            ids = self.prefijos.get(palabra[:2])
+            if ids is not None:
+                ids.discard(paciente_id)
+                if not ids:
+                    del self.prefijos[palabra[:2]]
+            for trigrama in _trigramas(palabra):
+                ids = self.trigramas.get(trigrama)
+                if ids is not None:
+                    ids.discard(paciente_id)
+                    if not ids:
+                        del self.trigramas[trigrama]
+
+    # ==========================================
+    # 🔍 BÚSQUEDA
+    # ==========================================
+
+    def buscar(self, termino: str, limite: int = 8) -> List[PacienteModel]:
+        """
+        Pacientes cuyo texto contiene TODAS las palabras del término
+
+        Palabras de 1-2 letras se buscan por prefijo; de 3 o más, por
+        intersección de trigramas y verificación de subcadena.
+        Primero los que empiezan por la primera palabra, luego por apellido.
+        """
+        consulta = normalizar(termino).split()
+        if not consulta:
+            return []
+
+        with self._lock:
+            candidatos: Optional[Set[str]] = None
+            for palabra in consulta:
+                if len(palabra) < 3:
+                    ids = {
+                        pid for prefijo, conjunto in self.prefijos.items()
+                        if prefijo.startswith(palabra) for pid in conjunto
+                    } if len(palabra) == 1 else set(self.prefijos.get(palabra, ()))
+                else:
+                    ids = None
+                    # Empezar por el trigrama menos frecuente
+                    for trigrama in sorted(_trigramas(palabra), key=lambda t: len(self.trigramas.get(t, ()))):
+                        conjunto = self.trigramas.get(trigrama)
+                        if not conjunto:
+                            return []
+                        ids = set(conjunto) if ids is None else ids & conjunto
+                        if not ids:
+                            return []
+
+                candidatos = ids if candidatos is None else candidatos & ids
+                if not candidatos:
+                    return []
+
+            primera = consulta[0]
+            resultados = []
+            for pid in candidatos:
+                palabras = self.palabras[pid]
+                texto = self.textos[pid]
+                if not all(
+                    (any(w.startswith(p) for w in palabras) if len(p) < 3 else p in texto)
+                    for p in consulta
+                ):
+                    continue
+                rango = 0 if texto.startswith(primera) else (1 if any(w.startswith(primera) for w in palabras) else 2)
+                resultados.append((rango, texto, pid))
+
+            resultados.sort()
+            return [self.pacientes[pid] for _, _, pid in resultados[:limite]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pacientes": len(self.pacientes),
+                "trigramas": len(self.trigramas),
+                "construido": self.construido,
+                "construyendo": self.construyendo
+            }
+
+
+# Instancia global (una por proceso)
+indice_pacientes = IndicePacientes()
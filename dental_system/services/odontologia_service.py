@@ -8,7 +8,7 @@ Arquitectura directa: paciente → condiciones_diente
 CAMBIOS PRINCIPALES:
 - ✅ Relación directa paciente_id en condiciones_diente
 - ✅ Campo activo (true/false) en vez de sistema de versiones
-- ✅ Auto-creación de odontograma al crear paciente (trigger SQL)
+- ✅ Odontograma disperso: solo se guardan superficies NO sanas ("sano" implícito)
 - ✅ Historial completo via activo = false
 
 FUNCIONALIDADES:
@@ -21,7 +21,19 @@ FUNCIONALIDADES:
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from .base_service import BaseService
+from .cache_historial_pacientes import cache_historial_pacientes
+from .cache_odontogramas import cache_odontogramas, version_odontograma
+from .prefetch_contexto_clinico import prefetch_contexto_clinico
+from .directorio_personal import directorio_personal
 from dental_system.supabase.client import supabase_client, get_client
+from dental_system.constants import HORIZONTE_HISTORIAL_DIENTE_DIAS, LOTE_COMPACTACION_DIENTE
+from dental_system.utils.odontograma_compacto import (
+    codificar_filas,
+    aplicar_cambios,
+    nombre_condicion,
+    ORDEN_DIENTES,
+    SUPERFICIES_POR_DIENTE
+)
 import logging
 import re
 
@@ -53,76 +65,151 @@ class OdontologiaServiceV2(BaseService):
     # 🦷 CARGAR ODONTOGRAMA ACTUAL
     # ==========================================
 
-    async def get_patient_odontogram(self, paciente_id: str) -> Dict[str, Any]:
+    async def get_patient_odontogram(self, paciente_id: str, forzar: bool = False) -> Dict[str, Any]:
         """
         📋 Obtener odontograma ACTUAL del paciente
 
-        SIMPLIFICADO: Query directo a condiciones_diente con activo = TRUE
+        DISPERSO: en BD solo hay filas activas para superficies NO sanas;
+        las que faltan se rellenan con "sano" al codificar.
+
+        CACHE: primero se consulta solo la versión (count + última fecha);
+        si coincide con la del cache no se descargan las filas.
 
         Args:
             paciente_id: ID del paciente (UUID)
+            forzar: Ignorar el cache y recargar completo
 
         Returns:
             {
-                "conditions": {
-                    11: {"oclusal": "sano", "mesial": "sano", ...},
-                    12: {"oclusal": "obturacion", "mesial": "caries", ...},
-                    ...
-                },
-                "total_dientes": 32,
-                "total_condiciones": 160,
+                "codigos": [0, 0, 2, 1, 0, ...],  # 160 códigos (ver utils/odontograma_compacto)
+                "total_dientes": 3,          # dientes con alguna condición
+                "total_condiciones": 5,      # superficies no sanas
                 "fecha_ultima_actualizacion": "2025-10-07T10:30:00"
             }
         """
         try:
+            if not forzar:
+                version = self._get_version_odontograma(paciente_id)
+                cacheado = cache_odontogramas.get(paciente_id, version) if version else None
+                if cacheado:
+                    logger.info(f"⚡ Odontograma de {paciente_id} sin cambios (versión {version}), usando cache")
+                    return cacheado
+
             logger.info(f"📋 Cargando odontograma actual para paciente {paciente_id}")
 
-            # Query simple: solo condiciones activas
+            # Query simple: solo condiciones activas (las no sanas)
             response = self.client.table("diente").select(
-                "diente_numero, superficie, tipo_condicion, color_hex, fecha_registro"
+                "diente_numero, superficie, tipo_condicion, fecha_registro"
             ).eq("paciente_id", paciente_id).eq("activo", True).execute()
 
-            if not response.data:
-                logger.warning(f"⚠️ Paciente {paciente_id} sin odontograma. Se creará automáticamente al crear paciente.")
-                return {
-                    "conditions": {},
-                    "total_dientes": 0,
-                    "total_condiciones": 0,
-                    "mensaje": "Odontograma no inicializado"
-                }
+            # Arreglo fijo 32 × 5, "sano" donde no hay fila (el color se obtiene en la UI a partir del status)
+            codigos = codificar_filas(response.data or [])
 
-            # Organizar por diente y superficie
-            conditions = {}
-            fecha_mas_reciente = None
-            
-            for cond in response.data:
-                diente = cond['diente_numero']
-                superficie = cond['superficie']
+            # Tracking fecha más reciente
+            fechas = [cond['fecha_registro'] for cond in response.data or [] if cond.get('fecha_registro')]
+            fecha_mas_reciente = max(fechas) if fechas else None
 
-                if diente not in conditions:
-                    conditions[diente] = {}
+            total_condiciones = len(response.data or [])
+            total_dientes = len({cond['diente_numero'] for cond in response.data or []})
+            logger.info(f"✅ Odontograma cargado: {total_dientes} dientes con condiciones, {total_condiciones} superficies no sanas")
 
-                # SIMPLIFICADO: Solo almacenar el string de condición
-                # El color se obtiene dinámicamente en get_surface_color()
-                conditions[diente][superficie] = cond['tipo_condicion']
+            resultado = {
+                "codigos": codigos,
+                "total_dientes": total_dientes,
+                "total_condiciones": total_condiciones,
+                "fecha_ultima_actualizacion": fecha_mas_reciente
+            }
+            cache_odontogramas.set(
+                paciente_id, version_odontograma(total_condiciones, fecha_mas_reciente), resultado
+            )
+            return resultado
 
-                # Tracking fecha más reciente
-                fecha = cond.get('fecha_registro')
-                if fecha and (not fecha_mas_reciente or fecha > fecha_mas_reciente):
-                    fecha_mas_reciente = fecha
+        except Exception as e:
+            logger.error(f"❌ Error cargando odontograma: {str(e)}")
+            raise ValueError(f"Error al cargar odontograma: {str(e)}")
 
-            logger.info(f"✅ Odontograma cargado: {len(conditions)} dientes, {len(response.data)} condiciones")
+    # ==========================================
+    # 🕰️ ODONTOGRAMA EN UNA FECHA
+    # ==========================================
+
+    async def get_odontograma_en_fecha(self, paciente_id: str, fecha: str) -> Dict[str, Any]:
+        """
+        🕰️ Reconstruir el odontograma del paciente tal como estaba en `fecha`
+
+        2 queries: el snapshot más reciente <= fecha (odontograma_snapshot)
+        + los cambios posteriores hasta la fecha (vista_historial_diente,
+        incluye historial archivado), reproducidos en orden.
+
+        Args:
+            paciente_id: ID del paciente
+            fecha: Fecha/hora ISO de corte (ej. fecha de una intervención)
+
+        Returns:
+            {
+                "codigos": [...160 códigos...],
+                "fecha": "2025-09-01T00:00:00",
+                "fecha_snapshot": "2025-08-20T10:12:00" | None,
+                "cambios_reproducidos": 3
+            }
+        """
+        try:
+            snapshot_response = self.client.table("odontograma_snapshot").select(
+                "fecha_corte, condiciones"
+            ).eq("paciente_id", paciente_id
+            ).lte("fecha_corte", fecha
+            ).order("fecha_corte", desc=True
+            ).order("creado_en", desc=True
+            ).limit(1).execute()
+
+            snapshot = snapshot_response.data[0] if snapshot_response.data else None
+
+            delta_query = self.client.table("vista_historial_diente").select(
+                "diente_numero, superficie, tipo_condicion, fecha_registro"
+            ).eq("paciente_id", paciente_id).lte("fecha_registro", fecha)
+            if snapshot:
+                delta_query = delta_query.gt("fecha_registro", snapshot["fecha_corte"])
+            delta_response = delta_query.order("fecha_registro").execute()
+            cambios = delta_response.data or []
+
+            base = codificar_filas(snapshot.get("condiciones") or []) if snapshot else None
+            codigos = aplicar_cambios(base or [], cambios)
+
+            logger.info(
+                f"🕰️ Odontograma de {paciente_id} al {fecha}: snapshot "
+                f"{snapshot['fecha_corte'] if snapshot else 'ninguno'} + {len(cambios)} cambios"
+            )
 
             return {
-                "conditions": conditions,
-                "total_dientes": len(conditions),
-                "total_condiciones": len(response.data),
-                "fecha_ultima_actualizacion": fecha_mas_reciente
+                "codigos": codigos,
+                "fecha": fecha,
+                "fecha_snapshot": snapshot["fecha_corte"] if snapshot else None,
+                "cambios_reproducidos": len(cambios)
             }
 
         except Exception as e:
-            logger.error(f"❌ Error cargando odontograma: {str(e)}")
-            raise ValueError(f"Error al cargar odontograma: {str(e)}")
+            self.handle_error("Error reconstruyendo odontograma en fecha", e)
+            raise ValueError(f"Error inesperado: {str(e)}")
+
+    def _get_version_odontograma(self, paciente_id: str) -> Optional[str]:
+        """
+        🔎 Versión actual del odontograma sin descargarlo
+
+        1 fila (la más reciente) + count de condiciones activas.
+        None si la verificación falla (se recarga completo).
+        """
+        try:
+            response = self.client.table("diente").select(
+                "fecha_registro", count="exact"
+            ).eq("paciente_id", paciente_id
+            ).eq("activo", True
+            ).order("fecha_registro", desc=True
+            ).limit(1).execute()
+
+            fecha = response.data[0].get("fecha_registro") if response.data else None
+            return version_odontograma(response.count or 0, fecha)
+        except Exception as e:
+            logger.warning(f"Error verificando versión del odontograma: {e}")
+            return None
 
     # ==========================================
     # ✏️ ACTUALIZAR CONDICIÓN DE DIENTE
@@ -141,9 +228,11 @@ class OdontologiaServiceV2(BaseService):
         """
         ✏️ Actualizar condición de un diente
 
-        SIMPLIFICADO: Usa función SQL que automáticamente:
+        SIMPLIFICADO: Usa función SQL (delega en actualizar_condiciones_batch) que:
         1. Marca condición anterior como activo = FALSE (historial)
-        2. Crea nueva condición con activo = TRUE
+        2. Crea la nueva condición: activo = TRUE, salvo "sano", que queda
+           con activo = FALSE solo como historial (odontograma disperso:
+           una superficie sin fila activa es sana)
 
         Args:
             paciente_id: ID del paciente
@@ -173,6 +262,8 @@ class OdontologiaServiceV2(BaseService):
             }).execute()
 
             nueva_condicion_id = result.data
+            cache_odontogramas.invalidar([paciente_id])
+            prefetch_contexto_clinico.invalidar(paciente_id)
 
             logger.info(f"✅ Condición actualizada correctamente: {nueva_condicion_id}")
 
@@ -200,7 +291,8 @@ class OdontologiaServiceV2(BaseService):
         """
         📜 Obtener historial COMPLETO de un diente
 
-        Incluye condiciones activas E históricas (activo = true y false)
+        Incluye condiciones activas E históricas (activo = true y false),
+        también las ya archivadas (vista_historial_diente)
 
         Args:
             paciente_id: ID del paciente
@@ -212,14 +304,14 @@ class OdontologiaServiceV2(BaseService):
         try:
             logger.info(f"📜 Obteniendo historial del diente {diente_numero}")
 
-            response = self.client.table("diente").select("""
+            response = self.client.table("vista_historial_diente").select("""
                 id,
                 superficie,
                 tipo_condicion,
-                descripcion,
                 fecha_registro,
                 activo,
-                intervencion_id
+                intervencion_id,
+                archivado
             """).eq("paciente_id", paciente_id).eq(
                 "diente_numero", diente_numero
             ).order("fecha_registro", desc=True).execute()
@@ -232,7 +324,8 @@ class OdontologiaServiceV2(BaseService):
                     "condicion": cond['tipo_condicion'],
                     "descripcion": cond.get('descripcion'),
                     "es_actual": cond['activo'],
-                    "intervencion_id": cond.get('intervencion_id')
+                    "intervencion_id": cond.get('intervencion_id'),
+                    "archivado": cond.get('archivado', False)
                 })
 
             logger.info(f"✅ Historial obtenido: {len(historial)} registros")
@@ -253,7 +346,9 @@ class OdontologiaServiceV2(BaseService):
         """
         📊 Obtener intervenciones realizadas al paciente
 
-        Agrupa condiciones por intervención para mostrar "qué se hizo en cada visita"
+        Agrupa condiciones por intervención para mostrar "qué se hizo en cada visita".
+        Lee vista_historial_diente: incluye las intervenciones cuyas
+        condiciones ya fueron archivadas por compactar_historial_diente.
 
         Returns:
             Lista de intervenciones con dientes tratados
@@ -261,8 +356,8 @@ class OdontologiaServiceV2(BaseService):
         try:
             logger.info(f"📊 Obteniendo intervenciones del paciente {paciente_id}")
 
-            # Obtener todas las condiciones del paciente agrupadas por intervención
-            response = self.client.table("diente").select("""
+            # Condiciones del paciente (tabla viva + archivo) agrupadas por intervención
+            response = self.client.table("vista_historial_diente").select("""
                 intervencion_id,
                 diente_numero,
                 superficie,
@@ -321,98 +416,138 @@ class OdontologiaServiceV2(BaseService):
         📈 Estadísticas del odontograma actual
 
         Returns:
-            Conteo de dientes por condición
+            Conteo de superficies por condición ("sano" implícito incluido)
         """
         try:
             response = self.client.table("diente").select(
-                "tipo_condicion"
+                "diente_numero, superficie, tipo_condicion"
             ).eq("paciente_id", paciente_id).eq("activo", True).execute()
 
+            codigos = codificar_filas(response.data or [])
+
             # Contar por tipo de condición
             stats = {}
-            for cond in response.data:
-                tipo = cond['tipo_condicion']
+            for codigo in codigos:
+                tipo = nombre_condicion(codigo)
                 stats[tipo] = stats.get(tipo, 0) + 1
 
+            dientes_con_problemas = sum(
+                1 for i in range(len(ORDEN_DIENTES))
+                if any(codigos[i * SUPERFICIES_POR_DIENTE:(i + 1) * SUPERFICIES_POR_DIENTE])
+            )
+
             return {
-                "total_superficies": len(response.data),
+                "total_superficies": len(codigos),
                 "por_condicion": stats,
-                "dientes_sanos": stats.get("sano", 0) // 5,  # Aprox (5 superficies por diente)
-                "dientes_con_problemas": (len(response.data) - stats.get("sano", 0)) // 5
+                "dientes_sanos": len(ORDEN_DIENTES) - dientes_con_problemas,
+                "dientes_con_problemas": dientes_con_problemas
             }
 
         except Exception as e:
             logger.error(f"❌ Error obteniendo estadísticas: {str(e)}")
             return {}
 
+    # ==========================================
+    # 🗄️ ARCHIVO DEL HISTORIAL DE CONDICIONES
+    # ==========================================
+
+    async def compactar_historial_dientes(
+        self,
+        horizonte_dias: int = HORIZONTE_HISTORIAL_DIENTE_DIAS,
+        lote: int = LOTE_COMPACTACION_DIENTE
+    ) -> Dict[str, Any]:
+        """
+        🗄️ Mover historial viejo de diente a diente_historial (1 lote por llamada)
+
+        Solo filas inactivas con fecha_registro anterior al horizonte; el
+        odontograma activo y el historial reciente no se tocan.
+
+        Returns:
+            {"movidas", "pendientes", "horizonte_dias", "limite",
+             "indices_bytes_antes", "indices_bytes_despues",
+             "tabla_bytes_antes", "tabla_bytes_despues"}
+        """
+        try:
+            if horizonte_dias < 1:
+                raise ValueError("El horizonte debe ser de al menos 1 día")
+
+            response = self.client.rpc("compactar_historial_diente", {
+                "p_horizonte_dias": horizonte_dias,
+                "p_lote": lote
+            }).execute()
+            resultado = response.data or {}
+
+            logger.info(
+                f"🗄️ Historial de dientes compactado: {resultado.get('movidas', 0)} filas archivadas, "
+                f"{resultado.get('pendientes', 0)} pendientes (horizonte {horizonte_dias} días)"
+            )
+            return resultado
+
+        except ValueError:
+            raise
+        except Exception as e:
+            self.handle_error("Error compactando historial de dientes", e)
+            raise ValueError(f"Error inesperado: {str(e)}")
+
     # ==========================================
     # ✨ V3.0: CATÁLOGO DE CONDICIONES Y BATCH UPDATE
     # ==========================================
     
-    async def actualizar_condiciones_batch(self,actualizaciones: List[Dict[str, Any]]):
+    async def actualizar_condiciones_batch(self, actualizaciones: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        ✨ V3.0: Actualizar múltiples condiciones dentales en 1 transacción
+        ✨ Actualizar múltiples condiciones dentales en 1 transacción (1 RPC)
+
+        La función SQL actualizar_condiciones_batch():
+        1. Marca las condiciones vigentes como activo=FALSE (un UPDATE por conjuntos)
+        2. Inserta las nuevas condiciones (un INSERT multi-fila); las "sano"
+           quedan con activo=FALSE, solo como historial (odontograma disperso)
+        3. Si algo falla no se aplica ningún cambio
+
+        Args:
+            actualizaciones: [{"paciente_id", "diente_numero", "superficie",
+                               "tipo_condicion", "intervencion_id"}, ...]
 
-        Este método llama a la función SQL actualizar_condiciones_batch() que:
-        1. Marca condiciones anteriores como activo=FALSE (histórico)
-        2. Inserta nuevas condiciones como activo=TRUE
-        3. Todo en una sola transacción (atomicidad)
+        Returns:
+            {"exitosos": int, "desactivadas": int,
+             "condiciones": [{"id", "diente_numero", "superficie", "tipo_condicion"}, ...]}
         """
         try:
             if not actualizaciones:
                 logger.warning("⚠️ No hay actualizaciones para procesar")
-            logger.info(f"🔄 Procesando {len(actualizaciones)} actualizaciones en batch")
-
-            # Agregar registrado_por a cada actualización
-            for upd in actualizaciones:
-                upd["registrado_por"] = self.current_user_id or ""
-
-            # ✅ CORRECCIÓN: Enviar array de Python directamente
-            # Supabase convierte automáticamente a JSONB
-            print(f"🔧 DEBUG: Enviando {len(actualizaciones)} actualizaciones como array Python")
-            for i, upd in enumerate(actualizaciones, 1):
-                try:
-                    logger.info(f"\n📝 Procesando actualización {i}/{len(actualizaciones)}:")
-                    logger.info(f"   Diente: {upd.get('diente_numero')} - Superficie: {upd.get('superficie')}")
-                    logger.info(f"   Nueva condición: {upd.get('tipo_condicion')}")
-
-                    # PASO 1: Desactivar condición anterior (si existe)
-                    update_result = self.client.table('diente').update({
-                        'activo': False
-                    }).eq('paciente_id', upd['paciente_id'])\
-                      .eq('diente_numero', upd['diente_numero'])\
-                      .eq('superficie', upd['superficie'])\
-                      .eq('activo', True).execute()
-
-                    logger.info(f"   ✅ Desactivadas {len(update_result.data)} condiciones anteriores")
-
-                    # PASO 2: Insertar nueva condición (activa)
-                    nueva_condicion = {
-                        'paciente_id': upd['paciente_id'],
-                        'diente_numero': upd['diente_numero'],
-                        'superficie': upd['superficie'],
-                        'tipo_condicion': upd['tipo_condicion'],
-                        'intervencion_id': upd.get('intervencion_id'),
-                        'activo': True
-                    }
-
-                    insert_result = self.client.table('diente').insert(
-                        nueva_condicion
-                    ).execute()
+                return {"exitosos": 0, "desactivadas": 0, "condiciones": []}
 
-                    if insert_result.data:
-                        logger.info(f"   ✅ Nueva condición creada: {insert_result.data[0]['id']}")
-                    else:
-                        logger.warning(f"   ⚠️ No se obtuvo ID de la nueva condición")
+            logger.info(f"🔄 Procesando {len(actualizaciones)} actualizaciones en batch (RPC)")
 
-                except Exception as e:
-                    logger.error(f"   ❌ Error en actualización {i}: {str(e)}")
+            # Solo las columnas que usa la función (el resto se ignora)
+            payload = [
+                {
+                    "paciente_id": upd.get("paciente_id"),
+                    "diente_numero": upd.get("diente_numero"),
+                    "superficie": upd.get("superficie"),
+                    "tipo_condicion": upd.get("tipo_condicion"),
+                    "intervencion_id": upd.get("intervencion_id")
+                }
+                for upd in actualizaciones
+            ]
 
-            # Resultado final
-            logger.info(f"\n✅ Batch completado")
+            response = self.client.rpc(
+                "actualizar_condiciones_batch", {"actualizaciones": payload}
+            ).execute()
+            resultado = response.data or {"exitosos": 0, "desactivadas": 0, "condiciones": []}
+            pacientes = {upd["paciente_id"] for upd in payload}
+            cache_odontogramas.invalidar(pacientes)
+            for paciente_id in pacientes:
+                prefetch_contexto_clinico.invalidar(paciente_id)
+
+            logger.info(
+                f"✅ Batch completado: {resultado.get('exitosos', 0)} condiciones nuevas, "
+                f"{resultado.get('desactivadas', 0)} pasadas a historial"
+            )
+            return resultado
 
         except Exception as e:
-            logger.error(f"❌ Error en batch update: {str(e)}")
+            self.handle_error("Error en actualización batch del odontograma", e)
+            raise ValueError(f"Error inesperado: {str(e)}")
 
 
     # ==========================================
@@ -423,14 +558,16 @@ class OdontologiaServiceV2(BaseService):
         """
         💾 Crear intervención con múltiples servicios
 
-        ARQUITECTURA V2.0:
-        - Crea 1 registro en intervenciones
-        - Crea N registros en intervenciones_servicios (uno por diente/superficie)
-        - Usa campos actualizados: diente_numero, superficie
+        1 RPC (crear_intervencion_completa), todo o nada:
+        - Crea 1 registro en intervencion (personal resuelto desde el usuario)
+        - Crea N registros en historia_medica (uno por diente/superficie,
+          expandidos en la BD por conjuntos)
+        - Opcional: aplica cambios de odontograma y cambia el estado de la consulta
 
         Args:
             datos_intervencion: {
                 "consulta_id": str,
+                "paciente_id": str,    # Opcional (si falta se lee de la consulta)
                 "odontologo_id": str,  # ID del usuario (se convierte a personal_id)
                 "servicios": [
                     {
@@ -445,7 +582,9 @@ class OdontologiaServiceV2(BaseService):
                     }
                 ],
                 "observaciones_generales": str,
-                "requiere_control": bool
+                "requiere_control": bool,
+                "condiciones": [...],            # Opcional: cambios de odontograma
+                "nuevo_estado_consulta": str     # Opcional: "entre_odontologos"
             }
 
         Returns:
@@ -455,7 +594,9 @@ class OdontologiaServiceV2(BaseService):
                 "total_bs": float,
                 "total_usd": float,
                 "servicios_count": int,
-                "registros_creados": int
+                "registros_creados": int,
+                "condiciones_actualizadas": int,
+                "estado_consulta_actualizado": bool
             }
         """
         try:
@@ -474,221 +615,91 @@ class OdontologiaServiceV2(BaseService):
             if not odontologo_user_id:
                 raise ValueError("odontologo_id es requerido")
 
-            # === CONVERSIÓN USUARIO → PERSONAL ===
-            personal_response = self.client.table("personal").select("id").eq(
-                "usuario_id", odontologo_user_id
-            ).execute()
-
-            if not personal_response.data:
-                raise ValueError(f"No se encontró personal asociado al usuario {odontologo_user_id}")
-
-            personal_id = personal_response.data[0]["id"]
-            logger.info(f"🔄 Conversión: usuario {odontologo_user_id} → personal {personal_id}")
-
-            # === CALCULAR TOTALES ===
-            total_bs = sum(
-                float(servicio.get("precio_unitario_bs", 0)) * int(servicio.get("cantidad", 1))
-                for servicio in servicios
-            )
-            total_usd = sum(
-                float(servicio.get("precio_unitario_usd", 0)) * int(servicio.get("cantidad", 1))
-                for servicio in servicios
-            )
-
-            logger.info(f"💰 Totales calculados: BS {total_bs:,.2f}, USD ${total_usd:,.2f}")
-
-            # === RECOPILAR DIENTES ÚNICOS ===
-            # ✅ CORRECCIÓN V2.2: Diferenciar entre boca completa y dientes específicos
-            dientes_todos = []
-            tiene_boca_completa = False
+            # La RPC también cambia el estado de la consulta
+            if datos_intervencion.get("nuevo_estado_consulta"):
+                self.require_permission("consultas", "actualizar")
 
+            # === NORMALIZAR SERVICIOS (dientes y superficies ya parseados) ===
+            # La expansión diente × superficie la hace la BD por conjuntos
+            servicios_rpc = []
             for servicio in servicios:
                 alcance = servicio.get("alcance", "superficie_especifica")
+                dientes: List[int] = []
+                superficies: List[str] = []
+
+                if alcance != "boca_completa":
+                    dientes_texto = servicio.get("dientes_texto") or ""
+                    if dientes_texto.strip():
+                        try:
+                            dientes = sorted(set(self._extraer_numeros_dientes(dientes_texto)))
+                        except Exception as e:
+                            logger.warning(f"Error parseando dientes '{dientes_texto}': {e}")
+                    if not dientes:
+                        logger.warning(f"⚠️ Servicio {alcance} sin dientes específicos: {servicio.get('servicio_id')}")
+
+                if alcance == "superficie_especifica":
+                    # Sin superficie específica se asume oclusal
+                    superficies = self._mapear_superficie_especifica(servicio.get("superficie") or "") or ["oclusal"]
+
+                servicios_rpc.append({
+                    "servicio_id": servicio.get("servicio_id"),
+                    "cantidad": int(servicio.get("cantidad", 1)),
+                    "precio_unitario_bs": float(servicio.get("precio_unitario_bs", 0)),
+                    "precio_unitario_usd": float(servicio.get("precio_unitario_usd", 0)),
+                    "alcance": alcance,
+                    "dientes": dientes,
+                    "superficies": superficies
+                })
 
-                # Detectar si algún servicio es de boca completa
-                if alcance == "boca_completa":
-                    tiene_boca_completa = True
-                    continue  # No agregar dientes individuales
-
-                # Para diente_completo y superficie_especifica, agregar dientes
-                dientes_texto = servicio.get("dientes_texto", "")
-                if dientes_texto.strip():
-                    try:
-                        dientes_servicio = self._extraer_numeros_dientes(dientes_texto)
-                        dientes_todos.extend(dientes_servicio)
-                    except Exception as e:
-                        logger.warning(f"Error parseando dientes '{dientes_texto}': {e}")
-
-            # Determinar valor final de dientes_afectados
-            if tiene_boca_completa:
-                dientes_unicos = None  # NULL = boca completa
-                logger.info(f"🦷 Dientes afectados: BOCA COMPLETA (NULL)")
-            else:
-                dientes_unicos = sorted(list(set(dientes_todos))) if dientes_todos else []
-                logger.info(f"🦷 Dientes afectados específicos: {dientes_unicos}")
-
-            # === CREAR INTERVENCIÓN PRINCIPAL ===
-            # 🔧 NOTA: No incluimos fecha_inicio/fecha_fin/hora_inicio/hora_fin
-            # Supabase usará los valores por defecto de la tabla
-            intervencion_data = {
-                "consulta_id": consulta_id,
-                "odontologo_id": personal_id,
-                "procedimiento_realizado": datos_intervencion.get(
+            # === UNA SOLA TRANSACCIÓN EN BD ===
+            # personal + intervención + historia_medica + odontograma + estado consulta
+            response = self.client.rpc("crear_intervencion_completa", {
+                "p_consulta_id": consulta_id,
+                "p_usuario_id": odontologo_user_id,
+                "p_procedimiento": datos_intervencion.get(
                     "observaciones_generales",
                     f"Intervención con {len(servicios)} servicios"
                 ),
-                "total_bs": float(total_bs),
-                "total_usd": float(total_usd),
-                "estado": "completada"
-            }
-
-            nueva_intervencion = self.client.table("intervencion").insert(
-                intervencion_data
-            ).execute()
+                "p_servicios": servicios_rpc,
+                "p_condiciones": datos_intervencion.get("condiciones") or [],
+                "p_nuevo_estado_consulta": datos_intervencion.get("nuevo_estado_consulta")
+            }).execute()
 
-            if not nueva_intervencion.data:
+            resultado = response.data
+            if not resultado or not resultado.get("intervencion_id"):
                 raise ValueError("Error creando intervención principal")
 
-            intervencion_id = nueva_intervencion.data[0]["id"]
-            logger.info(f"✅ Intervención principal creada: {intervencion_id}")
-
-            # === CREAR REGISTROS EN INTERVENCIONES_SERVICIOS ===
-            # ✅ CORRECCIÓN V2.2: Lógica diferenciada por alcance del servicio
-            registros_creados = 0
+            registros_creados = int(resultado.get("registros_creados", 0))
+            logger.info(
+                f"✅ Intervención {resultado['intervencion_id']} creada: {registros_creados} registros de servicios, "
+                f"BS {float(resultado.get('total_bs', 0)):,.2f} / USD ${float(resultado.get('total_usd', 0)):,.2f}"
+            )
 
-            for servicio in servicios:
-                try:
-                    servicio_id = servicio.get("servicio_id")
-                    precio_unitario_bs = float(servicio.get("precio_unitario_bs", 0))
-                    precio_unitario_usd = float(servicio.get("precio_unitario_usd", 0))
-                    alcance = servicio.get("alcance", "superficie_especifica")
-
-                    # Preparar observaciones base (incluir material)
-                    observaciones_base = servicio.get("observaciones", "")
-                    material = servicio.get("material_utilizado", "")
-
-                    # ✅ ESCENARIO 1: BOCA COMPLETA (Blanqueamiento, Limpieza General)
-                    if alcance == "boca_completa":
-                        observaciones_completa = "Servicio aplicado a boca completa."
-                        if material:
-                            observaciones_completa += f" Material: {material}."
-                        if observaciones_base:
-                            observaciones_completa += f" {observaciones_base}"
-
-                        # UN SOLO REGISTRO con diente_numero=NULL, superficie=NULL
-                        registro = {
-                            "intervencion_id": intervencion_id,
-                            "servicio_id": servicio_id,
-                            "precio_unitario_bs": precio_unitario_bs,
-                            "precio_unitario_usd": precio_unitario_usd,
-                            "precio_total_bs": precio_unitario_bs,
-                            "precio_total_usd": precio_unitario_usd,
-                            "diente_numero": None,  # NULL = boca completa
-                            "superficie": None      # NULL = todas las superficies
-                        }
-
-                        response = self.client.table("historia_medica").insert(registro).execute()
-                        if response.data:
-                            registros_creados += 1
-                            logger.info(f"✅ Servicio boca completa creado: {servicio_id}")
-
-                    # ✅ ESCENARIO 2: DIENTE COMPLETO (Obturación, Corona, Extracción)
-                    elif alcance == "diente_completo":
-                        dientes_texto = servicio.get("dientes_texto", "")
-                        dientes_servicio = []
-                        if dientes_texto.strip():
-                            dientes_servicio = self._extraer_numeros_dientes(dientes_texto)
-
-                        if not dientes_servicio:
-                            logger.warning(f"⚠️ Servicio diente_completo sin dientes específicos: {servicio_id}")
-                            continue
-
-                        # UN REGISTRO por cada diente con superficie=NULL
-                        for diente_num in dientes_servicio:
-                            observaciones_completa = f"Servicio aplicado a diente {diente_num} completo."
-                            if material:
-                                observaciones_completa += f" Material: {material}."
-                            if observaciones_base:
-                                observaciones_completa += f" {observaciones_base}"
-
-                            registro = {
-                                "intervencion_id": intervencion_id,
-                                "servicio_id": servicio_id,
-                                "precio_unitario_bs": precio_unitario_bs,
-                                "precio_unitario_usd": precio_unitario_usd,
-                                "precio_total_bs": precio_unitario_bs,
-                                "precio_total_usd": precio_unitario_usd,
-                                "diente_numero": diente_num,
-                                "superficie": None  # NULL = diente completo
-                            }
-
-                            response = self.client.table("historia_medica").insert(registro).execute()
-                            if response.data:
-                                registros_creados += 1
-                                logger.debug(f"✅ Servicio diente completo creado: {diente_num}")
-
-                    # ✅ ESCENARIO 3: SUPERFICIE ESPECÍFICA (Caries, Resina)
-                    else:  # superficie_especifica
-                        dientes_texto = servicio.get("dientes_texto", "")
-                        dientes_servicio = []
-                        if dientes_texto.strip():
-                            dientes_servicio = self._extraer_numeros_dientes(dientes_texto)
-
-                        if not dientes_servicio:
-                            logger.warning(f"⚠️ Servicio superficie_especifica sin dientes: {servicio_id}")
-                            continue
-
-                        # Parsear superficies específicas (sin expansión)
-                        superficie_str = servicio.get("superficie", "")
-                        superficies = self._mapear_superficie_especifica(superficie_str)
-
-                        if not superficies:
-                            # Fallback: Si no hay superficie, asumir "oclusal"
-                            superficies = ["oclusal"]
-                            logger.debug(f"⚠️ Sin superficie específica, usando oclusal por defecto")
-
-                        # UN REGISTRO por cada combinación diente+superficie
-                        for diente_num in dientes_servicio:
-                            for superficie in superficies:
-                                observaciones_completa = f"Servicio aplicado a diente {diente_num}, superficie {superficie}."
-                                if material:
-                                    observaciones_completa += f" Material: {material}."
-                                if observaciones_base:
-                                    observaciones_completa += f" {observaciones_base}"
-
-                                registro = {
-                                    "intervencion_id": intervencion_id,
-                                    "servicio_id": servicio_id,
-                                    "precio_unitario_bs": precio_unitario_bs,
-                                    "precio_unitario_usd": precio_unitario_usd,
-                                    "precio_total_bs": precio_unitario_bs,
-                                    "precio_total_usd": precio_unitario_usd,
-                                    "diente_numero": diente_num,
-                                    "superficie": superficie
-                                }
-
-                                response = self.client.table("historia_medica").insert(registro).execute()
-                                if response.data:
-                                    registros_creados += 1
-                                    logger.debug(f"✅ Servicio superficie creado: {diente_num}-{superficie}")
-
-                except Exception as e:
-                    logger.error(f"❌ Error procesando servicio {servicio.get('servicio_id')}: {e}")
-                    continue
-
-            logger.info(f"📋 Registros creados en intervenciones_servicios: {registros_creados}")
+            # === INVALIDAR HISTORIAL DEL PACIENTE EN CACHE ===
+            cache_historial_pacientes.invalidar(resultado.get("paciente_id") or datos_intervencion.get("paciente_id"))
+            prefetch_contexto_clinico.invalidar(resultado.get("paciente_id") or datos_intervencion.get("paciente_id"))
+            if resultado.get("odontograma"):
+                cache_odontogramas.invalidar([resultado.get("paciente_id") or datos_intervencion.get("paciente_id")])
 
             # === RETORNAR RESULTADO ===
+            odontograma = resultado.get("odontograma") or {}
             return {
                 "success": True,
-                "intervencion_id": intervencion_id,
-                "total_bs": total_bs,
-                "total_usd": total_usd,
-                "servicios_count": len(servicios),
+                "intervencion_id": resultado["intervencion_id"],
+                "total_bs": float(resultado.get("total_bs", 0)),
+                "total_usd": float(resultado.get("total_usd", 0)),
+                "servicios_count": int(resultado.get("servicios_count", len(servicios))),
                 "registros_creados": registros_creados,
+                "condiciones_actualizadas": len(odontograma.get("condiciones", [])),
+                "estado_consulta_actualizado": bool(resultado.get("estado_consulta_actualizado")),
                 "message": f"Intervención creada con {registros_creados} registros de servicios"
             }
 
+        except PermissionError:
+            logger.warning("Usuario sin permisos para cambiar estado de consultas")
+            raise
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error creando intervención con servicios: {str(e)}")
             raise ValueError(f"Error inesperado: {str(e)}")
@@ -803,6 +814,10 @@ class OdontologiaServiceV2(BaseService):
         """
         Obtener historial de servicios del paciente (uno por card).
         Retorna lista ordenada por fecha (más reciente primero).
+
+        2 queries sin importar el tamaño: historia_medica + condiciones
+        aplicadas en bloque por intervención (odontólogo desde el directorio
+        de personal en memoria).
         """
         try:
             logger.info(f"📋 Cargando historial de servicios para paciente {paciente_id}")
@@ -830,11 +845,19 @@ class OdontologiaServiceV2(BaseService):
 
             logger.info(f"📊 Historial: {len(response.data)} registros encontrados")
 
+            condiciones = self._get_condiciones_por_intervenciones(
+                paciente_id,
+                {
+                    servicio_data["intervencion"]["id"]
+                    for servicio_data in response.data
+                    if servicio_data.get("diente_numero")
+                }
+            )
+
             servicios_historial = []
 
             for servicio_data in response.data:
-                odontologo_id = servicio_data["intervencion"]["odontologo_id"]
-                odontologo_info = await self._get_personal_info(odontologo_id)
+                odontologo_info = directorio_personal.get(servicio_data["intervencion"].get("odontologo_id")) or {}
 
                 superficies = []
                 if servicio_data.get("superficie"):
@@ -857,16 +880,11 @@ class OdontologiaServiceV2(BaseService):
                     "observaciones": servicio_data["intervencion"].get("procedimiento_realizado", "")
                 }
 
-                # Obtener condición aplicada si es un diente específico
+                # Condición aplicada si es un diente específico (join en memoria)
                 if servicio_data.get("diente_numero"):
-                    condicion = await self._get_condicion_por_intervencion(
-                        paciente_id,
-                        servicio_data.get("diente_numero"),
-                        servicio_data["intervencion"]["id"]
+                    item["condicion_aplicada"] = condiciones.get(
+                        (servicio_data["intervencion"]["id"], servicio_data["diente_numero"])
                     )
-                    if condicion:
-                        item["condicion_aplicada"] = condicion.get("tipo_condicion")
-                        item["material_utilizado"] = condicion.get("material_utilizado")
 
                 servicios_historial.append(item)
 
@@ -882,38 +900,38 @@ class OdontologiaServiceV2(BaseService):
             traceback.print_exc()
             return []
 
-    async def _get_personal_info(self, personal_id: str) -> Dict[str, Any]:
-        """🆕 Helper: Obtener info del personal desde vista"""
-        try:
-            response = self.client.table("personal").select(
-                "primer_nombre,primer_apellido, especialidad"
-            ).eq("id", personal_id).execute()
+    def _get_condiciones_por_intervenciones(
+        self,
+        paciente_id: str,
+        intervencion_ids: set
+    ) -> Dict[tuple, str]:
+        """
+        🆕 Helper: Condiciones aplicadas por un conjunto de intervenciones
 
-            return response.data[0] if response.data else {}
-        except Exception as e:
-            logger.warning(f"Error obteniendo info personal: {e}")
+        Sin filtrar activo: un resultado "sano" solo existe como historial
+        (odontograma disperso). Gana el registro más reciente.
+
+        Returns:
+            {(intervencion_id, diente_numero): tipo_condicion}
+        """
+        if not intervencion_ids:
             return {}
 
-    async def _get_condicion_por_intervencion(
-        self,
-        paciente_id: str,
-        diente_numero: int,
-        intervencion_id: str
-    ) -> Optional[Dict[str, Any]]:
-        """🆕 Helper: Obtener condición aplicada en una intervención específica"""
         try:
-            response = self.client.table("diente").select(
-                "tipo_condicion"
+            response = self.client.table("vista_historial_diente").select(
+                "intervencion_id, diente_numero, tipo_condicion"
             ).eq("paciente_id", paciente_id
-            ).eq("diente_numero", diente_numero
-            ).eq("intervencion_id", intervencion_id
-            ).eq("activo", True  # Solo la condición actual
+            ).in_("intervencion_id", list(intervencion_ids)
+            ).order("fecha_registro", desc=True
             ).execute()
 
-            return response.data[0] if response.data else None
+            condiciones = {}
+            for fila in response.data or []:
+                condiciones.setdefault((fila["intervencion_id"], fila["diente_numero"]), fila["tipo_condicion"])
+            return condiciones
         except Exception as e:
-            logger.warning(f"Error obteniendo condición: {e}")
-            return None
+            logger.warning(f"Error obteniendo condiciones: {e}")
+            return {}
 
     def _get_diente_nombre(self, diente_numero: Optional[int]) -> str:
         """🆕 Helper: Nombre legible del diente FDI"""
@@ -3,14 +3,56 @@ Servicio centralizado para gestión de pacientes
 Elimina duplicación entre boss_state y admin_state
 """
 
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import date, datetime, timedelta
 from .base_service import BaseService
-from dental_system.models import PacienteModel, PacienteFormModel,  HistorialCompletoPaciente,ConsultaHistorial,IntervencionHistorial,ServicioHistorial
+from .indice_pacientes import indice_pacientes
+from .cache_historial_pacientes import cache_historial_pacientes
+from .directorio_personal import directorio_personal
+from dental_system.models import PacienteModel, PacienteFormModel,  HistorialCompletoPaciente,ConsultaHistorial,IntervencionHistorial,ServicioHistorial, hidratar_pacientes
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Máximo de resultados por búsqueda de pacientes
+LIMITE_BUSQUEDA_PACIENTES = 50
+
+# Máximo de resultados de búsqueda en la lista paginada (la función SQL
+# devuelve hasta 200 + 1 fila para detectar truncado)
+LIMITE_BUSQUEDA_PAGINADA = 200
+
+# Columnas permitidas para ordenar la lista paginada
+COLUMNAS_ORDEN_PACIENTES = {"numero_historia", "primer_apellido", "primer_nombre", "fecha_registro", "fecha_nacimiento"}
+
+# Rangos de edad de los filtros (edad mínima, edad máxima inclusive)
+RANGOS_EDAD = {
+    "0-17": (0, 17),
+    "18-35": (18, 35),
+    "36-50": (36, 50),
+    "51-65": (51, 65),
+    "66+": (66, None)
+}
+
+# Columnas de la lista (sin arrays médicos ni contacto de emergencia)
+PACIENTES_LISTA_SELECT = (
+    "id, numero_historia, primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, "
+    "tipo_documento, numero_documento, fecha_nacimiento, genero, celular_1, celular_2, email, "
+    "ciudad, fecha_registro, fecha_actualizacion, activo"
+)
+
+# Columnas del historial clínico (consulta con pago embebido; odontólogos
+# desde el directorio de personal)
+HISTORIAL_CONSULTA_SELECT = (
+    "id, numero_consulta, fecha_llegada, estado, motivo_consulta, primer_odontologo_id, "
+    "pago(id, estado_pago, monto_pagado_usd, monto_pagado_bs, saldo_pendiente_usd, saldo_pendiente_bs)"
+)
+
+# Detalle de una intervención (servicios aplicados)
+HISTORIAL_INTERVENCION_SELECT = (
+    "id, odontologo_id, procedimiento_realizado, total_usd, total_bs, "
+    "historia_medica(precio_unitario_usd, precio_unitario_bs, servicio(nombre))"
+)
+
 class PacientesService(BaseService):
     """
     Servicio que maneja toda la lógica de pacientes
@@ -37,44 +79,34 @@ class PacientesService(BaseService):
             Lista de pacientes como modelos tipados
         """
         try:
-            # Construir query base
-            query = self.client.table("paciente").select("*")
+            if search and search.strip():
+                # Búsqueda difusa indexada (ya viene ordenada por relevancia)
+                pacientes_data, truncado = self.buscar_pacientes_rpc(search, genero, activos_only)
+                if truncado:
+                    logger.warning(
+                        f"Búsqueda '{search.strip()}' truncada a {LIMITE_BUSQUEDA_PACIENTES} pacientes; "
+                        "refinar el término para ver el resto"
+                    )
+            else:
+                # Construir query base
+                query = self.client.table("paciente").select("*")
 
-            # Aplicar filtros dinámicos
-            if activos_only is not None:
-                query = query.eq("activo", activos_only)
+                # Aplicar filtros dinámicos
+                if activos_only is not None:
+                    query = query.eq("activo", activos_only)
 
-            if genero and genero != "todos":
-                query = query.eq("genero", genero)
+                if genero and genero != "todos":
+                    query = query.eq("genero", genero)
 
-            if search and search.strip():
-                search_term = search.strip()
-                # Buscar en múltiples campos
-                query = query.or_(
-                    f"primer_nombre.ilike.%{search_term}%,"
-                    f"primer_apellido.ilike.%{search_term}%,"
-                    f"segundo_nombre.ilike.%{search_term}%,"
-                    f"segundo_apellido.ilike.%{search_term}%,"
-                    f"numero_documento.ilike.%{search_term}%,"
-                    f"numero_historia.ilike.%{search_term}%"
-                )
-
-            # Ordenar por número de historia descendente (más recientes primero)
-            query = query.order("numero_historia", desc=True)
+                # Ordenar por número de historia descendente (más recientes primero)
+                query = query.order("numero_historia", desc=True)
 
-            # Ejecutar query
-            response = query.execute()
-            pacientes_data = response.data if response.data else []
+                # Ejecutar query
+                response = query.execute()
+                pacientes_data = response.data if response.data else []
 
-            # Convertir a modelos tipados
-            pacientes_models = []
-            for item in pacientes_data:
-                try:
-                    model = PacienteModel.from_dict(item)
-                    pacientes_models.append(model)
-                except Exception as e:
-                    logger.warning(f"Error convirtiendo paciente: {e}")
-                    continue
+            # Convertir a modelos tipados (en lote)
+            pacientes_models = hidratar_pacientes(pacientes_data)
 
             logger.info(f"✅ Pacientes obtenidos: {len(pacientes_models)} registros")
             return pacientes_models
@@ -86,6 +118,254 @@ class PacientesService(BaseService):
             self.handle_error("Error obteniendo pacientes filtrados", e)
             return []
     
+    def buscar_pacientes_rpc(self,
+                             search: str,
+                             genero: str = None,
+                             activos_only: Optional[bool] = None,
+                             limite: int = LIMITE_BUSQUEDA_PACIENTES) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        🔍 Búsqueda difusa de pacientes con la función buscar_pacientes
+
+        Usa la columna nombre_busqueda (minúsculas, sin acentos) con índice
+        trigram: tolera acentos y errores ("Gonzales" encuentra "González").
+        También busca por prefijo de documento o número de historia.
+
+        Args:
+            search: Término de búsqueda
+            genero: Filtro por género (None o "todos" = sin filtro)
+            activos_only: Solo activos / solo inactivos / None = todos
+            limite: Máximo de resultados (hasta LIMITE_BUSQUEDA_PAGINADA)
+
+        Returns:
+            (filas de paciente ordenadas por relevancia, truncado)
+            truncado = True si había más de `limite` coincidencias
+        """
+        # Una fila extra para saber si el resultado se cortó
+        response = self.client.rpc("buscar_pacientes", {
+            "p_termino": search.strip(),
+            "p_genero": genero if genero and genero != "todos" else None,
+            "p_activo": activos_only,
+            "p_limite": limite + 1
+        }).execute()
+        filas = response.data if response.data else []
+        return filas[:limite], len(filas) > limite
+
+    def _rango_fechas_nacimiento(self, rango_edad: str) -> tuple:
+        """
+        📅 Convertir un rango de edad en límites de fecha_nacimiento
+
+        Returns:
+            (nacido_desde, nacido_hasta) en ISO; cualquiera puede ser None
+        """
+        limites = RANGOS_EDAD.get(rango_edad)
+        if not limites:
+            return None, None
+
+        hoy = date.today()
+        edad_min, edad_max = limites
+
+        def _restar_anios(anios: int) -> date:
+            try:
+                return hoy.replace(year=hoy.year - anios)
+            except ValueError:  # 29 de febrero
+                return hoy.replace(year=hoy.year - anios, day=28)
+
+        # edad >= edad_min  ⇔  nacido el o antes de hoy - edad_min años
+        nacido_hasta = _restar_anios(edad_min).isoformat()
+        # edad <= edad_max  ⇔  nacido después de hoy - (edad_max + 1) años
+        nacido_desde = (_restar_anios(edad_max + 1) + timedelta(days=1)).isoformat() if edad_max is not None else None
+        return nacido_desde, nacido_hasta
+
+    async def get_patients_page(self,
+                                search: str = None,
+                                genero: str = None,
+                                activos_only: Optional[bool] = None,
+                                rango_edad: str = None,
+                                orden: str = "numero_historia",
+                                descendente: bool = True,
+                                limit: int = 25,
+                                offset: int = 0,
+                                incluir_total: bool = True) -> Dict[str, Any]:
+        """
+        📄 Obtiene una página de pacientes con filtros y orden en el servidor
+
+        Sin búsqueda: query paginada con range() y conteo exacto solo si se pide.
+        Con búsqueda: resultados de buscar_pacientes (máx.
+        LIMITE_BUSQUEDA_PAGINADA, por relevancia) filtrados por edad y
+        paginados aquí; 'truncado' indica que hay más coincidencias.
+
+        Args:
+            search: Término de búsqueda
+            genero: Filtro por género (None o "todos" = sin filtro)
+            activos_only: Solo activos / solo inactivos / None = todos
+            rango_edad: "0-17", "18-35", "36-50", "51-65", "66+" (None o "todos" = sin filtro)
+            orden: Columna de orden (ver COLUMNAS_ORDEN_PACIENTES)
+            descendente: Dirección del orden
+            limit: Tamaño de página
+            offset: Desplazamiento
+            incluir_total: Si se debe contar el total de resultados
+
+        Returns:
+            {
+                'pacientes': List[PacienteModel],
+                'total': int o None (si no se contó),
+                'pagina_actual': int,
+                'truncado': bool (búsqueda cortada en LIMITE_BUSQUEDA_PAGINADA)
+            }
+        """
+        pagina_actual = (offset // limit) + 1 if limit > 0 else 1
+        truncado = False
+
+        try:
+            nacido_desde, nacido_hasta = self._rango_fechas_nacimiento(rango_edad)
+
+            if search and search.strip():
+                filas, truncado = self.buscar_pacientes_rpc(
+                    search, genero, activos_only, limite=LIMITE_BUSQUEDA_PAGINADA
+                )
+                if nacido_desde or nacido_hasta:
+                    filas = [
+                        f for f in filas
+                        if f.get("fecha_nacimiento")
+                        and (not nacido_desde or f["fecha_nacimiento"] >= nacido_desde)
+                        and (not nacido_hasta or f["fecha_nacimiento"] <= nacido_hasta)
+                    ]
+                total = len(filas)
+                filas = filas[offset:offset + limit]
+            else:
+                if incluir_total:
+                    query = self.client.table("paciente").select(PACIENTES_LISTA_SELECT, count="exact")
+                else:
+                    query = self.client.table("paciente").select(PACIENTES_LISTA_SELECT)
+
+                if activos_only is not None:
+                    query = query.eq("activo", activos_only)
+                if genero and genero != "todos":
+                    query = query.eq("genero", genero)
+                if nacido_desde:
+                    query = query.gte("fecha_nacimiento", nacido_desde)
+                if nacido_hasta:
+                    query = query.lte("fecha_nacimiento", nacido_hasta)
+
+                columna = orden if orden in COLUMNAS_ORDEN_PACIENTES else "numero_historia"
+                response = query.order(columna, desc=descendente).order("id").range(
+                    offset, offset + limit - 1
+                ).execute()
+
+                filas = response.data or []
+                total = response.count if incluir_total else None
+
+            pacientes_models = hidratar_pacientes(filas)
+
+            logger.info(f"✅ Página {pagina_actual} de pacientes: {len(pacientes_models)} registros")
+            return {
+                'pacientes': pacientes_models,
+                'total': total,
+                'pagina_actual': pagina_actual,
+                'truncado': truncado
+            }
+
+        except PermissionError:
+            logger.warning("Usuario sin permisos para acceder a pacientes")
+            raise
+        except Exception as e:
+            self.handle_error("Error obteniendo página de pacientes", e)
+            return {'pacientes': [], 'total': 0 if incluir_total else None, 'pagina_actual': pagina_actual, 'truncado': False}
+
+    async def get_patient_counters(self) -> Dict[str, int]:
+        """
+        🔢 Contadores para las cards y filtros de la página de pacientes
+
+        Returns:
+            {"total": int, "activos": int, "masculino": int, "femenino": int}
+        """
+        stats = await self.get_patient_stats()
+        return {
+            "total": stats.get("total", 0),
+            "activos": stats.get("activos", 0),
+            "masculino": stats.get("hombres", 0),
+            "femenino": stats.get("mujeres", 0)
+        }
+
+    async def get_pacientes_recientes(self, limite: int = 5) -> List[PacienteModel]:
+        """
+        🆕 Últimos pacientes registrados (actividad reciente del dashboard)
+
+        Query propia ordenada por fecha_registro: no depende de la página
+        que esté cargada en la lista de pacientes.
+
+        Args:
+            limite: Cantidad de pacientes
+
+        Returns:
+            Lista de pacientes del más reciente al más antiguo
+        """
+        try:
+            self.require_permission("pacientes", "leer")
+
+            response = self.client.table("paciente").select(PACIENTES_LISTA_SELECT).order(
+                "fecha_registro", desc=True
+            ).limit(limite).execute()
+
+            return hidratar_pacientes(response.data or [])
+
+        except PermissionError:
+            logger.warning("Usuario sin permisos para acceder a pacientes")
+            return []
+        except Exception as e:
+            self.handle_error("Error obteniendo pacientes recientes", e)
+            return []
+
+    def buscar_pacientes_modal(self, termino: str, limite: int = 8) -> List[PacienteModel]:
+        """
+        ⚡ Búsqueda instantánea de pacientes activos (modal de nueva consulta)
+
+        Solo consulta el índice en memoria del proceso; nunca va a la BD.
+        Si el índice aún no existe programa su construcción en segundo
+        plano y retorna vacío hasta que esté listo.
+
+        Args:
+            termino: Nombre, apellido, documento o número de historia (mín. 2 caracteres)
+            limite: Máximo de resultados
+
+        Returns:
+            Lista de pacientes ordenados por relevancia
+        """
+        termino = (termino or "").strip()
+        if len(termino) < 2:
+            return []
+
+        try:
+            if not indice_pacientes.construido:
+                self.precargar_indice_pacientes()
+            return indice_pacientes.buscar(termino, limite)
+
+        except Exception as e:
+            self.handle_error("Error buscando pacientes en el índice", e)
+            return []
+
+    def precargar_indice_pacientes(self):
+        """🏗️ Programar la construcción del índice en segundo plano (no-op si ya existe o está en curso)"""
+        if not indice_pacientes.construido:
+            indice_pacientes.programar_construccion(self._cargar_pacientes_activos)
+
+    def _cargar_pacientes_activos(self, tamano_bloque: int = 1000) -> List[PacienteModel]:
+        """Cargar todos los pacientes activos por bloques (bloqueante: corre en un hilo)"""
+        pacientes = []
+        offset = 0
+        while True:
+            response = self.client.table("paciente").select("*").eq("activo", True).order("numero_historia").range(
+                offset, offset + tamano_bloque - 1
+            ).execute()
+
+            bloque = response.data or []
+            pacientes.extend(hidratar_pacientes(bloque))
+            if len(bloque) < tamano_bloque:
+                break
+            offset += tamano_bloque
+
+        return pacientes
+
     async def create_patient(self, patient_form: PacienteFormModel, user_id: str) -> Optional[PacienteModel]:
         """
         Crea un nuevo paciente con modelo tipado
@@ -176,7 +456,8 @@ class PacientesService(BaseService):
             
             if result:
                 # Crear modelo tipado del resultado
-                paciente_model = PacienteModel.from_dict(result)    
+                paciente_model = PacienteModel.from_dict(result)
+                indice_pacientes.actualizar(paciente_model)
                 return paciente_model
             else:
                 raise ValueError("Error creando paciente en la base de datos")
@@ -272,7 +553,8 @@ class PacientesService(BaseService):
             result = update_response.data[0] if update_response.data else None
             
             if result:
-                paciente_model = PacienteModel.from_dict(result)    
+                paciente_model = PacienteModel.from_dict(result)
+                indice_pacientes.actualizar(paciente_model)
                 return paciente_model
 
             else:
@@ -318,45 +600,28 @@ class PacientesService(BaseService):
         """
         Obtiene estadísticas de pacientes
         Usado por dashboard_service pero disponible independientemente
+
+        Una sola llamada a estadisticas_pacientes(): los conteos, la edad
+        promedio y el histograma de edades se calculan en la BD.
         """
         try:
-            # Obtener todos los pacientes
-            response = self.client.table("paciente").select("*").execute()
-            pacientes_list = response.data if response.data else []
-
-            # Calcular estadísticas en Python
-            total = len(pacientes_list)
-            activos = len([p for p in pacientes_list if p.get("activo") == True])
-
-            # Contar por género
-            hombres = len([p for p in pacientes_list if p.get("genero") == "masculino"])
-            mujeres = len([p for p in pacientes_list if p.get("genero") == "femenino"])
-
-            # Calcular nuevos del mes (fecha_registro del mes actual)
-            from datetime import datetime
-            mes_actual = datetime.now().month
-            anio_actual = datetime.now().year
-            nuevos_mes = 0
-
-            for p in pacientes_list:
-                fecha_registro = p.get("created_at")
-                if fecha_registro:
-                    try:
-                        fecha = datetime.fromisoformat(fecha_registro.replace('Z', '+00:00'))
-                        if fecha.month == mes_actual and fecha.year == anio_actual:
-                            nuevos_mes += 1
-                    except:
-                        continue
+            response = self.client.rpc("estadisticas_pacientes", {}).execute()
+            datos = response.data or {}
 
             stats = {
-                "total": total,
-                "activos": activos,
-                "nuevos_mes": nuevos_mes,
-                "hombres": hombres,
-                "mujeres": mujeres
+                "total": int(datos.get("total", 0)),
+                "activos": int(datos.get("activos", 0)),
+                "nuevos_mes": int(datos.get("nuevos_mes", 0)),
+                "hombres": int(datos.get("hombres", 0)),
+                "mujeres": int(datos.get("mujeres", 0)),
+                "hombres_activos": int(datos.get("hombres_activos", 0)),
+                "mujeres_activas": int(datos.get("mujeres_activas", 0)),
+                "nuevos_mes_activos": int(datos.get("nuevos_mes_activos", 0)),
+                "edad_promedio": float(datos.get("edad_promedio", 0) or 0),
+                "histograma_edad": datos.get("histograma_edad", [])
             }
 
-            logger.info(f"✅ Estadísticas de pacientes obtenidas: {stats}")
+            logger.info(f"✅ Estadísticas de pacientes obtenidas: total={stats['total']}, activos={stats['activos']}")
             return stats
 
         except Exception as e:
@@ -366,7 +631,12 @@ class PacientesService(BaseService):
                 "nuevos_mes": 0,
                 "activos": 0,
                 "hombres": 0,
-                "mujeres": 0
+                "mujeres": 0,
+                "hombres_activos": 0,
+                "mujeres_activas": 0,
+                "nuevos_mes_activos": 0,
+                "edad_promedio": 0.0,
+                "histograma_edad": []
             }
 
 
@@ -374,7 +644,9 @@ class PacientesService(BaseService):
         """
         📋 Obtener historial completo del paciente con todas las consultas, intervenciones y servicios
 
-        Similar a get_consultas_pendientes_facturacion() de pagos.py pero más completo
+        Carga todo de una vez (exportes/reportes). La página de historial usa
+        get_resumen_historial_paciente + get_consultas_historial_page +
+        get_intervenciones_consulta_historial para cargar por partes.
 
         Args:
             paciente_id: ID del paciente
@@ -383,147 +655,38 @@ class PacientesService(BaseService):
             HistorialCompletoPaciente con todas las consultas y detalles
         """
         try:
-            
-
             logger.info(f"📋 Obteniendo historial completo para paciente {paciente_id}")
 
-            # Query completa con JOINs (similar a pagos.py línea 606)
-            query = self.client.table("consulta").select("""
-                id,
-                numero_consulta,
-                fecha_llegada,
-                estado,
-                motivo_consulta,
-                primer_odontologo_id,
-                personal!primer_odontologo_id(primer_nombre, primer_apellido),
-                intervencion(
-                    id,
-                    odontologo_id,
-                    procedimiento_realizado,
-                    total_usd,
-                    total_bs,
-                    personal!odontologo_id(primer_nombre, primer_apellido),
-                    historia_medica(
-                        precio_unitario_usd,
-                        precio_unitario_bs,
-                        servicio(nombre)
-                    )
-                ),
-                pago(
-                    id,
-                    estado_pago,
-                    monto_pagado_usd,
-                    monto_pagado_bs,
-                    saldo_pendiente_usd,
-                    saldo_pendiente_bs
-                )
-            """).eq("paciente_id", paciente_id).order("fecha_llegada", desc=True).execute()
+            query = self.client.table("consulta").select(
+                f"{HISTORIAL_CONSULTA_SELECT}, intervencion({HISTORIAL_INTERVENCION_SELECT})"
+            ).eq("paciente_id", paciente_id).order("fecha_llegada", desc=True).execute()
 
             if not query.data:
                 logger.info(f"No se encontraron consultas para paciente {paciente_id}")
                 return HistorialCompletoPaciente()
 
-            # Procesar consultas
             consultas_historial = []
-            total_consultas = 0
             total_intervenciones = 0
-            total_pagado_usd = 0.0
-            total_pagado_bs = 0.0
-            total_pendiente_usd = 0.0
-            total_pendiente_bs = 0.0
-
             for consulta_data in query.data:
-                total_consultas += 1
-                # Procesar intervenciones
-                intervenciones_list = []
-                for interv_data in consulta_data.get("intervenciones", []):
-                    total_intervenciones += 1
-
-                    # Procesar servicios de la intervención
-                    servicios_list = []
-                    for serv_data in interv_data.get("historia_medica", []):
-                        servicio = ServicioHistorial(
-                            nombre=serv_data.get("servicios", {}).get("nombre", "Servicio"),
-                            precio_unitario_usd=float(serv_data.get("precio_unitario_usd", 0)),
-                            precio_unitario_bs=float(serv_data.get("precio_unitario_bs", 0)),
-                        )
-                        servicios_list.append(servicio)
-
-                    # Obtener nombre del odontólogo
-                    personal_data = interv_data.get("personal", {})
-                    odontologo_nombre = f"{personal_data.get('primer_nombre', '')} {personal_data.get('primer_apellido', '')}".strip() or "Odontólogo"
-
-                    intervencion = IntervencionHistorial(
-                        id=interv_data.get("id", ""),
-                        odontologo_id=interv_data.get("odontologo_id", ""),
-                        odontologo_nombre=odontologo_nombre,
-                        procedimiento_realizado=interv_data.get("procedimiento_realizado", ""),
-                        total_usd=float(interv_data.get("total_usd", 0)),
-                        total_bs=float(interv_data.get("total_bs", 0)),
-                        servicios=servicios_list
-                    )
-                    intervenciones_list.append(intervencion)
-                # Procesar pago
-                pagos_data = consulta_data.get("pagos", [])
-                pago_info = pagos_data[0] if pagos_data else {}
-
-                pago_usd = float(pago_info.get("monto_pagado_usd", 0))
-                pago_bs = float(pago_info.get("monto_pagado_bs", 0))
-                saldo_usd = float(pago_info.get("saldo_pendiente_usd", 0))
-                saldo_bs = float(pago_info.get("saldo_pendiente_bs", 0))
-
-                total_pagado_usd += pago_usd
-                total_pagado_bs += pago_bs
-                total_pendiente_usd += saldo_usd
-                total_pendiente_bs += saldo_bs
-
-                # Determinar estado del pago
-                if saldo_usd <= 0 and saldo_bs <= 0:
-                    pago_estado = "completado"
-                elif pago_usd > 0 or pago_bs > 0:
-                    pago_estado = "parcial"
-                else:
-                    pago_estado = "pendiente"
-
-                # Calcular totales de la consulta
-                costo_total_usd = sum(i.total_usd for i in intervenciones_list)
-                costo_total_bs = sum(i.total_bs for i in intervenciones_list)
-
-                # Obtener nombre del odontólogo principal
-                personal_principal = consulta_data.get("personal", {})
-                odontologo_principal = f"{personal_principal.get('primer_nombre', '')} {personal_principal.get('primer_apellido', '')}".strip() or "No asignado"
-
-                consulta = ConsultaHistorial(
-                    id=consulta_data.get("id", ""),
-                    numero_consulta=consulta_data.get("numero_consulta", ""),
-                    fecha_llegada=consulta_data.get("fecha_llegada", ""),
-                    estado=consulta_data.get("estado", ""),
-                    motivo_consulta=consulta_data.get("motivo_consulta", ""),
-                    primer_odontologo_id=consulta_data.get("primer_odontologo_id", ""),
-                    primer_odontologo_nombre=odontologo_principal,
-                    intervenciones=intervenciones_list,
-                    costo_total_usd=costo_total_usd,
-                    costo_total_bs=costo_total_bs,
-                    pago_id=pago_info.get("id", ""),
-                    pago_estado=pago_estado,
-                    pago_usd=pago_usd,
-                    pago_bs=pago_bs,
-                    saldo_pendiente_usd=saldo_usd,
-                    saldo_pendiente_bs=saldo_bs
-                )
-                consultas_historial.append(consulta)
+                intervenciones_list = [
+                    self._construir_intervencion_historial(i) for i in consulta_data.get("intervencion") or []
+                ]
+                total_intervenciones += len(intervenciones_list)
+                consultas_historial.append(self._construir_consulta_historial(consulta_data, intervenciones_list))
+
+            # Totales de pagos desde el balance incremental (una sola fila)
+            balance = self._get_balance_paciente(paciente_id)
+
             historial = HistorialCompletoPaciente(
                 consultas=consultas_historial,
-                total_consultas=total_consultas,
+                total_consultas=len(consultas_historial),
                 total_intervenciones=total_intervenciones,
-                total_pagado_usd=total_pagado_usd,
-                total_pagado_bs=total_pagado_bs,
-                total_pendiente_usd=total_pendiente_usd,
-                total_pendiente_bs=total_pendiente_bs
+                total_pagado_usd=float(balance.get("total_pagado_usd", 0) or 0),
+                total_pagado_bs=float(balance.get("total_pagado_bs", 0) or 0),
+                total_pendiente_usd=float(balance.get("saldo_pendiente_usd", 0) or 0),
+                total_pendiente_bs=float(balance.get("saldo_pendiente_bs", 0) or 0)
             )
-            print("="*80)
-            print(historial.consultas[1])
-            logger.info(f"✅ Historial completo obtenido: {total_consultas} consultas, {total_intervenciones} intervenciones")
+            logger.info(f"✅ Historial completo obtenido: {len(consultas_historial)} consultas, {total_intervenciones} intervenciones")
             return historial
 
         except Exception as e:
@@ -531,6 +694,194 @@ class PacientesService(BaseService):
             self.handle_error("Error obteniendo historial del paciente", e)
             return HistorialCompletoPaciente()
 
+    async def get_resumen_historial_paciente(self, paciente_id: str) -> HistorialCompletoPaciente:
+        """
+        📊 Encabezado del historial: conteos + balance (sin consultas)
+
+        Dos conteos con count="exact" y una fila de paciente_balance.
+
+        Returns:
+            HistorialCompletoPaciente con consultas=[]
+        """
+        resumen = cache_historial_pacientes.get_resumen(paciente_id)
+        if resumen is not None:
+            return resumen
+
+        try:
+            consultas_response = self.client.table("consulta").select(
+                "id", count="exact"
+            ).eq("paciente_id", paciente_id).limit(1).execute()
+
+            intervenciones_response = self.client.table("intervencion").select(
+                "id, consulta!inner(paciente_id)", count="exact"
+            ).eq("consulta.paciente_id", paciente_id).limit(1).execute()
+
+            balance = self._get_balance_paciente(paciente_id)
+
+            resumen = HistorialCompletoPaciente(
+                total_consultas=consultas_response.count or 0,
+                total_intervenciones=intervenciones_response.count or 0,
+                total_pagado_usd=float(balance.get("total_pagado_usd", 0) or 0),
+                total_pagado_bs=float(balance.get("total_pagado_bs", 0) or 0),
+                total_pendiente_usd=float(balance.get("saldo_pendiente_usd", 0) or 0),
+                total_pendiente_bs=float(balance.get("saldo_pendiente_bs", 0) or 0)
+            )
+            cache_historial_pacientes.set_resumen(paciente_id, resumen)
+            return resumen
+
+        except Exception as e:
+            self.handle_error("Error obteniendo resumen del historial", e)
+            return HistorialCompletoPaciente()
+
+    async def get_consultas_historial_page(self,
+                                           paciente_id: str,
+                                           limit: int = 10,
+                                           offset: int = 0) -> Dict[str, Any]:
+        """
+        📄 Página de consultas del historial, más recientes primero
+
+        Solo trae los totales de cada intervención; el detalle (odontólogo,
+        servicios) se pide al expandir la consulta.
+
+        Returns:
+            {'consultas': List[ConsultaHistorial], 'hay_mas': bool}
+        """
+        pagina = cache_historial_pacientes.get_pagina(paciente_id, limit, offset)
+        if pagina is not None:
+            return pagina
+
+        try:
+            # Se pide una fila extra para saber si hay más sin contar
+            response = self.client.table("consulta").select(
+                f"{HISTORIAL_CONSULTA_SELECT}, intervencion(total_usd, total_bs)"
+            ).eq("paciente_id", paciente_id).order(
+                "fecha_llegada", desc=True
+            ).range(offset, offset + limit).execute()
+
+            filas = response.data or []
+            consultas = []
+            for consulta_data in filas[:limit]:
+                intervenciones = consulta_data.get("intervencion") or []
+                consulta = self._construir_consulta_historial(consulta_data, [])
+                consulta.cantidad_intervenciones = len(intervenciones)
+                consulta.costo_total_usd = sum(float(i.get("total_usd") or 0) for i in intervenciones)
+                consulta.costo_total_bs = sum(float(i.get("total_bs") or 0) for i in intervenciones)
+                consultas.append(consulta)
+
+            pagina = {"consultas": consultas, "hay_mas": len(filas) > limit}
+            cache_historial_pacientes.set_pagina(paciente_id, limit, offset, pagina)
+            return pagina
+
+        except Exception as e:
+            self.handle_error("Error obteniendo consultas del historial", e)
+            return {"consultas": [], "hay_mas": False}
+
+    async def get_intervenciones_consulta_historial(self, paciente_id: str, consulta_id: str) -> List[IntervencionHistorial]:
+        """
+        🦷 Detalle de intervenciones de una consulta (odontólogo + servicios)
+
+        Args:
+            paciente_id: ID del paciente (clave del cache)
+            consulta_id: ID de la consulta expandida
+        """
+        intervenciones = cache_historial_pacientes.get_intervenciones(paciente_id, consulta_id)
+        if intervenciones is not None:
+            return intervenciones
+
+        try:
+            response = self.client.table("intervencion").select(
+                HISTORIAL_INTERVENCION_SELECT
+            ).eq("consulta_id", consulta_id).order("hora_inicio").execute()
+
+            intervenciones = [self._construir_intervencion_historial(i) for i in response.data or []]
+            cache_historial_pacientes.set_intervenciones(paciente_id, consulta_id, intervenciones)
+            return intervenciones
+
+        except Exception as e:
+            self.handle_error("Error obteniendo intervenciones de la consulta", e)
+            return []
+
+    def _construir_intervencion_historial(self, interv_data: Dict[str, Any]) -> IntervencionHistorial:
+        """Fila de intervencion (con historia_medica embebida) → IntervencionHistorial"""
+        servicios_list = [
+            ServicioHistorial(
+                nombre=(serv_data.get("servicio") or {}).get("nombre", "Servicio"),
+                precio_unitario_usd=float(serv_data.get("precio_unitario_usd") or 0),
+                precio_unitario_bs=float(serv_data.get("precio_unitario_bs") or 0),
+            )
+            for serv_data in interv_data.get("historia_medica") or []
+        ]
+
+        odontologo_nombre = directorio_personal.nombre(interv_data.get("odontologo_id"), "Odontólogo")
+
+        return IntervencionHistorial(
+            id=interv_data.get("id", ""),
+            odontologo_id=interv_data.get("odontologo_id", ""),
+            odontologo_nombre=odontologo_nombre,
+            procedimiento_realizado=interv_data.get("procedimiento_realizado") or "",
+            total_usd=float(interv_data.get("total_usd") or 0),
+            total_bs=float(interv_data.get("total_bs") or 0),
+            servicios=servicios_list
+        )
+
+    def _construir_consulta_historial(self,
+                                      consulta_data: Dict[str, Any],
+                                      intervenciones_list: List[IntervencionHistorial]) -> ConsultaHistorial:
+        """Fila de consulta (con pago embebido) → ConsultaHistorial"""
+        pagos_data = consulta_data.get("pago") or []
+        pago_info = pagos_data[0] if pagos_data else {}
+
+        pago_usd = float(pago_info.get("monto_pagado_usd") or 0)
+        pago_bs = float(pago_info.get("monto_pagado_bs") or 0)
+        saldo_usd = float(pago_info.get("saldo_pendiente_usd") or 0)
+        saldo_bs = float(pago_info.get("saldo_pendiente_bs") or 0)
+
+        # Determinar estado del pago
+        if saldo_usd <= 0 and saldo_bs <= 0:
+            pago_estado = "completado"
+        elif pago_usd > 0 or pago_bs > 0:
+            pago_estado = "parcial"
+        else:
+            pago_estado = "pendiente"
+
+        odontologo_principal = directorio_personal.nombre(consulta_data.get("primer_odontologo_id"), "No asignado")
+
+        return ConsultaHistorial(
+            id=consulta_data.get("id", ""),
+            numero_consulta=consulta_data.get("numero_consulta") or "",
+            fecha_llegada=consulta_data.get("fecha_llegada") or "",
+            estado=consulta_data.get("estado") or "",
+            motivo_consulta=consulta_data.get("motivo_consulta") or "",
+            primer_odontologo_id=consulta_data.get("primer_odontologo_id") or "",
+            primer_odontologo_nombre=odontologo_principal,
+            intervenciones=intervenciones_list,
+            cantidad_intervenciones=len(intervenciones_list),
+            costo_total_usd=sum(i.total_usd for i in intervenciones_list),
+            costo_total_bs=sum(i.total_bs for i in intervenciones_list),
+            pago_id=pago_info.get("id", ""),
+            pago_estado=pago_estado,
+            pago_usd=pago_usd,
+            pago_bs=pago_bs,
+            saldo_pendiente_usd=saldo_usd,
+            saldo_pendiente_bs=saldo_bs
+        )
+
+    def _get_balance_paciente(self, paciente_id: str) -> Dict[str, Any]:
+        """
+        💰 Fila de paciente_balance (mantenida por trigger sobre pago)
+
+        Returns:
+            Diccionario con los totales o vacío si el paciente no tiene pagos
+        """
+        try:
+            response = self.client.table("paciente_balance").select(
+                "total_pagado_usd, total_pagado_bs, saldo_pendiente_usd, saldo_pendiente_bs"
+            ).eq("paciente_id", paciente_id).execute()
+            return response.data[0] if response.data else {}
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer el balance del paciente {paciente_id}: {e}")
+            return {}
+
 
 # Instancia única para importar
 pacientes_service = PacientesService()
\ No newline at end of file
@@ -7,7 +7,12 @@ from typing import Dict, List, Optional, Any
 from decimal import Decimal
 from datetime import date, datetime
 from .base_service import BaseService
-from dental_system.models import PagoModel, ServicioFormateado, ConsultaPendientePago
+from .tasa_cambio_service import tasa_cambio_service
+from .cache_invalidation_hooks import track_cache_invalidation
+from .cache_historial_pacientes import cache_historial_pacientes
+from .directorio_personal import directorio_personal
+from dental_system.models import PagoModel, ServicioFormateado, ConsultaPendientePago, hidratar_pagos
+from dental_system.constants import TASA_CAMBIO_DEFAULT
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,6 +26,67 @@ class PagosService(BaseService):
     def __init__(self):
         super().__init__()
     
+    # Select de listados: pago + datos básicos del paciente
+    PAGOS_LISTA_SELECT = "*, paciente(primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, numero_documento)"
+
+    # Máximo de pacientes candidatos en una búsqueda por nombre
+    MAX_PACIENTES_BUSQUEDA = 200
+
+    def _buscar_pacientes_ids(self, termino: str) -> List[str]:
+        """
+        🔍 IDs de pacientes cuyo nombre, documento o historia coinciden
+
+        Usa la búsqueda difusa indexada de pacientes y luego se filtra pago
+        por paciente_id, en lugar de filtrar por columnas embebidas.
+        """
+        response = self.client.rpc("buscar_pacientes", {
+            "p_termino": termino,
+            "p_limite": self.MAX_PACIENTES_BUSQUEDA
+        }).execute()
+        return [p["id"] for p in (response.data or [])]
+
+    def _aplicar_filtros_pagos(self,
+                               query,
+                               search: str = None,
+                               estado: str = None,
+                               metodo_pago: str = None,
+                               fecha_inicio: str = None,
+                               fecha_fin: str = None):
+        """
+        🎯 Aplicar filtros de pagos en PostgREST
+
+        Returns:
+            Query filtrada, o None si la búsqueda no puede tener resultados
+        """
+        if fecha_inicio:
+            query = query.gte("fecha_pago", f"{fecha_inicio[:10]}T00:00:00")
+        if fecha_fin:
+            query = query.lte("fecha_pago", f"{fecha_fin[:10]}T23:59:59")
+
+        if search and search.strip():
+            termino = search.strip()
+            if termino.upper().startswith("REC"):
+                # Búsqueda por prefijo de recibo (índice numero_recibo)
+                query = query.like("numero_recibo", f"{termino.upper()}%")
+            else:
+                pacientes_ids = self._buscar_pacientes_ids(termino)
+                if not pacientes_ids:
+                    return None
+                query = query.in_("paciente_id", pacientes_ids)
+
+        if estado and estado != "todos":
+            query = query.eq("estado_pago", estado)
+
+        if metodo_pago and metodo_pago != "todos":
+            # Búsqueda en array JSONB metodos_pago
+            query = query.contains("metodos_pago", [{"tipo": metodo_pago}])
+
+        return query
+
+    def _convertir_pagos(self, pagos_data: List[Dict[str, Any]]) -> List[PagoModel]:
+        """Convertir filas de Supabase a modelos tipados (en lote)"""
+        return hidratar_pagos(pagos_data)
+
     async def get_filtered_payments(self,
                                   search: str = None,
                                   estado: str = None,
@@ -41,50 +107,93 @@ class PagosService(BaseService):
             Lista de pagos como modelos tipados
         """
         try:
-            query = self.client.table("pago").select("*, paciente(primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, numero_documento)")
+            query = self._aplicar_filtros_pagos(
+                self.client.table("pago").select(self.PAGOS_LISTA_SELECT),
+                search, estado, metodo_pago, fecha_inicio, fecha_fin
+            )
+            if query is None:
+                return []
 
-            # Aplicar filtros
-            if fecha_inicio and fecha_fin:
-                query = query.gte("fecha_pago", fecha_inicio).lte("fecha_pago", fecha_fin)
+            # Ordenar por fecha descendente
+            response = query.order("fecha_pago", desc=True).execute()
+            pagos_models = self._convertir_pagos(response.data or [])
 
-            if search and search.strip():
-                if search.startswith("REC"):
-                    query = query.eq("numero_recibo", search.strip())
+            logger.info(f"✅ Pagos obtenidos: {len(pagos_models)} registros")
+            return pagos_models
 
-            if estado:
-                query = query.eq("estado_pago", estado)
+        except PermissionError:
+            logger.warning("Usuario sin permisos para acceder a pagos")
+            raise
+        except Exception as e:
+            self.handle_error("Error obteniendo pagos filtrados", e)
+            return []
 
-            if metodo_pago:
-                # Búsqueda en array JSONB metodos_pago
-                query = query.contains("metodos_pago", [{"tipo": metodo_pago}])
+    async def get_payments_page(self,
+                                search: str = None,
+                                estado: str = None,
+                                metodo_pago: str = None,
+                                fecha_inicio: str = None,
+                                fecha_fin: str = None,
+                                limit: int = 15,
+                                offset: int = 0,
+                                incluir_total: bool = True) -> Dict[str, Any]:
+        """
+        📄 Obtiene una página de pagos con filtros aplicados en el servidor
 
-            # Ordenar por fecha descendente
-            query = query.order("fecha_pago", desc=True)
+        El conteo exacto solo se pide cuando cambian los filtros (incluir_total=True);
+        al navegar entre páginas se reutiliza el total ya conocido.
 
-            # Ejecutar query
-            response = query.execute()
-            pagos_data = response.data if response.data else []
+        Args:
+            search: Recibo (prefijo REC...) o nombre/documento del paciente
+            estado: Filtro por estado ("todos" = sin filtro)
+            metodo_pago: Filtro por método de pago ("todos" = sin filtro)
+            fecha_inicio: Fecha inicial (YYYY-MM-DD)
+            fecha_fin: Fecha final (YYYY-MM-DD)
+            limit: Tamaño de página
+            offset: Desplazamiento
+            incluir_total: Si se debe contar el total de resultados
 
-            # Convertir a modelos tipados
-            pagos_models = []
-            for item in pagos_data:
-                try:
-                    model = PagoModel.from_dict(item)
-                    pagos_models.append(model)
-                except Exception as e:
-                    logger.warning(f"Error convirtiendo pago: {e}")
-                    continue
+        Returns:
+            {
+                'pagos': List[PagoModel],
+                'total': int o None (si no se contó),
+                'pagina_actual': int
+            }
+        """
+        pagina_actual = (offset // limit) + 1 if limit > 0 else 1
 
-            logger.info(f"✅ Pagos obtenidos: {len(pagos_models)} registros")
-            return pagos_models
+        try:
+            if incluir_total:
+                select = self.client.table("pago").select(self.PAGOS_LISTA_SELECT, count="exact")
+            else:
+                select = self.client.table("pago").select(self.PAGOS_LISTA_SELECT)
+
+            query = self._aplicar_filtros_pagos(select, search, estado, metodo_pago, fecha_inicio, fecha_fin)
+            if query is None:
+                return {'pagos': [], 'total': 0, 'pagina_actual': 1}
+
+            # Orden estable (id desempata pagos con la misma fecha)
+            response = query.order("fecha_pago", desc=True).order("id", desc=True).range(
+                offset, offset + limit - 1
+            ).execute()
+
+            pagos_models = self._convertir_pagos(response.data or [])
+            total = response.count if incluir_total else None
+
+            logger.info(f"✅ Página {pagina_actual} de pagos: {len(pagos_models)} registros")
+            return {
+                'pagos': pagos_models,
+                'total': total,
+                'pagina_actual': pagina_actual
+            }
 
         except PermissionError:
             logger.warning("Usuario sin permisos para acceder a pagos")
             raise
         except Exception as e:
-            self.handle_error("Error obteniendo pagos filtrados", e)
-            return []
-    
+            self.handle_error("Error obteniendo página de pagos", e)
+            return {'pagos': [], 'total': 0 if incluir_total else None, 'pagina_actual': pagina_actual}
+
     async def create_payment(self, form_data: Dict[str, str], user_id: str) -> Optional[Dict[str, Any]]:
         """
         Crea un nuevo pago
@@ -163,6 +272,7 @@ class PagosService(BaseService):
             result = response.data[0] if response.data else None
 
             if result:
+                cache_historial_pacientes.invalidar(result.get("paciente_id"))
                 logger.info(f"✅ Pago creado: {result.get('numero_recibo', '???')} - ${monto_pagado}")
                 return result
             else:
@@ -178,6 +288,103 @@ class PagosService(BaseService):
             self.handle_error("Error creando pago", e)
             raise ValueError(f"Error inesperado: {str(e)}")
 
+    def _generar_numeros_recibo(self, cantidad: int) -> List[str]:
+        """
+        🧾 Reservar `cantidad` números de recibo consecutivos del día
+
+        Un solo conteo para todo el bloque (REC + YYYYMMDD + 0001)
+        """
+        today = datetime.now().strftime("%Y%m%d")
+        count_response = self.client.table("pago").select("id", count="exact").like("numero_recibo", f"REC{today}%").execute()
+        count = count_response.count if count_response.count else 0
+        return [f"REC{today}{str(count + i).zfill(4)}" for i in range(1, cantidad + 1)]
+
+    def _preparar_pago_dual(self, form_data: Dict[str, str], user_id: str) -> Dict[str, Any]:
+        """
+        🧮 Validar un formulario dual y construir la fila de pago (sin numero_recibo)
+
+        Raises:
+            ValueError: Si el formulario no es válido
+        """
+        # Validar campos requeridos del sistema dual
+        required_fields = ["paciente_id", "monto_total_usd", "concepto", "tasa_cambio_del_dia"]
+        missing_fields = self.validate_required_fields(form_data, required_fields)
+
+        if missing_fields:
+            error_msg = self.format_error_message("Campos requeridos faltantes", missing_fields)
+            raise ValueError(error_msg)
+
+        # Procesar montos duales
+        try:
+            monto_total_usd = Decimal(str(form_data["monto_total_usd"]))
+            pago_usd = Decimal(str(form_data.get("pago_usd", "0")))
+            pago_bs = Decimal(str(form_data.get("pago_bs", "0")))
+            tasa_cambio = Decimal(str(form_data["tasa_cambio_del_dia"]))
+            descuento_usd = Decimal(str(form_data.get("descuento_usd", "0")))
+        except (ValueError, TypeError, ArithmeticError) as e:
+            raise ValueError(f"Formato de monto inválido: {e}")
+
+        # Validaciones de negocio
+        if monto_total_usd <= 0:
+            raise ValueError("El monto total debe ser mayor a cero")
+
+        if tasa_cambio <= 0:
+            raise ValueError("La tasa de cambio debe ser mayor a cero")
+
+        if pago_usd < 0 or pago_bs < 0:
+            raise ValueError("Los pagos no pueden ser negativos")
+
+        # Validar que al menos haya un pago
+        if pago_usd <= 0 and pago_bs <= 0:
+            raise ValueError("Debe especificar al menos un monto de pago")
+
+        # Construir array de métodos de pago
+        metodos_pago = []
+
+        if pago_usd > 0:
+            metodos_pago.append({
+                "tipo": form_data.get("metodo_pago_usd", "efectivo"),
+                "moneda": "USD",
+                "monto": float(pago_usd),
+                "referencia": form_data.get("referencia_usd", "").strip() or None
+            })
+
+        if pago_bs > 0:
+            metodos_pago.append({
+                "tipo": form_data.get("metodo_pago_bs", "efectivo"),
+                "moneda": "BS",
+                "monto": float(pago_bs),
+                "referencia": form_data.get("referencia_bs", "").strip() or None
+            })
+
+        # Calcular totales
+        pago_usd_equivalente = pago_usd + (pago_bs / tasa_cambio)
+        saldo_pendiente_usd = monto_total_usd - pago_usd_equivalente - descuento_usd
+        estado_pago = "completado" if saldo_pendiente_usd <= Decimal('0.01') else "pendiente"
+
+        # Calcular montos en BS
+        monto_total_bs = monto_total_usd * tasa_cambio
+        monto_pagado_bs = pago_bs + (pago_usd * tasa_cambio)
+        saldo_pendiente_bs = saldo_pendiente_usd * tasa_cambio
+
+        return {
+            "paciente_id": form_data["paciente_id"],
+            "consulta_id": form_data.get("consulta_id") if form_data.get("consulta_id") else None,
+            "concepto": form_data["concepto"].strip(),
+            "monto_total_usd": float(monto_total_usd),
+            "monto_total_bs": float(monto_total_bs),
+            "monto_pagado_usd": float(pago_usd_equivalente),
+            "monto_pagado_bs": float(monto_pagado_bs),
+            "saldo_pendiente_usd": float(saldo_pendiente_usd),
+            "saldo_pendiente_bs": float(saldo_pendiente_bs),
+            "tasa_cambio_bs_usd": float(tasa_cambio),
+            "descuento_usd": float(descuento_usd),
+            "estado_pago": estado_pago,
+            "metodos_pago": metodos_pago,
+            "procesado_por": user_id,
+            "motivo_descuento": form_data.get("motivo_descuento", "").strip() or None
+        }
+
     async def create_dual_payment(self, form_data: Dict[str, str], user_id: str) -> Optional[Dict[str, Any]]:
         """
         Crear pago con sistema dual USD/BS
@@ -192,7 +399,7 @@ class PagosService(BaseService):
             "monto_total_usd": "100.00",
             "pago_usd": "50.00",
             "pago_bs": "1825.00",
-            "tasa_cambio_del_dia": "36.50",
+            "tasa_cambio_del_dia": "36.50",     # Opcional: vacía = tasa registrada del día
             "concepto": "Consulta general",
             "metodo_pago_usd": "efectivo",
             "metodo_pago_bs": "transferencia",
@@ -209,98 +416,22 @@ class PagosService(BaseService):
             # Verificar permisos
             self.require_permission("pagos", "crear")
 
-            # Validar campos requeridos del sistema dual
-            required_fields = ["paciente_id", "monto_total_usd", "concepto", "tasa_cambio_del_dia"]
-            missing_fields = self.validate_required_fields(form_data, required_fields)
-
-            if missing_fields:
-                error_msg = self.format_error_message("Campos requeridos faltantes", missing_fields)
-                raise ValueError(error_msg)
-
-            # Procesar montos duales
-            try:
-                monto_total_usd = Decimal(str(form_data["monto_total_usd"]))
-                pago_usd = Decimal(str(form_data.get("pago_usd", "0")))
-                pago_bs = Decimal(str(form_data.get("pago_bs", "0")))
-                tasa_cambio = Decimal(str(form_data["tasa_cambio_del_dia"]))
-                descuento_usd = Decimal(str(form_data.get("descuento_usd", "0")))
-            except (ValueError, TypeError) as e:
-                raise ValueError(f"Formato de monto inválido: {e}")
-
-            # Validaciones de negocio
-            if monto_total_usd <= 0:
-                raise ValueError("El monto total debe ser mayor a cero")
-
-            if tasa_cambio <= 0:
-                raise ValueError("La tasa de cambio debe ser mayor a cero")
-
-            if pago_usd < 0 or pago_bs < 0:
-                raise ValueError("Los pagos no pueden ser negativos")
-
-            # Validar que al menos haya un pago
-            if pago_usd <= 0 and pago_bs <= 0:
-                raise ValueError("Debe especificar al menos un monto de pago")
+            # Sin tasa explícita se usa la tasa registrada del día
+            if not str(form_data.get("tasa_cambio_del_dia") or "").strip():
+                form_data = {**form_data, "tasa_cambio_del_dia": str(await tasa_cambio_service.get_tasa_actual())}
 
-            # Construir array de métodos de pago
-            metodos_pago = []
-
-            if pago_usd > 0:
-                metodos_pago.append({
-                    "tipo": form_data.get("metodo_pago_usd", "efectivo"),
-                    "moneda": "USD",
-                    "monto": float(pago_usd),
-                    "referencia": form_data.get("referencia_usd", "").strip() or None
-                })
-
-            if pago_bs > 0:
-                metodos_pago.append({
-                    "tipo": form_data.get("metodo_pago_bs", "efectivo"),
-                    "moneda": "BS",
-                    "monto": float(pago_bs),
-                    "referencia": form_data.get("referencia_bs", "").strip() or None
-                })
-
-            # Calcular totales
-            pago_usd_equivalente = pago_usd + (pago_bs / tasa_cambio)
-            saldo_pendiente_usd = monto_total_usd - pago_usd_equivalente - descuento_usd
-            estado_pago = "completado" if saldo_pendiente_usd <= Decimal('0.01') else "pendiente"
-
-            # Calcular montos en BS
-            monto_total_bs = monto_total_usd * tasa_cambio
-            monto_pagado_bs = pago_bs + (pago_usd * tasa_cambio)
-            saldo_pendiente_bs = saldo_pendiente_usd * tasa_cambio
+            insert_data = self._preparar_pago_dual(form_data, user_id)
 
             # Generar número de recibo
-            today = datetime.now().strftime("%Y%m%d")
-            count_response = self.client.table("pago").select("id", count="exact").like("numero_recibo", f"REC{today}%").execute()
-            count = count_response.count if count_response.count else 0
-            numero_recibo = f"REC{today}{str(count + 1).zfill(4)}"
+            insert_data["numero_recibo"] = self._generar_numeros_recibo(1)[0]
 
             # Crear pago dual directamente
-            insert_data = {
-                "paciente_id": form_data["paciente_id"],
-                "consulta_id": form_data.get("consulta_id") if form_data.get("consulta_id") else None,
-                "numero_recibo": numero_recibo,
-                "concepto": form_data["concepto"].strip(),
-                "monto_total_usd": float(monto_total_usd),
-                "monto_total_bs": float(monto_total_bs),
-                "monto_pagado_usd": float(pago_usd_equivalente),
-                "monto_pagado_bs": float(monto_pagado_bs),
-                "saldo_pendiente_usd": float(saldo_pendiente_usd),
-                "saldo_pendiente_bs": float(saldo_pendiente_bs),
-                "tasa_cambio_bs_usd": float(tasa_cambio),
-                "descuento_usd": float(descuento_usd),
-                "estado_pago": estado_pago,
-                "metodos_pago": metodos_pago,
-                "procesado_por": user_id,
-                "motivo_descuento": form_data.get("motivo_descuento", "").strip() or None
-            }
-
             response = self.client.table("pago").insert(insert_data).execute()
             result = response.data[0] if response.data else None
 
             if result:
-                logger.info(f"✅ Pago dual creado: ${pago_usd} USD + {pago_bs} BS (Recibo: {result.get('numero_recibo', '???')})")
+                cache_historial_pacientes.invalidar(result.get("paciente_id"))
+                logger.info(f"✅ Pago dual creado: {form_data.get('pago_usd', 0)} USD + {form_data.get('pago_bs', 0)} BS (Recibo: {result.get('numero_recibo', '???')})")
                 return result
             else:
                 raise ValueError("Error creando pago dual en la base de datos")
@@ -315,6 +446,102 @@ class PagosService(BaseService):
             self.handle_error("Error creando pago dual", e)
             raise ValueError(f"Error inesperado: {str(e)}")
 
+    async def create_dual_payments_batch(self, pagos_form: List[Dict[str, str]], user_id: str) -> Dict[str, Any]:
+        """
+        📦 Registrar un lote de pagos duales (cierre del día)
+
+        1. Valida todos los formularios antes de escribir nada
+        2. Reserva los números de recibo del bloque con un solo conteo
+        3. Inserta todas las filas válidas en un único INSERT multi-fila
+           (PostgREST lo ejecuta en una transacción: entran todas o ninguna)
+        4. Registra una sola invalidación de cache para todo el lote
+
+        Args:
+            pagos_form: Lista de formularios con el mismo formato que create_dual_payment
+            user_id: ID del usuario que registra
+
+        Returns:
+            {
+                'resultados': [{'indice': 0, 'exito': True, 'numero_recibo': 'REC...', 'pago': {...}},
+                               {'indice': 1, 'exito': False, 'error': '...'}],
+                'creados': int,
+                'fallidos': int
+            }
+        """
+        resultados: List[Dict[str, Any]] = []
+
+        try:
+            logger.info(f"Creando lote de {len(pagos_form)} pagos duales")
+
+            # Verificar permisos
+            self.require_permission("pagos", "crear")
+
+            if not pagos_form:
+                return {'resultados': [], 'creados': 0, 'fallidos': 0}
+
+            # Tasa del día (una sola lectura para todo el lote)
+            tasa_del_dia = None
+
+            # 1. Validación previa de todas las filas
+            filas_validas = []  # (indice, fila)
+            for indice, form_data in enumerate(pagos_form):
+                try:
+                    if not str(form_data.get("tasa_cambio_del_dia") or "").strip():
+                        if tasa_del_dia is None:
+                            tasa_del_dia = await tasa_cambio_service.get_tasa_actual()
+                        form_data = {**form_data, "tasa_cambio_del_dia": str(tasa_del_dia)}
+                    filas_validas.append((indice, self._preparar_pago_dual(form_data, user_id)))
+                except ValueError as e:
+                    resultados.append({'indice': indice, 'exito': False, 'error': str(e)})
+
+            if filas_validas:
+                # 2. Números de recibo en bloque
+                numeros = self._generar_numeros_recibo(len(filas_validas))
+                for (_, fila), numero in zip(filas_validas, numeros):
+                    fila["numero_recibo"] = numero
+
+                # 3. Un solo INSERT multi-fila (transaccional)
+                try:
+                    response = self.client.table("pago").insert([fila for _, fila in filas_validas]).execute()
+                    insertados = {p.get("numero_recibo"): p for p in (response.data or [])}
+
+                    for indice, fila in filas_validas:
+                        pago = insertados.get(fila["numero_recibo"])
+                        if pago:
+                            cache_historial_pacientes.invalidar(pago.get("paciente_id"))
+                            resultados.append({
+                                'indice': indice,
+                                'exito': True,
+                                'numero_recibo': pago.get("numero_recibo", ""),
+                                'pago': pago
+                            })
+                        else:
+                            resultados.append({'indice': indice, 'exito': False, 'error': "El pago no fue devuelto por la base de datos"})
+
+                except Exception as e:
+                    # La transacción se revierte completa: ninguna fila válida quedó guardada
+                    self.handle_error("Error insertando lote de pagos", e)
+                    for indice, _ in filas_validas:
+                        resultados.append({'indice': indice, 'exito': False, 'error': f"Lote revertido: {str(e)}"})
+
+            resultados.sort(key=lambda r: r['indice'])
+            creados = len([r for r in resultados if r['exito']])
+            fallidos = len(resultados) - creados
+
+            # 4. Una sola invalidación para todo el lote
+            if creados:
+                track_cache_invalidation("pagos", "create_batch", {"creados": creados, "fallidos": fallidos})
+
+            logger.info(f"✅ Lote de pagos procesado: {creados} creados, {fallidos} fallidos")
+            return {'resultados': resultados, 'creados': creados, 'fallidos': fallidos}
+
+        except PermissionError:
+            logger.warning("Usuario sin permisos para crear pagos")
+            raise
+        except Exception as e:
+            self.handle_error("Error creando lote de pagos", e)
+            raise ValueError(f"Error inesperado: {str(e)}")
+
     async def get_pago_by_consulta(self, consulta_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene el pago asociado a una consulta
@@ -385,6 +612,7 @@ class PagosService(BaseService):
             result = update_response.data[0] if update_response.data else None
 
             if result:
+                cache_historial_pacientes.invalidar(result.get("paciente_id"))
                 logger.info(f"✅ Pago actualizado: {original.get('numero_recibo', payment_id)}")
 
                 return result
@@ -438,6 +666,7 @@ class PagosService(BaseService):
             result = update_response.data[0] if update_response.data else None
 
             if result:
+                cache_historial_pacientes.invalidar(pago.get("paciente_id"))
                 logger.info(f"✅ Pago anulado correctamente: {pago.get('numero_recibo')}")
                 return True
             else:
@@ -521,6 +750,7 @@ class PagosService(BaseService):
             result = update_response.data[0] if update_response.data else None
 
             if result:
+                cache_historial_pacientes.invalidar(pago.get("paciente_id"))
                 logger.info(f"✅ Pago parcial procesado: ${monto_adicional}")
 
                 return result
@@ -624,38 +854,51 @@ class PagosService(BaseService):
     async def get_patient_balance(self, paciente_id: str) -> Dict[str, Any]:
         """
         Obtiene el balance de un paciente
-        
+
+        Lee la fila de paciente_balance (mantenida por trigger en cada cambio
+        de pago), sin recorrer los pagos del paciente.
+
         Args:
             paciente_id: ID del paciente
-            
+
         Returns:
             Balance del paciente
         """
+        balance_vacio = {
+            "paciente_id": paciente_id,
+            "total_facturado": 0,
+            "total_facturado_bs": 0,
+            "total_pagado": 0,
+            "total_pagado_bs": 0,
+            "total_descuentos": 0,
+            "saldo_pendiente": 0,
+            "saldo_pendiente_bs": 0,
+            "pagos_completados": 0,
+            "pagos_pendientes": 0
+        }
+
         try:
             # Verificar permisos
             self.require_permission("pagos", "leer")
 
-            # Obtener todos los pagos del paciente
-            response = self.client.table("pago").select("*").eq("paciente_id", paciente_id).execute()
-            pagos = response.data if response.data else []
-
-            # Calcular balance
-            total_facturado = sum(p.get("monto_total_usd", 0) for p in pagos if p.get("estado_pago") != "anulado")
-            total_pagado = sum(p.get("monto_pagado_usd", 0) for p in pagos if p.get("estado_pago") != "anulado")
-            total_descuentos = sum(p.get("descuento_usd", 0) for p in pagos if p.get("estado_pago") != "anulado")
-            saldo_pendiente = sum(p.get("saldo_pendiente_usd", 0) for p in pagos if p.get("estado_pago") == "pendiente")
+            response = self.client.table("paciente_balance").select("*").eq("paciente_id", paciente_id).execute()
 
-            completados = len([p for p in pagos if p.get("estado_pago") == "completado"])
-            pendientes = len([p for p in pagos if p.get("estado_pago") == "pendiente"])
+            # Sin fila = el paciente aún no tiene pagos
+            if not response.data:
+                return balance_vacio
 
+            fila = response.data[0]
             balance = {
                 "paciente_id": paciente_id,
-                "total_facturado": total_facturado,
-                "total_pagado": total_pagado,
-                "total_descuentos": total_descuentos,
-                "saldo_pendiente": saldo_pendiente,
-                "pagos_completados": completados,
-                "pagos_pendientes": pendientes
+                "total_facturado": float(fila.get("total_facturado_usd", 0) or 0),
+                "total_facturado_bs": float(fila.get("total_facturado_bs", 0) or 0),
+                "total_pagado": float(fila.get("total_pagado_usd", 0) or 0),
+                "total_pagado_bs": float(fila.get("total_pagado_bs", 0) or 0),
+                "total_descuentos": float(fila.get("total_descuentos_usd", 0) or 0),
+                "saldo_pendiente": float(fila.get("saldo_pendiente_usd", 0) or 0),
+                "saldo_pendiente_bs": float(fila.get("saldo_pendiente_bs", 0) or 0),
+                "pagos_completados": fila.get("pagos_completados", 0) or 0,
+                "pagos_pendientes": fila.get("pagos_pendientes", 0) or 0
             }
 
             logger.info(f"Balance obtenido para paciente {paciente_id}")
@@ -663,16 +906,52 @@ class PagosService(BaseService):
 
         except Exception as e:
             self.handle_error("Error obteniendo balance del paciente", e)
-            return {
-                "paciente_id": paciente_id,
-                "total_facturado": 0,
-                "total_pagado": 0,
-                "total_descuentos": 0,
-                "saldo_pendiente": 0,
-                "pagos_completados": 0,
-                "pagos_pendientes": 0
-            }
-    
+            return balance_vacio
+
+    async def get_pacientes_con_deuda(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Lista de pacientes con saldo pendiente (mayor deuda primero)
+
+        Usa el índice parcial de paciente_balance: solo se recorren las filas con saldo.
+
+        Args:
+            limit: Máximo de pacientes a retornar
+
+        Returns:
+            Lista con datos del paciente y su saldo pendiente
+        """
+        try:
+            # Verificar permisos
+            self.require_permission("pagos", "leer")
+
+            response = self.client.table("paciente_balance").select(
+                "paciente_id, saldo_pendiente_usd, saldo_pendiente_bs, pagos_pendientes, "
+                "paciente(numero_historia, primer_nombre, primer_apellido, numero_documento, celular_1)"
+            ).or_(
+                "saldo_pendiente_usd.gt.0,saldo_pendiente_bs.gt.0"
+            ).order("saldo_pendiente_usd", desc=True).limit(limit).execute()
+
+            pacientes = []
+            for fila in (response.data or []):
+                paciente = fila.get("paciente") or {}
+                pacientes.append({
+                    "paciente_id": fila.get("paciente_id", ""),
+                    "numero_historia": paciente.get("numero_historia", ""),
+                    "nombre_completo": f"{paciente.get('primer_nombre', '')} {paciente.get('primer_apellido', '')}".strip(),
+                    "numero_documento": paciente.get("numero_documento", ""),
+                    "celular": paciente.get("celular_1", ""),
+                    "saldo_pendiente_usd": float(fila.get("saldo_pendiente_usd", 0) or 0),
+                    "saldo_pendiente_bs": float(fila.get("saldo_pendiente_bs", 0) or 0),
+                    "pagos_pendientes": fila.get("pagos_pendientes", 0) or 0
+                })
+
+            logger.info(f"Pacientes con deuda: {len(pacientes)}")
+            return pacientes
+
+        except Exception as e:
+            self.handle_error("Error obteniendo pacientes con deuda", e)
+            return []
+
     async def get_payment_stats(self) -> Dict[str, Any]:
         """
         Obtiene estadísticas de pagos
@@ -734,9 +1013,8 @@ class PagosService(BaseService):
             completados = len([p for p in today_payments if p.get("estado_pago") == "completado"])
             pendientes = len([p for p in today_payments if p.get("estado_pago") == "pendiente"])
 
-            # Calcular tasa promedio del día
-            tasas_hoy = [p.get("tasa_cambio_bs_usd", 0) for p in today_payments if p.get("tasa_cambio_bs_usd", 0) > 0]
-            tasa_promedio_hoy = round(sum(tasas_hoy) / len(tasas_hoy), 2) if tasas_hoy else 36.50
+            # Tasa del día y promedio semanal desde el historial de tasas (cacheado)
+            tasa_promedio_hoy = await tasa_cambio_service.get_tasa_actual()
 
             # Obtener pagos pendientes
             pending_response = self.client.table("pago").select("*").eq("estado_pago", "pendiente").execute()
@@ -745,12 +1023,7 @@ class PagosService(BaseService):
             # Tasa promedio de la semana para comparación
             from datetime import timedelta
             week_ago = today - timedelta(days=7)
-            week_ago_str = week_ago.isoformat()
-            week_response = self.client.table("pago").select("*").gte("fecha_pago", week_ago_str).lte("fecha_pago", today_str).execute()
-            week_payments = week_response.data if week_response.data else []
-
-            tasas_semana = [p.get("tasa_cambio_bs_usd", 0) for p in week_payments if p.get("tasa_cambio_bs_usd", 0) > 0]
-            tasa_promedio_semana = round(sum(tasas_semana) / len(tasas_semana), 2) if tasas_semana else 36.50
+            tasa_promedio_semana = await tasa_cambio_service.get_tasa_promedio(week_ago.isoformat(), today_str)
 
             # Calcular saldos pendientes duales
             total_pendiente_usd = sum(p.get("saldo_pendiente_usd", 0) for p in pending_payments)
@@ -764,7 +1037,7 @@ class PagosService(BaseService):
             for pago in today_payments:
                 usd = pago.get("monto_pagado_usd", 0)
                 bs = pago.get("monto_pagado_bs", 0)
-                tasa = pago.get("tasa_cambio_bs_usd", 36.50)
+                tasa = pago.get("tasa_cambio_bs_usd") or tasa_promedio_hoy
 
                 usd_from_bs = bs / tasa if tasa > 0 else 0
 
@@ -806,11 +1079,12 @@ class PagosService(BaseService):
 
         except Exception as e:
             self.handle_error("Error obteniendo estadísticas de moneda dual", e)
+            tasa_cache = tasa_cambio_service.get_tasa_en_cache() or TASA_CAMBIO_DEFAULT
             return {
-                "hoy": {"total_recaudado_usd": 0, "total_recaudado_bs": 0, "total_pagos": 0, "pagos_completados": 0, "tasa_promedio": 36.50},
+                "hoy": {"total_recaudado_usd": 0, "total_recaudado_bs": 0, "total_pagos": 0, "pagos_completados": 0, "tasa_promedio": tasa_cache},
                 "pendientes": {"cantidad": 0, "monto_total_usd": 0, "monto_total_bs": 0},
                 "distribucion_pagos": {"pagos_mixtos": 0, "pagos_solo_usd": 0, "pagos_solo_bs": 0},
-                "tendencias": {"tasa_promedio_semana": 36.50, "variacion_tasa": 0, "preferencia_moneda": "USD"}
+                "tendencias": {"tasa_promedio_semana": tasa_cache, "variacion_tasa": 0, "preferencia_moneda": "USD"}
             }
 
     async def get_consultas_pendientes_pago(self) -> List[ConsultaPendientePago]:
@@ -821,7 +1095,7 @@ class PagosService(BaseService):
             # Query directa a consultas completadas con pago pendiente
             # Obtener consultas completadas
             consultas_response = self.client.table("consulta").select(
-                "*, paciente(*), personal!primer_odontologo_id(*)"
+                "*, paciente(*)"
             ).eq("estado", "completada").execute()
             consultas = consultas_response.data if consultas_response.data else []
 
@@ -833,7 +1107,7 @@ class PagosService(BaseService):
                 if pago_response.data:
                     # ✅ CORRECCIÓN: Obtener intervenciones con información del odontólogo
                     intervenciones_response = self.client.table("intervencion").select(
-                        "id, odontologo_id, personal!odontologo_id(primer_nombre, primer_apellido)"
+                        "id, odontologo_id"
                     ).eq("consulta_id", consulta["id"]).execute()
                     intervenciones = intervenciones_response.data if intervenciones_response.data else []
 
@@ -848,7 +1122,7 @@ class PagosService(BaseService):
                             for historia in historia_response.data:
                                 servicios_detalle.append({
                                     "nombre": historia.get("servicio", {}).get("nombre", "Servicio"),
-                                    "odontologo": f"{interv.get('personal', {}).get('primer_nombre', '')} {interv.get('personal', {}).get('primer_apellido', '')}".strip(),
+                                    "odontologo": directorio_personal.nombre(interv.get("odontologo_id")),
                                     "precio_usd": historia.get("precio_unitario_usd", 0),
                                     "precio_bs": historia.get("precio_unitario_bs", 0)
                                 })
@@ -862,7 +1136,7 @@ class PagosService(BaseService):
                         "paciente_documento": consulta.get("paciente", {}).get("numero_documento", ""),
                         "paciente_numero_historia": consulta.get("paciente", {}).get("numero_historia", ""),
                         "paciente_telefono": consulta.get("paciente", {}).get("celular_1", ""),
-                        "odontologo_nombre": f"{consulta.get('personal', {}).get('primer_nombre', '')} {consulta.get('personal', {}).get('primer_apellido', '')}".strip(),
+                        "odontologo_nombre": directorio_personal.nombre(consulta.get("primer_odontologo_id")),
                         "fecha_llegada": consulta.get("fecha_llegada", ""),
                         "total_usd": pago_response.data[0].get("monto_total_usd", 0),
                         "total_bs": pago_response.data[0].get("monto_total_bs", 0),
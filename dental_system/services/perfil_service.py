@@ -6,6 +6,8 @@ import re
 from typing import Dict, Optional, Tuple, Any
 from ..supabase.client import handle_supabase_error
 from .base_service import BaseService
+from .cache_invalidation_hooks import invalidate_after_staff_operation
+from .directorio_personal import directorio_personal
 import logging
 
 logger = logging.getLogger(__name__)
@@ -55,14 +57,10 @@ class PerfilService(BaseService):
             else:
                 user_data["rol"] = {"nombre": "sin_rol", "descripcion": "Sin rol"}
 
-            # 3. Obtener datos de personal (si existe)
-            personal_response = self.client.table("personal").select("*").eq(
-                "usuario_id", user_id
-            ).execute()
-
-            if personal_response.data:
-                personal_data = personal_response.data[0]
+            # 3. Obtener datos de personal (si existe) desde el directorio
+            personal_data = directorio_personal.get_por_usuario(user_id)
 
+            if personal_data:
                 # Construir nombre completo
                 nombres = []
                 if personal_data.get("primer_nombre"):
@@ -117,6 +115,7 @@ class PerfilService(BaseService):
             logger.error(f"❌ Error obteniendo perfil completo: {str(e)}")
             return None
 
+    @invalidate_after_staff_operation("update")
     @handle_supabase_error
     async def update_own_contact_info(
         self,
@@ -144,15 +143,11 @@ class PerfilService(BaseService):
                 return False, "; ".join(errores.values())
 
             # 2. Buscar registro en personal
-            personal_response = self.client.table("personal").select("id").eq(
-                "usuario_id", user_id
-            ).execute()
+            personal_id = directorio_personal.personal_id_por_usuario(user_id)
 
-            if not personal_response.data:
+            if not personal_id:
                 return False, "No se encontró registro de personal para este usuario"
 
-            personal_id = personal_response.data[0]["id"]
-
             # 3. Actualizar en tabla personal
             update_response = self.client.table("personal").update({
                 "celular": celular,
@@ -7,6 +7,8 @@ from typing import Dict, List, Optional, Any
 from datetime import date, datetime
 from decimal import Decimal
 from .base_service import BaseService
+from .cache_invalidation_hooks import invalidate_after_staff_operation
+from .directorio_personal import directorio_personal
 from dental_system.models import PersonalModel, PersonalFormModel
 import logging
 
@@ -88,6 +90,7 @@ class PersonalService(BaseService):
             self.handle_error("Error obteniendo personal filtrado", e)
             return []
     
+    @invalidate_after_staff_operation("create")
     async def create_staff_member(self, personal_form: PersonalFormModel) -> Optional[PersonalModel]:
         """
         Crea un nuevo miembro del personal - PROCESO COMPLETO
@@ -264,6 +267,7 @@ class PersonalService(BaseService):
             self.handle_error("Error creando personal", e)
             raise ValueError(f"Error inesperado: {str(e)}")
     
+    @invalidate_after_staff_operation("update")
     async def update_staff_member(self, personal_id: str, personal_form: PersonalFormModel) -> Optional[PersonalModel]:
         """
         Actualiza un miembro del personal existente
@@ -409,6 +413,7 @@ class PersonalService(BaseService):
             self.handle_error("Error actualizando personal", e)
             raise ValueError(f"Error inesperado: {str(e)}")
     
+    @invalidate_after_staff_operation("status_change")
     async def deactivate_staff_member(self, personal_id: str, motivo: str = None) -> bool:
         """
         Desactiva un miembro del personal
@@ -451,6 +456,7 @@ class PersonalService(BaseService):
             self.handle_error("Error desactivando personal", e)
             raise ValueError(f"Error inesperado: {str(e)}")
     
+    @invalidate_after_staff_operation("status_change")
     async def reactivate_staff_member(self, personal_id: str) -> bool:
         """
         Reactiva un miembro del personal
@@ -495,9 +501,8 @@ class PersonalService(BaseService):
         Obtiene estadísticas de personal
         """
         try:
-            # Obtener todos los registros de personal
-            response = self.client.table("personal").select("*").execute()
-            personal_list = response.data if response.data else []
+            # Todos los registros de personal (directorio en memoria)
+            personal_list = directorio_personal.todos()
 
             # Calcular estadísticas manualmente en Python
             total = len(personal_list)
@@ -548,12 +553,8 @@ class PersonalService(BaseService):
         🔍 Obtener el ID de personal correspondiente a un usuario
         """
         try:
-            # Query directa a tabla personal
-            response = self.client.table("personal").select("id").eq("usuario_id", user_id).execute()
-            personal_data = response.data[0] if response.data else None
-            if personal_data:
-                return personal_data.get('id')
-            return None
+            # Directorio en memoria (sin query por acción)
+            return directorio_personal.personal_id_por_usuario(user_id)
 
         except Exception as e:
             logger.warning(f"⚠️ No se encontró personal para usuario {user_id}: {e}")
@@ -0,0 +1,167 @@
+"""
+⏩ PRECARGA DEL CONTEXTO CLÍNICO DE LOS PRÓXIMOS PACIENTES
+=========================================================
+
+Mientras el odontólogo atiende, se calientan en segundo plano los datos
+que necesita la página de intervención para los próximos pacientes de su
+cola (orden_cola_odontologo):
+
+- odontograma: queda en cache_odontogramas (al abrir solo se verifica la versión)
+- historial de servicios: se guarda aquí y se entrega una sola vez
+
+La ficha del paciente ya viene en pacientes_asignados (cola del día).
+
+Límites: MAX_PACIENTES_PREFETCH pacientes en memoria (LRU) y vigencia de
+MODULE_CACHE_TTL['consultas'] segundos. Una invalidación que llega mientras
+la precarga del paciente está en curso descarta su resultado (contador de
+invalidaciones por paciente en vuelo). La precarga corre en un hilo
+aparte (el cliente de Supabase es síncrono) y nunca bloquea al evento
+que la programa; si falla solo se registra en el log.
+
+USADO POR: EstadoOdontologia (programar / tomar), OdontologiaService (invalidar)
+"""
+
+from typing import Dict, List, Optional, Any, Iterable
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+import logging
+
+from .cache_invalidation_hooks import MODULE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Pacientes con contexto precargado a la vez (todas las colas del proceso)
+MAX_PACIENTES_PREFETCH = 20
+
+# Próximos pacientes de cada cola que se precargan
+PACIENTES_ADELANTE_PREFETCH = 2
+
+
+class PrefetchContextoClinico:
+    """
+    🗄️ Entradas por paciente: {"creado", "historial_servicios"}
+    """
+
+    def __init__(self, max_pacientes: int = MAX_PACIENTES_PREFETCH, ttl: int = MODULE_CACHE_TTL['consultas']):
+        self._lock = threading.Lock()
+        self.max_pacientes = max_pacientes
+        self.ttl = ttl
+        self.entradas: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.en_curso: set = set()
+        self.invalidaciones: Dict[str, int] = {}  # solo pacientes con precarga en curso
+        self._tareas: set = set()  # referencias fuertes a las tareas en vuelo
+
+    def _vigente(self, paciente_id: str) -> Optional[Dict[str, Any]]:
+        entrada = self.entradas.get(paciente_id)
+        if entrada is not None and time.time() - entrada["creado"] > self.ttl:
+            del self.entradas[paciente_id]
+            entrada = None
+        return entrada
+
+    # ==========================================
+    # ⏩ PROGRAMAR PRECARGA
+    # ==========================================
+
+    def programar(self, paciente_ids: Iterable[str]):
+        """
+        Precargar en segundo plano (no espera el resultado)
+
+        Omite pacientes ya precargados o con precarga en curso.
+        """
+        with self._lock:
+            pendientes = [
+                pid for pid in dict.fromkeys(paciente_ids)
+                if pid and pid not in self.en_curso and self._vigente(pid) is None
+            ][:self.max_pacientes]
+            self.en_curso.update(pendientes)
+            for pid in pendientes:
+                self.invalidaciones[pid] = 0
+
+        if not pendientes:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            with self._lock:
+                self.en_curso.difference_update(pendientes)
+                for pid in pendientes:
+                    self.invalidaciones.pop(pid, None)
+            return
+
+        tarea = loop.create_task(asyncio.to_thread(self._precargar, pendientes))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+        logger.debug(f"⏩ Precarga programada para {len(pendientes)} paciente(s)")
+
+    def _precargar(self, paciente_ids: List[str]):
+        """Hilo de precarga: odontograma (cache versionado) + historial de servicios"""
+        from .odontologia_service import odontologia_service
+
+        for paciente_id in paciente_ids:
+            try:
+                with self._lock:
+                    invalidaciones_antes = self.invalidaciones.get(paciente_id, 0)
+
+                asyncio.run(odontologia_service.get_patient_odontogram(paciente_id))
+                historial = asyncio.run(odontologia_service.get_historial_servicios_paciente(paciente_id))
+
+                with self._lock:
+                    # Invalidado durante la lectura: el historial puede estar desactualizado
+                    if self.invalidaciones.get(paciente_id, 0) != invalidaciones_antes:
+                        logger.info(f"⏩ Precarga de paciente {paciente_id} descartada (invalidada en curso)")
+                        continue
+
+                    self.entradas[paciente_id] = {"creado": time.time(), "historial_servicios": historial}
+                    self.entradas.move_to_end(paciente_id)
+                    while len(self.entradas) > self.max_pacientes:
+                        self.entradas.popitem(last=False)
+
+                logger.info(f"⏩ Contexto clínico precargado para paciente {paciente_id}")
+            except Exception as e:
+                logger.warning(f"Precarga fallida para paciente {paciente_id}: {e}")
+            finally:
+                with self._lock:
+                    self.en_curso.discard(paciente_id)
+                    self.invalidaciones.pop(paciente_id, None)
+
+    # ==========================================
+    # 📥 CONSUMIR
+    # ==========================================
+
+    def tomar_historial_servicios(self, paciente_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Historial precargado (se entrega una vez; después se lee de la BD)"""
+        with self._lock:
+            entrada = self._vigente(paciente_id)
+            if entrada is None:
+                return None
+            del self.entradas[paciente_id]
+            return entrada["historial_servicios"]
+
+    # ==========================================
+    # 🔄 INVALIDACIÓN
+    # ==========================================
+
+    def invalidar(self, paciente_id: Optional[str]):
+        """Descartar lo precargado de un paciente (intervención o cambio de odontograma)"""
+        if not paciente_id:
+            return
+        with self._lock:
+            self.entradas.pop(paciente_id, None)
+            if paciente_id in self.invalidaciones:
+                self.invalidaciones[paciente_id] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pacientes": len(self.entradas),
+                "en_curso": len(self.en_curso),
+                "max_pacientes": self.max_pacientes,
+                "ttl": self.ttl
+            }
+
+
+# Instancia global (una por proceso)
+prefetch_contexto_clinico = PrefetchContextoClinico()
@@ -17,6 +17,8 @@ OPTIMIZACIONES:
 from typing import Dict, Any, List, Optional
 from datetime import date, datetime, timedelta
 from .base_service import BaseService
+from .tasa_cambio_service import tasa_cambio_service
+from .directorio_personal import directorio_personal
 import logging
 
 logger = logging.getLogger(__name__)
@@ -213,9 +215,9 @@ class ReportesService(BaseService):
         try:
             logger.info(f"👨‍⚕️ Obteniendo ranking odontólogos ({fecha_inicio} - {fecha_fin})")
 
-            # Query con JOIN
+            # Solo intervenciones: nombres y especialidad salen del directorio
             response = self.client.table('intervencion').select(
-                'id, total_usd, total_bs, odontologo_id, personal:odontologo_id(primer_nombre, primer_apellido, especialidad)'
+                'id, total_usd, total_bs, odontologo_id'
             ).gte(
                 'fecha_registro', f"{fecha_inicio}T00:00:00"
             ).lte(
@@ -229,7 +231,7 @@ class ReportesService(BaseService):
             odontologos_agrupados = {}
             for intervencion in response.data:
                 odontologo_id = intervencion.get('odontologo_id')
-                odontologo_info = intervencion.get('personal')
+                odontologo_info = directorio_personal.get(odontologo_id)
 
                 if not odontologo_info:
                     continue
@@ -278,51 +280,31 @@ class ReportesService(BaseService):
                 "nuevos_mes": 87,
                 "hombres": 598,
                 "mujeres": 649,
-                "edad_promedio": 35.5
+                "edad_promedio": 35.5,
+                "histograma_edad": [{"rango": "0-17", "cantidad": 120}, ...]
             }
         """
         try:
             logger.info("👥 Obteniendo estadísticas de pacientes")
 
-            # Total pacientes activos
-            total_response = self.client.table('paciente').select(
-                'id', count='exact'
-            ).eq('activo', True).execute()
-
-            total_pacientes = total_response.count or 0
-
-            # Nuevos este mes
-            current_month = datetime.now().strftime('%Y-%m')
-            nuevos_response = self.client.table('paciente').select(
-                'id', count='exact'
-            ).eq('activo', True).gte(
-                'fecha_registro', f"{current_month}-01"
-            ).execute()
-
-            nuevos_mes = nuevos_response.count or 0
-
-            # Por género
-            hombres_response = self.client.table('paciente').select(
-                'id', count='exact'
-            ).eq('activo', True).eq('genero', 'masculino').execute()
-
-            mujeres_response = self.client.table('paciente').select(
-                'id', count='exact'
-            ).eq('activo', True).eq('genero', 'femenino').execute()
-
-            hombres = hombres_response.count or 0
-            mujeres = mujeres_response.count or 0
+            # Todos los contadores en una sola llamada agregada
+            response = self.client.rpc('estadisticas_pacientes', {}).execute()
+            datos = response.data or {}
 
-            # Edad promedio (calculado en cliente por simplicidad)
-            # En producción, esto podría hacerse con una función SQL
-            edad_promedio = 0.0  # Placeholder
+            total_pacientes = int(datos.get('activos', 0))
+            nuevos_mes = int(datos.get('nuevos_mes_activos', 0))
+            hombres = int(datos.get('hombres_activos', 0))
+            mujeres = int(datos.get('mujeres_activas', 0))
+            edad_promedio = float(datos.get('edad_promedio', 0) or 0)
+            histograma_edad = datos.get('histograma_edad', [])
 
             resultado = {
                 "total_pacientes": total_pacientes,
                 "nuevos_mes": nuevos_mes,
                 "hombres": hombres,
                 "mujeres": mujeres,
-                "edad_promedio": edad_promedio
+                "edad_promedio": edad_promedio,
+                "histograma_edad": histograma_edad
             }
 
             logger.info(f"✅ Stats pacientes: Total={total_pacientes}, Nuevos={nuevos_mes}")
@@ -336,7 +318,8 @@ class ReportesService(BaseService):
                 "nuevos_mes": 0,
                 "hombres": 0,
                 "mujeres": 0,
-                "edad_promedio": 0.0
+                "edad_promedio": 0.0,
+                "histograma_edad": []
             }
 
     async def get_metodos_pago_populares(
@@ -460,17 +443,22 @@ class ReportesService(BaseService):
 
             # 1. INGRESOS DEL MES (USD + BS convertido)
             ingresos_response = self.client.table('pago').select(
-                'monto_pagado_usd, monto_pagado_bs'
+                'fecha_pago, monto_pagado_usd, monto_pagado_bs'
             ).eq('estado_pago', 'completado').gte(
                 'fecha_pago', f"{fecha_inicio}T00:00:00"
             ).lte(
                 'fecha_pago', f"{fecha_fin}T23:59:59"
             ).execute()
 
+            # Tasas del período en una sola consulta (cacheadas por proceso)
+            tasas = await tasa_cambio_service.get_tasas_rango(fecha_inicio, fecha_fin)
+
             ingresos_mes = 0.0
             for pago in (ingresos_response.data or []):
                 ingresos_mes += float(pago.get('monto_pagado_usd', 0) or 0)
-                ingresos_mes += float(pago.get('monto_pagado_bs', 0) or 0)
+                ingresos_mes += tasa_cambio_service.convertir_bs_a_usd(
+                    pago.get('monto_pagado_bs', 0), pago.get('fecha_pago', ''), tasas
+                )
 
             # 2. CONSULTAS DEL MES
             consultas_response = self.client.table('consulta').select(
@@ -498,10 +486,12 @@ class ReportesService(BaseService):
             ).in_('estado_pago', ['pendiente', 'parcial']).execute()
 
             pagos_pendientes_count = len(pagos_pendientes_response.data or [])
+            # Los saldos pendientes se valoran a la tasa vigente hoy
+            tasa_hoy = await tasa_cambio_service.get_tasa_actual()
             pagos_pendientes_monto = 0.0
             for pago in (pagos_pendientes_response.data or []):
                 pagos_pendientes_monto += float(pago.get('saldo_pendiente_usd', 0) or 0)
-                pagos_pendientes_monto += float(pago.get('saldo_pendiente_bs', 0) or 0)
+                pagos_pendientes_monto += float(pago.get('saldo_pendiente_bs', 0) or 0) / tasa_hoy
 
             # 5. TOTAL PACIENTES (activos)
             total_pacientes_response = self.client.table('paciente').select(
@@ -638,13 +628,15 @@ class ReportesService(BaseService):
                     'fecha_pago', f"{fecha_fin}T23:59:59"
                 ).execute()
 
-                # Agrupar por fecha y sumar montos
+                tasas = await tasa_cambio_service.get_tasas_rango(fecha_inicio, fecha_fin)
+
+                # Agrupar por fecha y sumar montos (BS convertido con la tasa de ese día)
                 datos_por_fecha = {}
                 for pago in (response.data or []):
                     fecha = pago.get('fecha_pago', '')[:10]
                     monto = (
                         float(pago.get('monto_pagado_usd', 0) or 0) +
-                        float(pago.get('monto_pagado_bs', 0) or 0)
+                        tasa_cambio_service.convertir_bs_a_usd(pago.get('monto_pagado_bs', 0), fecha, tasas)
                     )
                     datos_por_fecha[fecha] = datos_por_fecha.get(fecha, 0.0) + monto
 
@@ -1168,9 +1160,9 @@ class ReportesService(BaseService):
             # 6. DIENTES TRATADOS (desde diente)
             dientes_tratados = 0
             if intervencion_ids:
-                dientes_response = self.client.table('diente').select(
+                dientes_response = self.client.table('vista_historial_diente').select(
                     'diente_numero'
-                ).in_('intervencion_id', intervencion_ids).eq('activo', True).execute()
+                ).in_('intervencion_id', intervencion_ids).execute()  # incluye "sano" (solo historial)
 
                 dientes_set = set()
                 for d in (dientes_response.data or []):
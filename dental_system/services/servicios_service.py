@@ -6,6 +6,8 @@ Sigue el mismo patrón que PacientesService
 from typing import Dict, List, Optional, Any
 from decimal import Decimal
 from .base_service import BaseService
+from .cache_invalidation_hooks import invalidate_after_service_operation
+from .catalogo_servicios import catalogo_servicios
 from dental_system.models import ServicioModel, ServicioFormModel
 import logging
 
@@ -36,42 +38,9 @@ class ServiciosService(BaseService):
             Lista de servicios como modelos tipados
         """
         try:
-            
-            # Construir query base
-            query = self.client.table("servicio").select("*")
-
-            # Aplicar filtros
-            if activos_only:
-                query = query.eq("activo", True)
-
-            if categoria and categoria != "todas":
-                query = query.eq("categoria", categoria)
-
-            if search and search.strip():
-                search_term = search.strip()
-                query = query.or_(
-                    f"codigo.ilike.%{search_term}%,"
-                    f"nombre.ilike.%{search_term}%,"
-                    f"descripcion.ilike.%{search_term}%"
-                )
-
-            # Ordenar por nombre
-            query = query.order("nombre")
-
-            # Ejecutar query
-            response = query.execute()
-            servicios_data = response.data if response.data else []
-            
-            # Convertir a modelos tipados
-            servicios_models = []
-            for item in servicios_data:
-                try:
-                    model = ServicioModel.from_dict(item)
-                    servicios_models.append(model)
-                except Exception as e:
-                    logger.warning(f"Error convirtiendo servicio: {e}")
-                    continue
-            
+            # Catálogo en memoria (recargado tras cada operación de servicios)
+            servicios_models = catalogo_servicios.filtrar(search, categoria, activos_only)
+
             logger.info(f"✅ Servicios obtenidos: {len(servicios_models)} registros")
             return servicios_models
             
@@ -82,6 +51,7 @@ class ServiciosService(BaseService):
             self.handle_error("Error obteniendo servicios filtrados", e)
             return []
     
+    @invalidate_after_service_operation("create")
     async def create_service(self, servicio_form: ServicioFormModel, user_id: str) -> Optional[ServicioModel]:
         """
         Crea un nuevo servicio odontológico
@@ -144,6 +114,7 @@ class ServiciosService(BaseService):
             self.handle_error("Error creando servicio", e)
             raise ValueError(f"Error inesperado: {str(e)}")
     
+    @invalidate_after_service_operation("update")
     async def update_service(self, service_id: str, servicio_form: ServicioFormModel) -> Optional[ServicioModel]:
         """
         Actualiza un servicio existente
@@ -202,6 +173,7 @@ class ServiciosService(BaseService):
         return None
 
     
+    @invalidate_after_service_operation("status_change")
     async def deactivate_service(self, service_id: str, motivo: str = None) -> bool:
         """
         Desactiva un servicio (soft delete)
@@ -238,6 +210,7 @@ class ServiciosService(BaseService):
             self.handle_error("Error desactivando servicio", e)
             raise ValueError(f"Error inesperado: {str(e)}")
     
+    @invalidate_after_service_operation("status_change")
     async def reactivate_service(self, service_id: str) -> bool:
         """
         Reactiva un servicio
@@ -284,10 +257,7 @@ class ServiciosService(BaseService):
             # Verificar permisos
             self.require_permission("servicios", "leer")
 
-            response = self.client.table("servicio").select("*").eq("id", service_id).execute()
-            if response.data:
-                return ServicioModel.from_dict(response.data[0])
-            return None
+            return catalogo_servicios.get(service_id)
             
         except Exception as e:
             self.handle_error("Error obteniendo servicio por ID", e)
@@ -304,12 +274,8 @@ class ServiciosService(BaseService):
             # Verificar permisos
             self.require_permission("servicios", "leer")
 
-            # Obtener categorías únicas
-            response = self.client.table("servicio").select("categoria").eq("activo", True).execute()
-            categorias = list(set([s["categoria"] for s in response.data if s.get("categoria")])) if response.data else []
-            categorias.sort()
-            logger.info(f"Categorías obtenidas: {categorias}")
-            return categorias
+            # Categorías únicas de servicios activos (catálogo en memoria)
+            return catalogo_servicios.get_categorias()
             
         except Exception as e:
             self.handle_error("Error obteniendo categorías", e)
@@ -0,0 +1,297 @@
+"""
+💱 SERVICIO DE TASA DE CAMBIO BS/USD
+====================================
+
+Fuente única de la tasa del día y de su historial.
+
+- Una fila por día en la tabla tasa_cambio (historial completo en BD)
+- Cache en memoria compartido por todo el proceso:
+    * Tasa vigente (con TTL de MODULE_CACHE_TTL['pagos'])
+    * Ventana acotada de tasas pasadas (VENTANA_CACHE_TASAS_DIAS)
+- La tasa vigente para un día sin registro es la última registrada antes de ese día
+
+USADO POR: PagosService, EstadoPagos (formulario dual), ReportesService
+"""
+
+from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+import threading
+import time
+import logging
+
+from .base_service import BaseService
+from .cache_invalidation_hooks import MODULE_CACHE_TTL, track_cache_invalidation
+from dental_system.constants import TASA_CAMBIO_DEFAULT, VENTANA_CACHE_TASAS_DIAS
+
+logger = logging.getLogger(__name__)
+
+
+class CacheTasasCambio:
+    """
+    🗄️ Cache de tasas en memoria (compartido entre todas las sesiones)
+
+    historial: fecha ISO → tasa vigente ese día, ordenado por inserción y
+    acotado a `ventana_dias` entradas (se descartan las más antiguas).
+    """
+
+    def __init__(self, ventana_dias: int = VENTANA_CACHE_TASAS_DIAS, ttl: int = MODULE_CACHE_TTL['pagos']):
+        self._lock = threading.Lock()
+        self.ventana_dias = ventana_dias
+        self.ttl = ttl
+        self.tasa_actual: Optional[float] = None
+        self.fecha_tasa_actual: Optional[str] = None
+        self.timestamp_actual: float = 0.0
+        self.historial: "OrderedDict[str, float]" = OrderedDict()
+
+    def get_actual(self) -> Optional[float]:
+        """Tasa vigente si sigue fresca (mismo día y dentro del TTL)"""
+        with self._lock:
+            if self.tasa_actual is None:
+                return None
+            if self.fecha_tasa_actual != date.today().isoformat():
+                return None
+            if time.time() - self.timestamp_actual > self.ttl:
+                return None
+            return self.tasa_actual
+
+    def set_actual(self, tasa: float):
+        with self._lock:
+            self.tasa_actual = tasa
+            self.fecha_tasa_actual = date.today().isoformat()
+            self.timestamp_actual = time.time()
+
+    def get_fechas(self, fechas: List[str]) -> Dict[str, float]:
+        """Tasas cacheadas para las fechas pedidas (solo las que existan)"""
+        with self._lock:
+            return {f: self.historial[f] for f in fechas if f in self.historial}
+
+    def set_fechas(self, tasas: Dict[str, float]):
+        """Guardar tasas de días pasados respetando la ventana máxima"""
+        hoy = date.today().isoformat()
+        with self._lock:
+            for fecha, tasa in tasas.items():
+                # El día en curso puede cambiar todavía: no se fija en el historial
+                if fecha >= hoy:
+                    continue
+                self.historial[fecha] = tasa
+                self.historial.move_to_end(fecha)
+            while len(self.historial) > self.ventana_dias:
+                self.historial.popitem(last=False)
+
+    def invalidar(self, desde_fecha: Optional[str] = None):
+        """Invalidar tasa actual y (opcionalmente) el historial desde una fecha"""
+        with self._lock:
+            self.tasa_actual = None
+            self.fecha_tasa_actual = None
+            self.timestamp_actual = 0.0
+            if desde_fecha:
+                for fecha in [f for f in self.historial if f >= desde_fecha]:
+                    del self.historial[fecha]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tasa_actual": self.tasa_actual,
+                "fecha_tasa_actual": self.fecha_tasa_actual,
+                "dias_en_cache": len(self.historial),
+                "ventana_dias": self.ventana_dias
+            }
+
+
+# Instancia global (una por proceso)
+cache_tasas = CacheTasasCambio()
+
+
+class TasaCambioService(BaseService):
+    """
+    Servicio que centraliza la lectura y registro de la tasa BS/USD
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    # ==========================================
+    # 💱 TASA VIGENTE
+    # ==========================================
+
+    async def get_tasa_actual(self, force_refresh: bool = False) -> float:
+        """
+        💱 Obtener la tasa vigente hoy (cache → BD → default)
+
+        Returns:
+            Tasa BS por 1 USD
+        """
+        if not force_refresh:
+            tasa = cache_tasas.get_actual()
+            if tasa is not None:
+                return tasa
+
+        try:
+            response = self.client.table("tasa_cambio").select(
+                "fecha, tasa_bs_usd"
+            ).lte("fecha", date.today().isoformat()).order(
+                "fecha", desc=True
+            ).limit(1).execute()
+
+            if response.data:
+                tasa = float(response.data[0]["tasa_bs_usd"])
+            else:
+                logger.warning(f"⚠️ Sin tasas registradas, usando tasa por defecto {TASA_CAMBIO_DEFAULT}")
+                tasa = TASA_CAMBIO_DEFAULT
+
+            cache_tasas.set_actual(tasa)
+            return tasa
+
+        except Exception as e:
+            self.handle_error("Error obteniendo tasa de cambio actual", e)
+            return cache_tasas.tasa_actual or TASA_CAMBIO_DEFAULT
+
+    def get_tasa_en_cache(self) -> Optional[float]:
+        """💱 Tasa vigente solo desde memoria (sin BD), para código síncrono"""
+        return cache_tasas.get_actual()
+
+    async def registrar_tasa_del_dia(self, tasa: float, user_id: Optional[str] = None, fecha: Optional[date] = None) -> float:
+        """
+        💾 Registrar (o corregir) la tasa de un día
+
+        Args:
+            tasa: Tasa BS por 1 USD
+            user_id: ID del usuario que registra
+            fecha: Día al que aplica (por defecto hoy)
+
+        Returns:
+            Tasa registrada
+        """
+        try:
+            # Verificar permisos (mismo permiso que registrar pagos)
+            self.require_permission("pagos", "crear")
+
+            if tasa is None or float(tasa) <= 0:
+                raise ValueError("La tasa de cambio debe ser mayor a cero")
+
+            fecha = fecha or date.today()
+            registro = {
+                "fecha": fecha.isoformat(),
+                "tasa_bs_usd": float(tasa),
+                "registrado_por": user_id or None,
+                "fecha_actualizacion": datetime.now().isoformat()
+            }
+
+            self.client.table("tasa_cambio").upsert(registro, on_conflict="fecha").execute()
+
+            # Una corrección de un día pasado afecta los días siguientes sin registro propio
+            cache_tasas.invalidar(desde_fecha=fecha.isoformat())
+            if fecha == date.today():
+                cache_tasas.set_actual(float(tasa))
+
+            track_cache_invalidation("pagos", "update", {"tasa_cambio": float(tasa), "fecha": fecha.isoformat()})
+            logger.info(f"✅ Tasa registrada: {tasa} BS/USD ({fecha.isoformat()})")
+            return float(tasa)
+
+        except PermissionError:
+            logger.warning("Usuario sin permisos para registrar la tasa de cambio")
+            raise
+        except ValueError:
+            raise
+        except Exception as e:
+            self.handle_error("Error registrando tasa de cambio", e)
+            raise ValueError(f"Error inesperado: {str(e)}")
+
+    # ==========================================
+    # 📅 HISTORIAL DE TASAS
+    # ==========================================
+
+    async def get_tasas_rango(self, fecha_inicio: str, fecha_fin: str) -> Dict[str, float]:
+        """
+        📅 Tasa vigente para cada día del rango [fecha_inicio, fecha_fin]
+
+        Usa el cache si cubre el rango completo; si falta algún día hace
+        como máximo 2 queries (tasas del rango + última tasa anterior al rango).
+
+        Args:
+            fecha_inicio: YYYY-MM-DD
+            fecha_fin: YYYY-MM-DD
+
+        Returns:
+            {"2025-10-01": 36.5, "2025-10-02": 36.8, ...}
+        """
+        try:
+            inicio = date.fromisoformat(fecha_inicio[:10])
+            fin = date.fromisoformat(fecha_fin[:10])
+            if fin < inicio:
+                inicio, fin = fin, inicio
+
+            fechas = [(inicio + timedelta(days=i)).isoformat() for i in range((fin - inicio).days + 1)]
+            hoy = date.today().isoformat()
+
+            tasas = cache_tasas.get_fechas(fechas)
+            if hoy in fechas:
+                tasa_hoy = cache_tasas.get_actual()
+                if tasa_hoy is not None:
+                    tasas[hoy] = tasa_hoy
+
+            if len(tasas) == len(fechas):
+                return tasas
+
+            # Tasa vigente al inicio del rango (último registro previo)
+            anterior_response = self.client.table("tasa_cambio").select(
+                "tasa_bs_usd"
+            ).lt("fecha", fechas[0]).order("fecha", desc=True).limit(1).execute()
+            tasa_vigente = float(anterior_response.data[0]["tasa_bs_usd"]) if anterior_response.data else None
+
+            rango_response = self.client.table("tasa_cambio").select(
+                "fecha, tasa_bs_usd"
+            ).gte("fecha", fechas[0]).lte("fecha", fechas[-1]).order("fecha").execute()
+            registradas = {
+                r["fecha"][:10]: float(r["tasa_bs_usd"]) for r in (rango_response.data or [])
+            }
+
+            # Arrastrar la última tasa conocida a los días sin registro
+            tasas = {}
+            for fecha in fechas:
+                if fecha in registradas:
+                    tasa_vigente = registradas[fecha]
+                tasas[fecha] = tasa_vigente if tasa_vigente is not None else TASA_CAMBIO_DEFAULT
+
+            cache_tasas.set_fechas(tasas)
+            if hoy in tasas:
+                cache_tasas.set_actual(tasas[hoy])
+
+            return tasas
+
+        except Exception as e:
+            self.handle_error("Error obteniendo historial de tasas", e)
+            return {}
+
+    async def get_tasa_por_fecha(self, fecha: str) -> float:
+        """📅 Tasa vigente en un día concreto (YYYY-MM-DD)"""
+        tasas = await self.get_tasas_rango(fecha, fecha)
+        return tasas.get(fecha[:10], TASA_CAMBIO_DEFAULT)
+
+    async def get_tasa_promedio(self, fecha_inicio: str, fecha_fin: str) -> float:
+        """📊 Promedio de la tasa vigente día a día en el rango"""
+        tasas = await self.get_tasas_rango(fecha_inicio, fecha_fin)
+        if not tasas:
+            return TASA_CAMBIO_DEFAULT
+        return round(sum(tasas.values()) / len(tasas), 2)
+
+    def convertir_bs_a_usd(self, monto_bs: float, fecha: str, tasas: Dict[str, float]) -> float:
+        """
+        💱 Convertir BS → USD con la tasa del día del movimiento
+
+        Args:
+            monto_bs: Monto en bolívares
+            fecha: Fecha del movimiento (ISO, se usan los 10 primeros caracteres)
+            tasas: Resultado de get_tasas_rango() para el período del reporte
+        """
+        tasa = tasas.get((fecha or "")[:10]) or TASA_CAMBIO_DEFAULT
+        return float(monto_bs or 0) / tasa if tasa > 0 else 0.0
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """📊 Estado del cache de tasas"""
+        return cache_tasas.stats()
+
+
+# Instancia única para importar
+tasa_cambio_service = TasaCambioService()
@@ -31,6 +31,7 @@ from .estado_pagos import EstadoPagos
 from .estado_intervencion_servicios import EstadoIntervencionServicios
 from .estado_perfil import EstadoPerfil
 from .estado_reportes import EstadoReportes
+from dental_system.services.pacientes_service import pacientes_service
 # REFACTOR FASE 4: estado_odontograma_avanzado eliminado - funcionalidad en EstadoOdontologia
 
 logger = logging.getLogger(__name__)
@@ -72,6 +73,11 @@ class AppState(EstadoReportes, EstadoPerfil, EstadoIntervencionServicios,EstadoS
 
             print(f"📄 Página inicial establecida: {self.current_page}")
 
+            # Índice de búsqueda del modal de consultas: se construye una vez
+            # por proceso en segundo plano (no-op si ya existe)
+            if self.rol_usuario != "odontologo":
+                pacientes_service.precargar_indice_pacientes()
+
             # Datos específicos por rol
             if self.rol_usuario == "gerente":
                 # Gerente: Acceso completo a todo
@@ -191,13 +197,9 @@ class AppState(EstadoReportes, EstadoPerfil, EstadoIntervencionServicios,EstadoS
 
         try:
             # 🆕 Últimos 5 pacientes registrados
-            pacientes_recientes = sorted(
-                [p for p in self.lista_pacientes if p.fecha_registro],
-                key=lambda p: p.fecha_registro,
-                reverse=True
-            )[:5]
-
-            for pac in pacientes_recientes:
+            for pac in self.pacientes_recientes:
+                if not pac.fecha_registro:
+                    continue
                 actividades.append(ActividadReciente(
                     tipo="paciente",
                     titulo=f"Nuevo paciente: {pac.nombre_completo}",
@@ -21,6 +21,7 @@ import logging
 
 # Servicios y modelos
 from dental_system.services.consultas_service import consultas_service
+from dental_system.services.pacientes_service import pacientes_service
 from dental_system.models import (
     ConsultaModel,
     TurnoModel, 
@@ -70,6 +71,7 @@ class EstadoConsultas(rx.State,mixin=True):
     # Variables del modal (consolidadas)
     consulta_form_busqueda_paciente: str = ""
     consulta_form_paciente_seleccionado: PacienteModel = PacienteModel()
+    pacientes_filtrados_modal: List[PacienteModel] = []  # Resultados del índice en memoria
     cargando_crear_consulta: bool = False
     
     # ==========================================
@@ -530,62 +532,6 @@ class EstadoConsultas(rx.State,mixin=True):
     # 🔍 COMPUTED VARS PARA BÚSQUEDA DE PACIENTES
     # ==========================================
     
-    @rx.var(cache=False)
-    def pacientes_filtrados_modal(self) -> List[PacienteModel]:
-        """🔍 Lista de pacientes filtrados para modal de nueva consulta"""
-  
-        
-        # Si no hay término de búsqueda, no mostrar nada
-        if not self.consulta_form_busqueda_paciente.strip():
-            return []
-        
-        # Si el término es muy corto, esperar más caracteres
-        termino = self.consulta_form_busqueda_paciente.strip()
-        if len(termino) < 2:
-            return []
-        
-        try:
-            # Obtener lista de pacientes desde AppStateapp_state = get_state("dental_system.state.app_state.AppState")
-            if not self.lista_pacientes:
-                return []
-            
-            busqueda = termino.lower()
-            pacientes_filtrados = []
-            
-            # Buscar en la lista de pacientes
-            for paciente in self.lista_pacientes:
-                # Buscar en nombre completo
-                primer_nombre = (paciente.primer_nombre or "").lower()
-                segundo_nombre = (paciente.segundo_nombre or "").lower() 
-                primer_apellido = (paciente.primer_apellido or "").lower()
-                segundo_apellido = (paciente.segundo_apellido or "").lower()
-                
-                # Buscar en número de documento
-                numero_doc = (paciente.numero_documento or "").lower()
-                
-                # Buscar en cualquier parte de los nombres o documento
-                match = (busqueda in primer_nombre or 
-                        busqueda in segundo_nombre or
-                        busqueda in primer_apellido or
-                        busqueda in segundo_apellido or
-                        busqueda in numero_doc or
-                        busqueda in f"{primer_nombre} {primer_apellido}" or
-                        busqueda in f"{primer_nombre} {segundo_nombre}" or
-                        busqueda in f"{primer_nombre} {segundo_nombre} {primer_apellido}")
-                
-                if match:
-                    pacientes_filtrados.append(paciente)
-                    
-                    # Limitar resultados para performance
-                    if len(pacientes_filtrados) >= 8:
-                        break
-            
-            return pacientes_filtrados
-            
-        except Exception as e:
-            print(f"🚨 Error en pacientes_filtrados_modal: {e}")
-            return []
-    
     @rx.var
     def pacientes_filtrados_modal_count(self) -> int:
         """🔢 Contador de pacientes filtrados para el modal"""
@@ -741,6 +687,8 @@ class EstadoConsultas(rx.State,mixin=True):
             self.set_formulario_consulta_field("paciente_nombre", value)
         else:
             self.set_consulta_form_busqueda_paciente(value)
+            # Índice compartido del proceso: no requiere lista_pacientes en la sesión
+            self.pacientes_filtrados_modal = pacientes_service.buscar_pacientes_modal(value)
     
     @rx.event  
     async def actualizar_consulta(self):
@@ -904,6 +852,7 @@ class EstadoConsultas(rx.State,mixin=True):
                 if paciente:
                     self.consulta_form_paciente_seleccionado = paciente
                     self.consulta_form_busqueda_paciente = ""
+                    self.pacientes_filtrados_modal = []
                     self.set_formulario_consulta_field("paciente_id", paciente.id)
                     self.set_formulario_consulta_field("paciente_nombre", paciente.nombre_completo)
 
@@ -1013,6 +962,37 @@ class EstadoConsultas(rx.State,mixin=True):
     # 🔄 MÉTODOS DE REORDENAMIENTO EN COLA
     # ==========================================
     
+    def _aplicar_movimiento_en_cola(self, consulta_id: str, resultado: Dict[str, Any]) -> bool:
+        """
+        ↕️ Reordenar en consultas_hoy la cola del odontólogo con el orden
+        completo que retornó mover_consulta_en_cola
+
+        La RPC devuelve la cola entera tal como quedó en BD (incluye los
+        movimientos hechos desde otras sesiones). Si las consultas de esa
+        cola no coinciden con las locales (llegó o salió alguien), retorna
+        False y se recarga la lista.
+        """
+        consulta = next((c for c in self.consultas_hoy if c.id == consulta_id), None)
+        cola = resultado.get("cola") or []
+        if not consulta or not cola:
+            return False
+
+        orden_por_id = {item.get("id"): item.get("orden") for item in cola}
+        en_cola_local = [
+            c for c in self.consultas_hoy
+            if c.primer_odontologo_id == consulta.primer_odontologo_id
+            and c.estado in ["programada", "en_espera"]
+        ]
+        if {c.id for c in en_cola_local} != set(orden_por_id):
+            return False
+
+        for c in en_cola_local:
+            c.orden_cola_odontologo = orden_por_id[c.id]
+
+        self.consultas_hoy = list(self.consultas_hoy)
+        self._actualizar_turnos_por_odontologo()
+        return True
+
     @rx.event
     async def subir_en_cola(self, consulta_id: str):
         """⬆️ Subir paciente una posición en la cola de su odontólogo"""
@@ -1053,10 +1033,11 @@ class EstadoConsultas(rx.State,mixin=True):
             logger.info(f"📊 Resultado del servicio: {resultado}")
 
             if resultado.get("success"):
-                await self.cargar_lista_consultas()
+                if not self._aplicar_movimiento_en_cola(consulta_id, resultado):
+                    await self.cargar_lista_consultas()
 
                 self.mostrar_toast("✅ Paciente movido hacia arriba", "success")
-                logger.info(f"✅ Intercambio exitoso y lista recargada")
+                logger.info(f"✅ Intercambio exitoso")
             else:
                 error_msg = resultado.get("message", "Error desconocido")
                 self.mostrar_toast(f"❌ {error_msg}", "error")
@@ -1110,11 +1091,11 @@ class EstadoConsultas(rx.State,mixin=True):
             logger.info(f"📊 Resultado del servicio: {resultado}")
 
             if resultado.get("success"):
-
-                await self.cargar_lista_consultas()
+                if not self._aplicar_movimiento_en_cola(consulta_id, resultado):
+                    await self.cargar_lista_consultas()
 
                 self.mostrar_toast("✅ Paciente movido hacia abajo", "success")
-                logger.info(f"✅ Intercambio exitoso y lista recargada")
+                logger.info(f"✅ Intercambio exitoso")
             else:
                 error_msg = resultado.get("message", "Error desconocido")
                 self.mostrar_toast(f"❌ {error_msg}", "error")
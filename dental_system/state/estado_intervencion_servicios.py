@@ -17,7 +17,7 @@
 #   * _resolver_conflictos_servicios()
 #   * _actualizar_odontograma_por_servicios()
 #   * _extraer_numeros_dientes()
-# - Creado _actualizar_odontograma_directo() (50 líneas, simple)
+# - Creado _construir_actualizaciones_odontograma() (cambios enviados en la RPC)
 # - Reducción de conversiones: de 4 a 1
 #
 # RESULTADO: -585 líneas (-71%), código más simple y rápido
@@ -26,8 +26,7 @@
 # - agregar_servicio_directo()
 # - remover_servicio_de_intervencion()
 # - finalizar_mi_intervencion_odontologo() [SIMPLIFICADO]
-# - _actualizar_odontograma_directo() [NUEVO]
-# - _cambiar_estado_consulta_entre_odontologos()
+# - _construir_actualizaciones_odontograma()
 # - derivar_paciente_a_otro_odontologo()
 # - _recalcular_totales()
 
@@ -38,6 +37,8 @@ from datetime import datetime
 from dental_system.models import ActualizacionOdontogramaResult
 # Modelos necesarios
 from dental_system.models import ServicioModel
+from dental_system.services.tasa_cambio_service import tasa_cambio_service
+from dental_system.constants import TASA_CAMBIO_DEFAULT
 
 logger = logging.getLogger(__name__)
 
@@ -191,8 +192,8 @@ class EstadoIntervencionServicios(rx.State, mixin=True):
         try:
             logger.info(f"➕ V2.0 Agregando servicio directo: {servicio.nombre}")
 
-            # ✨ OBTENER TASA DE CAMBIO DEL DÍA (desde EstadoPagos)
-            tasa_actual = getattr(self, 'tasa_del_dia', 36.50)
+            # ✨ OBTENER TASA DE CAMBIO DEL DÍA (cache de tasa_cambio_service → EstadoPagos)
+            tasa_actual = tasa_cambio_service.get_tasa_en_cache() or getattr(self, 'tasa_del_dia', TASA_CAMBIO_DEFAULT)
             logger.info(f"💱 Usando tasa de cambio: {tasa_actual} BS/USD")
 
             # Crear servicio completo unificado
@@ -283,10 +284,9 @@ class EstadoIntervencionServicios(rx.State, mixin=True):
 
         FLUJO SIMPLIFICADO:
         1. Validar consulta y servicios
-        2. Guardar intervención en BD
-        3. Actualizar odontograma
-        4. Cambiar estado consulta a "entre_odontologos"
-        5. Limpiar y navegar de vuelta
+        2. Guardar intervención + odontograma + estado "entre_odontologos"
+           en UNA transacción (1 RPC)
+        3. Limpiar y navegar de vuelta
         """
         try:
             # Validaciones básicas
@@ -323,25 +323,31 @@ class EstadoIntervencionServicios(rx.State, mixin=True):
                         "observaciones": servicio.observaciones
                     })
 
-            # 2. CREAR INTERVENCIÓN EN BD
+            # 2. INTERVENCIÓN + ODONTOGRAMA + ESTADO CONSULTA (1 transacción)
             resultado = await odontologia_service.crear_intervencion_con_servicios({
                 "consulta_id": self.consulta_actual.id,
+                "paciente_id": self.consulta_actual.paciente_id,
                 "odontologo_id": self.id_usuario,
                 "servicios": servicios_backend,
-                "observaciones_generales": f"Intervención con {len(servicios_backend)} servicios"
+                "observaciones_generales": f"Intervención con {len(servicios_backend)} servicios",
+                "condiciones": self._construir_actualizaciones_odontograma(),
+                "nuevo_estado_consulta": "entre_odontologos"
             })
 
             if not resultado.get("success"):
                 return
 
-            # 3. ACTUALIZAR ODONTOGRAMA (directo, sin conversiones)
-            intervencion_id = resultado.get("intervencion_id")
-            await self._actualizar_odontograma_directo(intervencion_id)
+            if not resultado.get("estado_consulta_actualizado"):
+                logger.warning(f"⚠️ Consulta {self.consulta_actual.numero_consulta} no cambió a 'entre_odontologos'")
 
-            # 4. CAMBIAR ESTADO CONSULTA
-            await self._cambiar_estado_consulta_entre_odontologos()
+            # Recargar odontograma en UI si hubo cambios
+            if resultado.get("condiciones_actualizadas") and hasattr(self, "cargar_odontograma_paciente"):
+                try:
+                    await self.cargar_odontograma_paciente(self.paciente_actual.id)
+                except Exception as odonto_error:
+                    logger.warning(f"⚠️ No se pudo recargar odontograma: {odonto_error}")
 
-            # 5. LIMPIAR Y NAVEGAR
+            # 3. LIMPIAR Y NAVEGAR
             self.servicios_en_intervencion = []
             await self.cargar_lista_consultas()
             self.navigate_to("odontologia")
@@ -357,58 +363,41 @@ class EstadoIntervencionServicios(rx.State, mixin=True):
     # ACTUALIZACIÓN DIRECTA DE ODONTOGRAMA (SIMPLIFICADO)
     # ==========================================
 
-    async def _actualizar_odontograma_directo(self, intervencion_id: str):
+    def _construir_actualizaciones_odontograma(self) -> List[Dict[str, Any]]:
         """
-        🦷 Actualizar odontograma DIRECTAMENTE desde servicios_en_intervencion
+        🦷 Cambios de odontograma que producen los servicios_en_intervencion
 
-        SIMPLIFICADO: Sin conversiones innecesarias, usa los datos que ya tenemos
+        Sin intervencion_id: lo asigna la BD al crear la intervención
         """
-        try:
-            if not self.paciente_actual or not self.paciente_actual.id:
-                return
-
-            from dental_system.services.odontologia_service import odontologia_service
-
-            actualizaciones = []
-
-            # Procesar cada servicio directamente
-            for servicio in self.servicios_en_intervencion:
-                # Solo servicios que modifican odontograma
-                if not servicio.nueva_condicion or not servicio.diente_numero:
-                    continue
-
-                # Determinar superficies según alcance
-                if servicio.alcance == "diente_completo":
-                    superficies = ["oclusal", "mesial", "distal", "vestibular", "lingual"]
-                elif servicio.alcance == "superficie_especifica":
-                    superficies = servicio.superficies or []
-                else:  # boca_completa
-                    continue  # No modifica dientes individuales
-
-                # Crear actualización para cada superficie
-                for superficie in superficies:
-                    actualizaciones.append({
-                        "paciente_id": str(self.paciente_actual.id),
-                        "diente_numero": int(servicio.diente_numero),
-                        "superficie": str(superficie),
-                        "tipo_condicion": str(servicio.nueva_condicion),
-                        "descripcion": str(servicio.observaciones or servicio.nombre_servicio),
-                        "intervencion_id": str(intervencion_id)
-                    })
-
-            # Ejecutar actualización batch
-            if actualizaciones:
-                await odontologia_service.actualizar_condiciones_batch(actualizaciones)
-
-                # Recargar odontograma en UI
-                if hasattr(self, "cargar_odontograma_paciente"):
-                    try:
-                        await self.cargar_odontograma_paciente(self.paciente_actual.id)
-                    except:
-                        pass
-
-        except Exception as e:
-            print(f"⚠️ Error actualizando odontograma: {str(e)}")
+        if not self.paciente_actual or not self.paciente_actual.id:
+            return []
+
+        actualizaciones = []
+
+        # Procesar cada servicio directamente
+        for servicio in self.servicios_en_intervencion:
+            # Solo servicios que modifican odontograma
+            if not servicio.nueva_condicion or not servicio.diente_numero:
+                continue
+
+            # Determinar superficies según alcance
+            if servicio.alcance == "diente_completo":
+                superficies = ["oclusal", "mesial", "distal", "vestibular", "lingual"]
+            elif servicio.alcance == "superficie_especifica":
+                superficies = servicio.superficies or []
+            else:  # boca_completa
+                continue  # No modifica dientes individuales
+
+            # Crear actualización para cada superficie
+            for superficie in superficies:
+                actualizaciones.append({
+                    "paciente_id": str(self.paciente_actual.id),
+                    "diente_numero": int(servicio.diente_numero),
+                    "superficie": str(superficie),
+                    "tipo_condicion": str(servicio.nueva_condicion)
+                })
+
+        return actualizaciones
 
     # ==========================================
     # FUNCIONES LEGACY ELIMINADAS (2025-01-13)
@@ -421,28 +410,11 @@ class EstadoIntervencionServicios(rx.State, mixin=True):
     # - _extraer_numeros_dientes() (no se usaba)
     #
     # REEMPLAZADAS POR:
-    # - _actualizar_odontograma_directo() (50 líneas, simple y directo)
+    # - _construir_actualizaciones_odontograma() + RPC crear_intervencion_completa
     #
     # Reducción: -540 líneas de código (-90%)
     # ==========================================
 
-    async def _cambiar_estado_consulta_entre_odontologos(self):
-        """🔄 Cambiar consulta a estado 'entre_odontologos'"""
-        try:
-            from dental_system.services.consultas_service import consultas_service
-
-            # Configurar contexto de usuario
-            consultas_service.set_user_context(self.id_usuario, self.perfil_usuario)
 
-            # Llamar al servicio (async)
-            result = await consultas_service.change_consultation_status(
-                self.consulta_actual.id,
-                "entre_odontologos"
-            )
-
-            logger.info(f"🔄 Consulta {self.consulta_actual.numero_consulta} marcada como estado 'entre_odontologos'")
-
-        except Exception as e:
-            logger.error(f"Error cambiando estado de consulta: {str(e)}")
 
 
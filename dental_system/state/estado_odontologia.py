@@ -2,7 +2,26 @@
 import reflex as rx
 from typing import Dict, Any, List, Optional, Tuple
 import logging
+from datetime import datetime, timedelta, timezone
 from dental_system.services.odontologia_service import odontologia_service
+from dental_system.services.catalogo_servicios import catalogo_servicios
+from dental_system.services.prefetch_contexto_clinico import (
+    prefetch_contexto_clinico,
+    PACIENTES_ADELANTE_PREFETCH
+)
+from dental_system.utils.odontograma_compacto import (
+    TAMANO_ODONTOGRAMA,
+    ORDEN_DIENTES,
+    SUPERFICIES_POR_DIENTE,
+    odontograma_vacio,
+    posicion,
+    diente_y_superficie,
+    codigo_condicion,
+    nombre_condicion,
+    posiciones_distintas,
+    datos_diente
+)
+
 from dental_system.models import (
     PacienteModel,
     ConsultaModel,
@@ -10,13 +29,17 @@ from dental_system.models import (
     ServicioModel,
     OdontogramaModel,
     IntervencionFormModel,
-    HistorialServicioModel
+    HistorialServicioModel,
+    hidratar_consultas
 )
 # ✅ V2.0: Importar modelo unificado
 from dental_system.state.estado_intervencion_servicios import ServicioIntervencionCompleto
 
 logger = logging.getLogger(__name__)
 
+# Grid por defecto mientras no hay odontograma cargado
+DIENTES_SANOS = [datos_diente(i, odontograma_vacio()) for i in range(len(ORDEN_DIENTES))]
+
 class EstadoOdontologia(rx.State, mixin=True):
     """
     🦷 ESTADO ESPECIALIZADO EN MÓDULO ODONTOLÓGICO
@@ -106,6 +129,11 @@ class EstadoOdontologia(rx.State, mixin=True):
     timeline_filter_procedure: str = "all"  # Filtro por procedimiento
     timeline_filter_period: str = "all"  # Filtro por período (all|7|30|90)
 
+    # Odontograma en una fecha (timeline): "" = odontograma actual
+    odontograma_fecha_corte: str = ""
+    odontograma_dientes_corte: List[Dict[str, Any]] = []
+    odontograma_corte_cargando: bool = False
+
     # ==========================================
     # 💉 VARIABLES PARA INTERVENCIONES COMPLETAS
     # ==========================================
@@ -239,8 +267,15 @@ class EstadoOdontologia(rx.State, mixin=True):
     odontograma_guardando: bool = False
     odontograma_error: str = ""
 
-    # Condiciones por diente organizadas (para interactividad)
-    condiciones_por_diente: Dict[int, Dict[str, str]] = {}  # {diente_num: {superficie: condicion}}
+    # Odontograma compacto: 32 dientes × 5 superficies (ver utils/odontograma_compacto)
+    odontograma_codigos: List[int] = []  # posicion(diente, superficie) → código de condición
+
+    # Datos del grid por diente (32 entradas), recalculados solo para dientes tocados
+    odontograma_dientes: List[Dict[str, Any]] = []
+
+    # Dirty tracking: foto de lo guardado en BD + posiciones tocadas desde entonces
+    odontograma_codigos_guardados: List[int] = []
+    superficies_modificadas: List[int] = []  # posiciones en odontograma_codigos
 
     # Modal de selección de condiciones
     modal_condiciones_abierto: bool = False
@@ -478,6 +513,9 @@ class EstadoOdontologia(rx.State, mixin=True):
                     self.pacientes_asignados.append(paciente_basico)
             
             logger.info(f"✅ Consultas asignadas cargadas: {len(self.consultas_asignadas)}")
+
+            # ⏩ Calentar el contexto clínico de los primeros de la cola
+            self._precargar_proximos_pacientes()
             
         except Exception as e:
             logger.error(f"❌ Error cargando consultas asignadas: {e}")
@@ -503,9 +541,7 @@ class EstadoOdontologia(rx.State, mixin=True):
             consultas_disponibles = await odontologia_service.get_consultas_disponibles(self.id_personal)
 
             # ✅ CORRECCIÓN: Actualizar consultas_disponibles_otros (no pacientes_disponibles_otros)
-            self.consultas_disponibles_otros = [
-                ConsultaModel.from_dict(c) for c in consultas_disponibles
-            ]
+            self.consultas_disponibles_otros = hidratar_consultas(consultas_disponibles)
 
             logger.info(f"✅ Consultas disponibles cargadas: {len(self.consultas_disponibles_otros)}")
 
@@ -520,6 +556,25 @@ class EstadoOdontologia(rx.State, mixin=True):
     # ==========================================
     
  
+    def _precargar_proximos_pacientes(self, excluir_consulta_id: str = ""):
+        """
+        ⏩ Precargar odontograma e historial de los próximos pacientes en espera
+
+        Toma los PACIENTES_ADELANTE_PREFETCH primeros de la cola del odontólogo
+        (orden_cola_odontologo) y los precarga en segundo plano; al pulsar
+        "atender" la página de intervención se arma desde memoria.
+        """
+        en_espera = sorted(
+            (
+                c for c in self.consultas_asignadas
+                if c.estado == "en_espera" and c.id != excluir_consulta_id and c.paciente_id
+            ),
+            key=lambda c: c.orden_cola_odontologo or 9999
+        )
+        proximos = [c.paciente_id for c in en_espera[:PACIENTES_ADELANTE_PREFETCH]]
+        if proximos:
+            prefetch_contexto_clinico.programar(proximos)
+
     @rx.event
     async def seleccionar_paciente_consulta(self, paciente_id: str, consulta_id: str):
         """
@@ -571,7 +626,10 @@ class EstadoOdontologia(rx.State, mixin=True):
                 )
                 logger.info(f"🏥 Consulta cambiada a 'en_atencion'")
 
-            # 5. Cargar odontograma del paciente (última versión)
+            # ⏩ Mientras se atiende, precargar a los siguientes de la cola
+            self._precargar_proximos_pacientes(excluir_consulta_id=consulta_id)
+
+            # 5. Cargar odontograma del paciente (última versión, cache versionado)
             await self.cargar_odontograma_paciente_actual()
 
             # 7. Cargar historial del paciente
@@ -815,12 +873,15 @@ class EstadoOdontologia(rx.State, mixin=True):
                 return
 
             self.odontograma_cargando = True
-            
+            self.limpiar_odontograma_en_fecha()
+
             # SIMPLIFICADO: Solo un método
             result = await odontologia_service.get_patient_odontogram(self.paciente_actual.id)
 
-            # Asignar condiciones
-            self.condiciones_por_diente = result["conditions"]
+            # Asignar códigos (y foto base para detectar cambios)
+            self.odontograma_codigos = result["codigos"]
+            self._fijar_condiciones_guardadas()
+            self._recalcular_dientes()
 
             self.odontograma_cargando = False
             logger.info(f"✅ Odontograma cargado: {result['total_condiciones']} condiciones")
@@ -830,50 +891,185 @@ class EstadoOdontologia(rx.State, mixin=True):
             self.odontograma_cargando = False
 
 
+    def _fijar_condiciones_guardadas(self):
+        """📸 Tomar lo que hay en memoria como estado guardado en BD"""
+        if len(self.odontograma_codigos) != TAMANO_ODONTOGRAMA:
+            self.odontograma_codigos = odontograma_vacio()
+            self._recalcular_dientes()
+        self.odontograma_codigos_guardados = list(self.odontograma_codigos)
+        self.superficies_modificadas = []
+        self.cambios_sin_guardar = False
+
+    def _recalcular_dientes(self, indices: Optional[List[int]] = None):
+        """
+        🔁 Recalcular datos del grid
+
+        Sin índices (o si aún no hay datos) reconstruye los 32 dientes;
+        con índices solo actualiza esos dientes.
+        """
+        if indices is None or len(self.odontograma_dientes) != len(ORDEN_DIENTES):
+            self.odontograma_dientes = [
+                datos_diente(i, self.odontograma_codigos) for i in range(len(ORDEN_DIENTES))
+            ]
+            return
+
+        for i in set(indices):
+            self.odontograma_dientes[i] = datos_diente(i, self.odontograma_codigos)
+
+    def _condicion_guardada(self, diente_num: int, superficie: str) -> str:
+        if len(self.odontograma_codigos_guardados) != TAMANO_ODONTOGRAMA:
+            return "sano"
+        return nombre_condicion(self.odontograma_codigos_guardados[posicion(diente_num, superficie)])
+
+    def _registrar_cambio_superficie(self, diente_num: int, superficie: str, condicion: str):
+        """
+        ✏️ Cambiar una superficie en memoria y marcarla como pendiente
+
+        Si vuelve al valor guardado deja de estar pendiente.
+        """
+        if len(self.odontograma_codigos) != TAMANO_ODONTOGRAMA:
+            self._fijar_condiciones_guardadas()
+
+        pos = posicion(diente_num, superficie)
+        codigo = codigo_condicion(condicion)
+        if self.odontograma_codigos[pos] != codigo:
+            self.odontograma_codigos[pos] = codigo
+            self._recalcular_dientes([pos // SUPERFICIES_POR_DIENTE])
+
+        if self.odontograma_codigos[pos] != self.odontograma_codigos_guardados[pos]:
+            if pos not in self.superficies_modificadas:
+                self.superficies_modificadas.append(pos)
+        elif pos in self.superficies_modificadas:
+            self.superficies_modificadas.remove(pos)
+
+        self.cambios_sin_guardar = len(self.superficies_modificadas) > 0
+
+    def _cambios_pendientes_odontograma(self) -> List[Dict[str, Any]]:
+        """Solo las posiciones tocadas cuyo código difiere del guardado"""
+        distintas = set(posiciones_distintas(self.odontograma_codigos, self.odontograma_codigos_guardados))
+        cambios = []
+        for pos in self.superficies_modificadas:
+            if pos not in distintas:
+                continue
+            diente_num, superficie = diente_y_superficie(pos)
+            cambios.append({
+                "paciente_id": self.paciente_actual.id,
+                "diente_numero": diente_num,
+                "superficie": superficie,
+                "tipo_condicion": nombre_condicion(self.odontograma_codigos[pos])
+            })
+        return cambios
+
     @rx.event
     async def guardar_cambios_odontograma(self):
-        """💾 Guardar cambios del odontograma"""
+        """
+        💾 Guardar cambios del odontograma
+
+        Solo envía las superficies modificadas desde la última carga/guardado,
+        todas en una sola llamada (actualizar_condiciones_batch).
+        """
         try:
             if not self.cambios_sin_guardar:
                 return
 
+            cambios = self._cambios_pendientes_odontograma()
+            if not cambios:
+                self._fijar_condiciones_guardadas()
+                return
+
             self.odontograma_guardando = True
 
             # Obtener intervención actual
             intervencion_id = self.intervencion_actual_id if hasattr(self, 'intervencion_actual_id') else None
+            if intervencion_id:
+                for cambio in cambios:
+                    cambio["intervencion_id"] = intervencion_id
 
-            # SIMPLIFICADO: Actualizar cada cambio
-            for diente_num, superficies in self.condiciones_por_diente.items():
-                for superficie, condicion_data in superficies.items():
-                    # Extraer condición (puede ser str o dict)
-                    if isinstance(condicion_data, str):
-                        condicion_str = condicion_data
-                        material = None
-                    elif isinstance(condicion_data, dict):
-                        condicion_str = condicion_data.get("condicion", "sano")
-                        material = condicion_data.get("material")
-                    else:
-                        condicion_str = "sano"
-                        material = None
-
-                    await odontologia_service.actualizar_condicion_diente(
-                        paciente_id=self.paciente_actual.id,
-                        diente_numero=diente_num,
-                        superficie=superficie,
-                        nueva_condicion=condicion_str,
-                        intervencion_id=intervencion_id,
-                        material=material
-                    )
-
-            self.cambios_sin_guardar = False
+            odontologia_service.set_user_context(user_id=self.id_usuario, user_profile=self.perfil_usuario)
+            await odontologia_service.actualizar_condiciones_batch(cambios)
+
+            self._fijar_condiciones_guardadas()
             self.odontograma_guardando = False
-            self.mostrar_toast("Odontograma guardado correctamente", "success")
+            self.mostrar_toast(f"Odontograma guardado ({len(cambios)} superficie(s))", "success")
 
         except Exception as e:
             logger.error(f"❌ Error guardando odontograma: {e}")
             self.odontograma_guardando = False
             self.mostrar_toast(f"Error: {str(e)}", "error")
-  
+
+    # ==========================================
+    # 🕰️ ODONTOGRAMA EN UNA FECHA (TIMELINE)
+    # ==========================================
+
+    @rx.event
+    async def ver_odontograma_en_fecha(self, fecha: str):
+        """
+        🕰️ Mostrar el odontograma del paciente tal como estaba en `fecha`
+
+        Ej. la fecha de una intervención del historial ("como estaba en la visita X").
+        """
+        try:
+            if not fecha or not self.paciente_actual or not self.paciente_actual.id:
+                self.limpiar_odontograma_en_fecha()
+                return
+
+            self.odontograma_corte_cargando = True
+            result = await odontologia_service.get_odontograma_en_fecha(self.paciente_actual.id, fecha)
+
+            self.odontograma_fecha_corte = fecha
+            self.odontograma_dientes_corte = [
+                datos_diente(i, result["codigos"]) for i in range(len(ORDEN_DIENTES))
+            ]
+
+        except Exception as e:
+            logger.error(f"❌ Error cargando odontograma en fecha: {e}")
+            self.mostrar_toast("No se pudo cargar el odontograma de esa fecha", "error")
+        finally:
+            self.odontograma_corte_cargando = False
+
+    @rx.event
+    async def cambiar_periodo_timeline(self, periodo: str):
+        """
+        📅 Filtro de período del timeline (all|7|30|90)
+
+        Con un período se muestra el odontograma como estaba al inicio del
+        período (hace N días); "all" vuelve al odontograma actual.
+        """
+        self.timeline_filter_period = periodo
+        if periodo == "all" or not periodo.isdigit():
+            self.limpiar_odontograma_en_fecha()
+            return
+
+        fecha = (datetime.now(timezone.utc) - timedelta(days=int(periodo))).isoformat()
+        await self.ver_odontograma_en_fecha(fecha)
+
+    def limpiar_odontograma_en_fecha(self):
+        """Volver al odontograma actual"""
+        self.timeline_filter_period = "all"
+        self.odontograma_fecha_corte = ""
+        self.odontograma_dientes_corte = []
+
+    @rx.var(cache=True)
+    def get_teeth_data_corte(self) -> List[Dict[str, Any]]:
+        """🦷 Grid del odontograma en la fecha de corte (mismo formato que get_teeth_data)"""
+        if len(self.odontograma_dientes_corte) != len(ORDEN_DIENTES):
+            return DIENTES_SANOS
+        return self.odontograma_dientes_corte
+
+    @rx.var(cache=True)
+    def hay_odontograma_en_fecha(self) -> bool:
+        return self.odontograma_fecha_corte != ""
+
+    @rx.var(cache=True)
+    def odontograma_fecha_corte_texto(self) -> str:
+        """Fecha de corte legible (dd/mm/aaaa)"""
+        if not self.odontograma_fecha_corte:
+            return ""
+        try:
+            return datetime.fromisoformat(self.odontograma_fecha_corte[:19]).strftime("%d/%m/%Y")
+        except ValueError:
+            return self.odontograma_fecha_corte[:10]
+
     # ==========================================
     # 🌟 EVENTOS V4.0 - NUEVO DISEÑO PROFESIONAL
     # ==========================================
@@ -902,76 +1098,46 @@ class EstadoOdontologia(rx.State, mixin=True):
     # 📊 COMPUTED VARS V4.0 - DATOS PARA COMPONENTES PROFESIONALES
     # ============================================================================
 
-    @rx.var
-    def get_teeth_data(self) -> Dict[int, Dict[str, Any]]:
+    @rx.var(cache=True)
+    def get_teeth_data(self) -> List[Dict[str, Any]]:
         """
         🦷 Obtener data de todos los dientes para el grid profesional
 
-        Determina el STATUS GENERAL del diente analizando las condiciones de sus 5 superficies.
-        El status se asigna por PRIORIDAD (de más crítico a menos crítico).
+        Lista fija de 32 entradas en ORDEN_DIENTES (el grid indexa por
+        indice_diente). Solo depende de odontograma_dientes, que se mantiene
+        diente por diente en _recalcular_dientes: eventos de otros módulos
+        no recalculan nada del odontograma.
         """
+        if len(self.odontograma_dientes) != len(ORDEN_DIENTES):
+            return DIENTES_SANOS
+        return self.odontograma_dientes
 
-        if not self.condiciones_por_diente:
-            return {}
-
-        teeth_data = {}
-        for diente_num in range(11, 49):  # FDI: 11-18, 21-28, 31-38, 41-48
-            # Saltar números inválidos (19, 20, 29, 30, etc.)
-            if diente_num % 10 == 9 or diente_num % 10 == 0:
-                continue
 
-            # Obtener condiciones del diente actual (puede ser int o str)
-            condiciones = self.condiciones_por_diente.get(diente_num, {})
-            if not condiciones:
-                condiciones = self.condiciones_por_diente.get(str(diente_num), {})
-
-            # Extraer lista de condiciones para análisis
-            condiciones_no_sanas = [c for c in condiciones.values() if c != "sano"]
-
-            # ✅ LÓGICA CORREGIDA: Asignar status por PRIORIDAD
-            # Orden: ausente > fractura > caries > endodoncia > obturado > corona > implante > sano
-
-            if any(cond == "ausente" for cond in condiciones.values()):
-                status = "ausente"  # ⚫ Gris - Diente extraído
-            elif any(cond == "fractura" for cond in condiciones.values()):
-                status = "fractura"  # 🔴 Rojo - Fractura (urgente)
-            elif any(cond == "caries" for cond in condiciones.values()):
-                status = "caries"  # 🔴 Rojo - Caries (necesita tratamiento)
-            elif any(cond == "endodoncia" for cond in condiciones.values()):
-                status = "endodoncia"  # 🟠 Naranja - Tratamiento de conducto
-            elif any(cond == "obturacion" for cond in condiciones.values()):
-                status = "obturado"  # 🔵 Azul - Tiene obturación/empaste
-            elif any(cond == "corona" for cond in condiciones.values()):
-                status = "corona"  # 🟡 Amarillo - Corona dental
-            elif any(cond == "implante" for cond in condiciones.values()):
-                status = "implante"  # 🟣 Púrpura - Implante dental
-            else:
-                status = "sano"  # 🟢 Verde - Diente saludable
+    @rx.var(cache=True)
+    def servicio_seleccionado_info(self) -> Dict[str, Any]:
+        """
+        🔎 Servicio seleccionado en el modal (lookup O(1) por nombre)
 
-            teeth_data[diente_num] = {
-                "number": diente_num,
-                "status": status,
-                "has_conditions": len(condiciones_no_sanas) > 0,  # Badge rojo si tiene condiciones
-                "conditions": list(condiciones.values())
-            }
+        Se recalcula solo al cambiar el nombre seleccionado o la versión del
+        catálogo en memoria; el resto de selected_service_* lee de aquí.
+        """
+        if not self.selected_service_name or not self.catalogo_servicios_version:
+            return {}
 
-        return teeth_data
+        servicio = catalogo_servicios.get_por_nombre(self.selected_service_name)
+        if not servicio:
+            return {}
 
+        return {
+            "id": servicio.id or "",
+            "precio_usd": float(servicio.precio_base_usd) if servicio.precio_base_usd else 0.0,
+            "alcance": servicio.alcance_servicio
+        }
 
-    @rx.var()
+    @rx.var(cache=True)
     def selected_service_id(self) -> str:
         """🆔 ID del servicio seleccionado del catálogo"""
-        if not self.selected_service_name:
-            logger.warning("⚠️ No hay servicio seleccionado")
-            return ""
-        for service in self.lista_servicios:
-            logger.debug(f"  Comparando: '{service.nombre}' vs '{self.selected_service_name}'")
-            if service.nombre == self.selected_service_name:
-                logger.info(f"✅ Servicio encontrado! ID: {service.id}")
-                return service.id if service.id else ""
-
-        logger.error(f"❌ Servicio '{self.selected_service_name}' NO encontrado en catálogo")
-        return ""
+        return self.servicio_seleccionado_info.get("id", "")
 
     # ==========================================
     # 🆕 COMPUTED VARS NUEVA ESTRUCTURA
@@ -1037,24 +1203,12 @@ class EstadoOdontologia(rx.State, mixin=True):
     @rx.var(cache=True)
     def selected_service_cost_bs(self) -> float:
         """💵 Costo BS del servicio seleccionado"""
-        if not self.selected_service_name:
-            return 0.0
-
-        for service in self.lista_servicios:
-            if service.nombre == self.selected_service_name:
-                return float(service.precio_base_usd) if service.precio_base_usd else 0.0
-        return 0.0
+        return self.servicio_seleccionado_info.get("precio_usd", 0.0)
 
     @rx.var(cache=True)
     def selected_service_cost_usd(self) -> float:
         """💵 Costo USD del servicio seleccionado"""
-        if not self.selected_service_name:
-            return 0.0
-
-        for service in self.lista_servicios:
-            if service.nombre == self.selected_service_name:
-                return float(service.precio_base_usd) if service.precio_base_usd else 0.0
-        return 0.0
+        return self.servicio_seleccionado_info.get("precio_usd", 0.0)
 
     @rx.var(cache=True)
     def selected_service_alcance(self) -> str:
@@ -1062,10 +1216,7 @@ class EstadoOdontologia(rx.State, mixin=True):
         if not self.selected_service_name:
             return "boca_completa"  # Default
 
-        for service in self.lista_servicios:
-            if service.nombre == self.selected_service_name:
-                return service.alcance_servicio
-        return "superficie_especifica"
+        return self.servicio_seleccionado_info.get("alcance", "superficie_especifica")
 
     @rx.var(cache=True)
     def selected_service_requiere_superficies(self) -> bool:
@@ -1251,12 +1402,8 @@ class EstadoOdontologia(rx.State, mixin=True):
                 logger.info(f"✅ Servicio boca completa")
 
             # ✅ V2.0: AGREGAR SERVICIO DIRECTAMENTE sin variables temporales
-            # Buscar el servicio completo en el catálogo
-            servicio_completo = None
-            for s in self.lista_servicios:
-                if s.nombre == self.selected_service_name:
-                    servicio_completo = s
-                    break
+            # Buscar el servicio completo en el catálogo (índice por nombre)
+            servicio_completo = catalogo_servicios.get_por_nombre(self.selected_service_name)
 
             if not servicio_completo:
                 logger.error(f"❌ Servicio '{self.selected_service_name}' no encontrado")
@@ -1339,33 +1486,41 @@ class EstadoOdontologia(rx.State, mixin=True):
             if hasattr(self, 'intervencion_actual') and self.intervencion_actual.id:
                 intervencion_id = self.intervencion_actual.id
 
-            # Inicializar diccionario de condiciones si no existe
-            if self.selected_tooth not in self.condiciones_por_diente:
-                self.condiciones_por_diente[self.selected_tooth] = {}
+            # Solo superficies cuyo valor cambia respecto a lo guardado
+            superficies_cambiadas = [
+                superficie for superficie in self.quick_surfaces_selected
+                if self._condicion_guardada(self.selected_tooth, superficie) != self.quick_condition_value
+            ]
 
-            # Actualizar cada superficie seleccionada
+            # Actualizar en BD (una sola llamada, vinculada a la intervención actual)
+            if superficies_cambiadas:
+                await odontologia_service.actualizar_condiciones_batch([
+                    {
+                        "paciente_id": self.paciente_actual.id,
+                        "diente_numero": self.selected_tooth,
+                        "superficie": superficie,
+                        "tipo_condicion": self.quick_condition_value,
+                        "intervencion_id": intervencion_id
+                    }
+                    for superficie in superficies_cambiadas
+                ])
+
+            # Actualizar en memoria y en la foto guardada (ya están en BD)
             for superficie in self.quick_surfaces_selected:
-                # Actualizar condición en BD (vinculado a intervención actual)
-                await odontologia_service.actualizar_condicion_diente(
-                    paciente_id=self.paciente_actual.id,
-                    diente_numero=self.selected_tooth,
-                    superficie=superficie,
-                    nueva_condicion=self.quick_condition_value,
-                    intervencion_id=intervencion_id,
-                    material=None,
-                    descripcion="Actualización de diagnóstico"
-                )
-
-                # Actualizar en memoria para reflejar en UI inmediatamente
-                self.condiciones_por_diente[self.selected_tooth][superficie] = self.quick_condition_value
+                self._registrar_cambio_superficie(self.selected_tooth, superficie, self.quick_condition_value)
+            for superficie in superficies_cambiadas:
+                pos = posicion(self.selected_tooth, superficie)
+                self.odontograma_codigos_guardados[pos] = self.odontograma_codigos[pos]
+                self.superficies_modificadas.remove(pos)
+            self.cambios_sin_guardar = len(self.superficies_modificadas) > 0
 
             # Cerrar modal y limpiar
+            cantidad_superficies = len(superficies_cambiadas)
             self.show_change_condition_modal = False
             self.quick_surfaces_selected = []
             self.quick_condition_value = ""
 
             # Mensaje de éxito
-            cantidad_superficies = len(self.quick_surfaces_selected) if self.quick_surfaces_selected else 0
             mensaje = f"Condición actualizada en {cantidad_superficies} superficie(s)"
             self.mostrar_toast(mensaje, "success")
             logger.info(f"✅ Condición actualizada: Diente {self.selected_tooth} ({cantidad_superficies} superficies)")
@@ -1429,7 +1584,9 @@ class EstadoOdontologia(rx.State, mixin=True):
 
             logger.info(f"📋 Cargando historial para paciente {pid}")
 
-            historial_raw = await odontologia_service.get_historial_servicios_paciente(pid)
+            historial_raw = prefetch_contexto_clinico.tomar_historial_servicios(pid)
+            if historial_raw is None:
+                historial_raw = await odontologia_service.get_historial_servicios_paciente(pid)
 
             self.historial_intervenciones = [
                 HistorialServicioModel.from_dict(item) for item in historial_raw
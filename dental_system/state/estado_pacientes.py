@@ -17,7 +17,7 @@ import reflex as rx
 from typing import Dict, Any, List
 import logging
 from dental_system.services.pacientes_service import pacientes_service
-from dental_system.models import PacienteModel, PacienteFormModel,HistorialCompletoPaciente
+from dental_system.models import PacienteModel, PacienteFormModel,HistorialCompletoPaciente,ConsultaHistorial,IntervencionHistorial
 
 
 logger = logging.getLogger(__name__)
@@ -41,8 +41,22 @@ class EstadoPacientes(rx.State,mixin=True):
 
     # Lista principal de pacientes (modelos tipados)
     lista_pacientes: List[PacienteModel] = []
+    pacientes_recientes: List[PacienteModel] = []  # Últimos registrados (dashboard)
     paciente_seleccionado: PacienteModel = PacienteModel()
-    historial_completo = HistorialCompletoPaciente = HistorialCompletoPaciente()
+    historial_completo: HistorialCompletoPaciente = HistorialCompletoPaciente()  # Solo resumen (totales)
+
+    # ==========================================
+    # 📋 HISTORIAL CLÍNICO (carga por partes)
+    # ==========================================
+
+    consultas_historial: List[ConsultaHistorial] = []  # Páginas ya cargadas, más recientes primero
+    consultas_historial_por_pagina: int = 10
+    hay_mas_consultas_historial: bool = False
+    consultas_historial_cargadas: bool = False
+    cargando_consultas_historial: bool = False
+    consulta_historial_expandida: str = ""  # ID de la consulta con detalle abierto
+    intervenciones_consulta_expandida: List[IntervencionHistorial] = []
+    cargando_intervenciones_historial: bool = False
 
     # Formulario de paciente (tipado v4.1)
     formulario_paciente: PacienteFormModel = PacienteFormModel()
@@ -57,6 +71,24 @@ class EstadoPacientes(rx.State,mixin=True):
     filtro_estado: str = "todos"  # todos, activos, inactivos
     filtro_rango_edad: str = "todos"  # todos, 0-17, 18-35, 36-50, 51-65, 66+
 
+    # ==========================================
+    # 📄 PAGINACIÓN Y ORDEN (servidor)
+    # ==========================================
+
+    pagina_actual_pacientes: int = 1
+    pacientes_por_pagina: int = 25
+    total_paginas_pacientes: int = 1
+    total_pacientes_filtrados: int = 0  # Conteo de la consulta actual (se recalcula al cambiar filtros)
+    busqueda_pacientes_truncada: bool = False  # La búsqueda tiene más coincidencias de las mostradas
+    orden_pacientes: str = "numero_historia"
+    orden_pacientes_desc: bool = True
+
+    # Contadores agregados (conteos en BD, no dependen de la página cargada)
+    total_pacientes_registrados: int = 0
+    total_pacientes_activos: int = 0
+    total_pacientes_masculinos: int = 0
+    total_pacientes_femeninos: int = 0
+
     # ==========================================
     # 👥 ESTADOS DE CARGA
     # ==========================================
@@ -70,29 +102,51 @@ class EstadoPacientes(rx.State,mixin=True):
     @rx.event
     async def cargar_lista_pacientes(self):
         """
-        📋 CARGAR LISTA COMPLETA DE PACIENTES CON CACHE
-        
+        📋 CARGAR PRIMERA PÁGINA DE PACIENTES (filtros actuales) Y CONTADORES
+
+        En el estado solo vive la página visible: la memoria por sesión queda
+        acotada por pacientes_por_pagina.
+        """
+        self.pagina_actual_pacientes = 1
+        await self._cargar_pagina_pacientes(incluir_total=True)
+        await self.cargar_contadores_pacientes()
+        await self.cargar_pacientes_recientes()
+
+    async def _cargar_pagina_pacientes(self, incluir_total: bool = False):
+        """
+        📄 Cargar la página actual de pacientes desde el servidor
+
         Args:
-            forzar_refresco: Forzar recarga desde BD ignorando cache
+            incluir_total: Recontar resultados (solo cuando cambian los filtros)
         """
         self.cargando_operacion_paciente = True
-        
+
         try:
             # Configurar contexto del usuario antes de usar servicio
             pacientes_service.set_user_context(self.id_usuario, self.perfil_usuario)
-            
-            # Obtener datos desde el servicio
-            pacientes_data = await pacientes_service.get_filtered_patients(
+
+            resultado = await pacientes_service.get_patients_page(
                 search=self.termino_busqueda_pacientes if self.termino_busqueda_pacientes.strip() else None,
                 genero=self.filtro_genero if self.filtro_genero != "todos" else None,
-                activos_only=self.filtro_estado == "activos" if self.filtro_estado != "todos" else None
+                activos_only=self.filtro_estado == "activos" if self.filtro_estado != "todos" else None,
+                rango_edad=self.filtro_rango_edad if self.filtro_rango_edad != "todos" else None,
+                orden=self.orden_pacientes,
+                descendente=self.orden_pacientes_desc,
+                limit=self.pacientes_por_pagina,
+                offset=(self.pagina_actual_pacientes - 1) * self.pacientes_por_pagina,
+                incluir_total=incluir_total
             )
-            
-            # Convertir a modelos tipados y actualizar estado
-            self.lista_pacientes = pacientes_data
 
-            print(f"✅ {len(pacientes_data)} pacientes cargados correctamente")
-            
+            self.lista_pacientes = resultado.get('pacientes', [])
+            self.busqueda_pacientes_truncada = resultado.get('truncado', False)
+            if resultado.get('total') is not None:
+                self.total_pacientes_filtrados = resultado['total']
+                self.total_paginas_pacientes = max(
+                    1, (self.total_pacientes_filtrados + self.pacientes_por_pagina - 1) // self.pacientes_por_pagina
+                )
+
+            print(f"✅ Página {self.pagina_actual_pacientes}/{self.total_paginas_pacientes}: {len(self.lista_pacientes)} pacientes")
+
         except Exception as e:
             error_msg = f"Error cargando pacientes: {str(e)}"
             logger.error(error_msg)
@@ -100,7 +154,45 @@ class EstadoPacientes(rx.State,mixin=True):
 
         finally:
             self.cargando_operacion_paciente = False
-    
+
+    async def cargar_contadores_pacientes(self):
+        """🔢 Cargar contadores de las cards desde conteos agregados"""
+        contadores = await pacientes_service.get_patient_counters()
+        self.total_pacientes_registrados = contadores.get("total", 0)
+        self.total_pacientes_activos = contadores.get("activos", 0)
+        self.total_pacientes_masculinos = contadores.get("masculino", 0)
+        self.total_pacientes_femeninos = contadores.get("femenino", 0)
+
+    async def cargar_pacientes_recientes(self):
+        """🆕 Últimos 5 pacientes registrados (independiente de la página visible)"""
+        pacientes_service.set_user_context(self.id_usuario, self.perfil_usuario)
+        self.pacientes_recientes = await pacientes_service.get_pacientes_recientes(limite=5)
+
+    @rx.event
+    async def pagina_siguiente_pacientes(self):
+        """➡️ Siguiente página de pacientes (sin recontar)"""
+        if self.pagina_actual_pacientes < self.total_paginas_pacientes:
+            self.pagina_actual_pacientes += 1
+            await self._cargar_pagina_pacientes()
+
+    @rx.event
+    async def pagina_anterior_pacientes(self):
+        """⬅️ Página anterior de pacientes (sin recontar)"""
+        if self.pagina_actual_pacientes > 1:
+            self.pagina_actual_pacientes -= 1
+            await self._cargar_pagina_pacientes()
+
+    @rx.event
+    async def ordenar_pacientes(self, columna: str):
+        """↕️ Ordenar por columna (segundo clic invierte la dirección)"""
+        if self.orden_pacientes == columna:
+            self.orden_pacientes_desc = not self.orden_pacientes_desc
+        else:
+            self.orden_pacientes = columna
+            self.orden_pacientes_desc = columna in ("numero_historia", "fecha_registro")
+        self.pagina_actual_pacientes = 1
+        await self._cargar_pagina_pacientes()
+
     @rx.event
     async def crear_paciente(self):
         """
@@ -239,24 +331,15 @@ class EstadoPacientes(rx.State,mixin=True):
             id_paciente: ID del paciente a seleccionar
         """
         try:
-            # Buscar en lista local primero
-            paciente_encontrado = None
-            for paciente in self.lista_pacientes:
-                if paciente.id == id_paciente:
-                    paciente_encontrado = paciente
-                    break
-            
-            if paciente_encontrado:
-                self.paciente_seleccionado = paciente_encontrado
-                print(f"🎯 Paciente seleccionado: {paciente_encontrado.primer_nombre} {paciente_encontrado.primer_apellido}")
+            # La lista paginada no trae datos médicos ni contacto de emergencia:
+            # el registro completo se lee por ID (una fila)
+            pacientes_service.set_user_context(self.id_usuario, self.perfil_usuario)
+            paciente_data = await pacientes_service.get_patient_by_id(id_paciente)
+            if paciente_data:
+                self.paciente_seleccionado = paciente_data
+                print(f"🎯 Paciente cargado y seleccionado: {paciente_data.primer_nombre} {paciente_data.primer_apellido}")
             else:
-                pacientes_service.set_user_context(self.id_usuario, self.perfil_usuario)
-                paciente_data = await pacientes_service.get_patient_by_id(id_paciente)
-                if paciente_data:
-                    self.paciente_seleccionado = paciente_data
-                    print(f"🎯 Paciente cargado y seleccionado: {paciente_data.primer_nombre}")
-                else:
-                    print(f"⚠️ Paciente {id_paciente} no encontrado")
+                print(f"⚠️ Paciente {id_paciente} no encontrado")
                     
         except Exception as e:
             error_msg = f"Error seleccionando paciente: {str(e)}"
@@ -273,14 +356,24 @@ class EstadoPacientes(rx.State,mixin=True):
     async def buscar_pacientes(self, termino: str):
         self.termino_busqueda_pacientes = termino.strip()
         print(f"🔍 Búsqueda de pacientes: '{self.termino_busqueda_pacientes}'")
-        await self.cargar_lista_pacientes()
+        self.pagina_actual_pacientes = 1
+        await self._cargar_pagina_pacientes(incluir_total=True)
 
     @rx.event
     async def set_filtro_genero(self, genero: str):
         """Establecer filtro por género"""
         self.filtro_genero = genero
         print(f"🔍 Filtro de género: '{self.filtro_genero}'")
-        await self.cargar_lista_pacientes()
+        self.pagina_actual_pacientes = 1
+        await self._cargar_pagina_pacientes(incluir_total=True)
+
+    @rx.event
+    async def set_filtro_rango_edad(self, rango: str):
+        """Establecer filtro por rango de edad (aplicado en el servidor)"""
+        self.filtro_rango_edad = rango
+        print(f"🔍 Filtro de edad: '{self.filtro_rango_edad}'")
+        self.pagina_actual_pacientes = 1
+        await self._cargar_pagina_pacientes(incluir_total=True)
 
     # ==========================================
     # 👥 COMPUTED VARS CON CACHE
@@ -288,42 +381,8 @@ class EstadoPacientes(rx.State,mixin=True):
 
     @rx.var(cache=True)
     def pacientes_filtrados_display(self) -> List[PacienteModel]:
-        """📋 Lista de pacientes para mostrar con filtrado por edad y género"""
-        pacientes = self.lista_pacientes
-
-        # Filtrar por rango de edad
-        if self.filtro_rango_edad and self.filtro_rango_edad != "todos":
-            if self.filtro_rango_edad == "0-17":
-                pacientes = [p for p in pacientes if 0 <= p.edad <= 17]
-            elif self.filtro_rango_edad == "18-35":
-                pacientes = [p for p in pacientes if 18 <= p.edad <= 35]
-            elif self.filtro_rango_edad == "36-50":
-                pacientes = [p for p in pacientes if 36 <= p.edad <= 50]
-            elif self.filtro_rango_edad == "51-65":
-                pacientes = [p for p in pacientes if 51 <= p.edad <= 65]
-            elif self.filtro_rango_edad == "66+":
-                pacientes = [p for p in pacientes if p.edad >= 66]
-
-        # Filtrar por género
-        if self.filtro_genero and self.filtro_genero != "todos":
-            pacientes = [p for p in pacientes if p.genero == self.filtro_genero]
-
-        return pacientes
-
-    @rx.var(cache=True)
-    def total_pacientes_activos(self) -> int:
-        """👥 Total de pacientes activos"""
-        return len([p for p in self.lista_pacientes if p.activo])
-    
-    @rx.var
-    def total_pacientes_masculinos(self) -> int:
-        """👨 Total de pacientes masculinos"""
-        return len([p for p in self.lista_pacientes if p.genero == "masculino"])
-    
-    @rx.var
-    def total_pacientes_femeninos(self) -> int:
-        """👨 Total de pacientes masculinos"""
-        return len([p for p in self.lista_pacientes if p.genero == "femenino"])
+        """📋 Página actual de pacientes (filtros y orden ya aplicados en el servidor)"""
+        return self.lista_pacientes
 
     # ==========================================
     # 🎂 FUNCIÓN HELPER PARA CALCULAR EDAD
@@ -454,11 +513,15 @@ class EstadoPacientes(rx.State,mixin=True):
             # 1. Seleccionar el paciente
             await self.seleccionar_paciente(id_paciente)
 
-            # 2. Cargar historial completo del paciente desde el servicio
-            
+            # 2. Cargar solo el resumen; las consultas se piden al abrir la pestaña
             pacientes_service.set_user_context(self.id_usuario, self.perfil_usuario)
-            self.historial_completo = await pacientes_service.get_historial_completo_paciente(id_paciente)
-            
+            self.historial_completo = await pacientes_service.get_resumen_historial_paciente(id_paciente)
+            self.consultas_historial = []
+            self.hay_mas_consultas_historial = False
+            self.consultas_historial_cargadas = False
+            self.consulta_historial_expandida = ""
+            self.intervenciones_consulta_expandida = []
+
             self.paciente_actual = self.paciente_seleccionado
             # 4. Cargar odontograma del paciente
             try:
@@ -474,13 +537,75 @@ class EstadoPacientes(rx.State,mixin=True):
                 f"HC: {self.paciente_seleccionado.numero_historia}"
             )
 
-            print(f"✅ Navegando a historial de paciente {id_paciente} - {self.historial_completo.total_consultas} consultas cargadas")
+            print(f"✅ Navegando a historial de paciente {id_paciente} - {self.historial_completo.total_consultas} consultas en total")
 
         except Exception as e:
             error_msg = f"Error navegando a historial: {str(e)}"
             logger.error(error_msg)
             self.mostrar_toast(f"Error al cargar historial: {str(e)}", "error")
             
+    @rx.event
+    async def cambiar_tab_historial(self, tab: str):
+        """📑 Al abrir la pestaña de consultas se carga la primera página"""
+        if tab == "consultas" and not self.consultas_historial_cargadas:
+            await self.cargar_consultas_historial()
+
+    @rx.event
+    async def cargar_consultas_historial(self):
+        """📄 Primera página de consultas del paciente (más recientes primero)"""
+        self.consultas_historial = []
+        self.consulta_historial_expandida = ""
+        self.intervenciones_consulta_expandida = []
+        await self._cargar_pagina_consultas_historial()
+        self.consultas_historial_cargadas = True
+
+    @rx.event
+    async def cargar_mas_consultas_historial(self):
+        """➕ Siguiente página de consultas (se agrega al final)"""
+        if self.hay_mas_consultas_historial and not self.cargando_consultas_historial:
+            await self._cargar_pagina_consultas_historial()
+
+    async def _cargar_pagina_consultas_historial(self):
+        if not self.paciente_seleccionado.id:
+            return
+        self.cargando_consultas_historial = True
+        try:
+            pacientes_service.set_user_context(self.id_usuario, self.perfil_usuario)
+            pagina = await pacientes_service.get_consultas_historial_page(
+                self.paciente_seleccionado.id,
+                limit=self.consultas_historial_por_pagina,
+                offset=len(self.consultas_historial)
+            )
+            self.consultas_historial = self.consultas_historial + pagina.get("consultas", [])
+            self.hay_mas_consultas_historial = pagina.get("hay_mas", False)
+        except Exception as e:
+            logger.error(f"Error cargando consultas del historial: {str(e)}")
+            self.mostrar_toast("Error al cargar consultas del historial", "error")
+        finally:
+            self.cargando_consultas_historial = False
+
+    @rx.event
+    async def alternar_detalle_consulta_historial(self, consulta_id: str):
+        """🦷 Expandir/colapsar el detalle de intervenciones de una consulta"""
+        if self.consulta_historial_expandida == consulta_id:
+            self.consulta_historial_expandida = ""
+            self.intervenciones_consulta_expandida = []
+            return
+
+        self.consulta_historial_expandida = consulta_id
+        self.intervenciones_consulta_expandida = []
+        self.cargando_intervenciones_historial = True
+        try:
+            pacientes_service.set_user_context(self.id_usuario, self.perfil_usuario)
+            self.intervenciones_consulta_expandida = await pacientes_service.get_intervenciones_consulta_historial(
+                self.paciente_seleccionado.id, consulta_id
+            )
+        except Exception as e:
+            logger.error(f"Error cargando intervenciones de la consulta: {str(e)}")
+            self.mostrar_toast("Error al cargar el detalle de la consulta", "error")
+        finally:
+            self.cargando_intervenciones_historial = False
+
     @rx.var(cache=True)
     def consultas_del_paciente_seleccionado(self) -> List:
         """📅 Consultas del paciente seleccionado (para historial)"""
@@ -22,7 +22,8 @@ import logging
 
 # Servicios y modelos
 from dental_system.services.pagos_service import pagos_service
-from dental_system.constants import METODOS_PAGO, ESTADOS_PAGO
+from dental_system.services.tasa_cambio_service import tasa_cambio_service
+from dental_system.constants import METODOS_PAGO, ESTADOS_PAGO, TASA_CAMBIO_DEFAULT
 from dental_system.models import (
     PagoModel,
     PagoFormModel,
@@ -71,9 +72,9 @@ class EstadoPagos(rx.State,mixin=True):
     modal_pago_dual_abierto: bool = False
     modal_cambiar_tasa_abierto: bool = False  # ✨ NUEVO: Modal para cambiar tasa
 
-    # 💱 TASA DE CAMBIO DINÁMICA
-    tasa_del_dia: float = 36.50              # Tasa editable por usuario
-    tasa_temporal: float = 36.50             # Tasa temporal mientras se edita en el modal
+    # 💱 TASA DE CAMBIO DINÁMICA (persistida en tasa_cambio vía tasa_cambio_service)
+    tasa_del_dia: float = TASA_CAMBIO_DEFAULT    # Tasa vigente del día
+    tasa_temporal: float = TASA_CAMBIO_DEFAULT   # Tasa temporal mientras se edita en el modal
 
     # 📊 ESTADÍSTICAS DUALES EN TIEMPO REAL
     estadisticas_dual: Dict[str, Any] = {}
@@ -147,10 +148,14 @@ class EstadoPagos(rx.State,mixin=True):
     pagina_actual_pagos: int = 1
     pagos_por_pagina: int = 15
     total_paginas_pagos: int = 1
+    total_pagos: int = 0  # Conteo del servidor (se recalcula solo al cambiar filtros)
 
     # Estados de carga
     cargando_operacion_pago: bool = False
     procesando_pago: bool = False
+
+    # Resultado del último lote de pagos (cierre del día)
+    resultados_lote_pagos: List[Dict[str, Any]] = []
     
     # ==========================================
     # 💳 MÉTODOS PRINCIPALES DE CRUD
@@ -158,37 +163,81 @@ class EstadoPagos(rx.State,mixin=True):
     
     @rx.event
     async def cargar_lista_pagos(self):
-        """💳 CARGAR LISTA COMPLETA DE PAGOS"""
+        """💳 CARGAR PRIMERA PÁGINA DE PAGOS (filtros actuales, con conteo)"""
+        self.pagina_actual_pagos = 1
+        await self._cargar_pagina_pagos(incluir_total=True)
+
+    async def _cargar_pagina_pagos(self, incluir_total: bool = False):
+        """
+        📄 Cargar la página actual de pagos desde el servidor
+
+        Args:
+            incluir_total: Recontar resultados (solo cuando cambian los filtros)
+        """
         try:
             self.cargando_lista_pagos = True
-            pagos_data = await pagos_service.get_filtered_payments()
-            # Convertir a modelos tipados
-            self.lista_pagos = pagos_data
-            
-            print(f"🔍 Pagos recibidos: {len( self.lista_pagos) if pagos_data else 0}")
-            
+            offset = (self.pagina_actual_pagos - 1) * self.pagos_por_pagina
+
+            resultado = await pagos_service.get_payments_page(
+                search=self.termino_busqueda_pagos,
+                estado=self.filtro_estado_pago,
+                metodo_pago=self.filtro_metodo_pago,
+                fecha_inicio=self.rango_fecha_inicio or None,
+                fecha_fin=self.rango_fecha_fin or None,
+                limit=self.pagos_por_pagina,
+                offset=offset,
+                incluir_total=incluir_total
+            )
+
+            self.lista_pagos = resultado.get('pagos', [])
+            if resultado.get('total') is not None:
+                self.total_pagos = resultado['total']
+                self.total_paginas_pagos = max(1, (self.total_pagos + self.pagos_por_pagina - 1) // self.pagos_por_pagina)
+
+            logger.info(f"🔍 Pagos página {self.pagina_actual_pagos}/{self.total_paginas_pagos}: {len(self.lista_pagos)} de {self.total_pagos}")
+
         except Exception as e:
             logger.error(f"❌ Error cargando pagos: {str(e)}")
         finally:
             self.cargando_lista_pagos = False
 
+    @rx.event
+    async def pagina_siguiente_pagos(self):
+        """➡️ Siguiente página de pagos (sin recontar)"""
+        if self.pagina_actual_pagos < self.total_paginas_pagos:
+            self.pagina_actual_pagos += 1
+            await self._cargar_pagina_pagos()
+
+    @rx.event
+    async def pagina_anterior_pagos(self):
+        """⬅️ Página anterior de pagos (sin recontar)"""
+        if self.pagina_actual_pagos > 1:
+            self.pagina_actual_pagos -= 1
+            await self._cargar_pagina_pagos()
+
     @rx.event
     async def buscar_pagos(self, query: str):
-        """🔍 BUSCAR PAGOS"""
+        """🔍 BUSCAR PAGOS (recibo o paciente, en el servidor)"""
         self.termino_busqueda_pagos = query.strip()
         logger.info(f"🔍 Búsqueda de pagos: '{query}'")
+        await self.cargar_lista_pagos()
 
-    def filtrar_por_estado_pago(self, estado: str):
+    @rx.event
+    async def filtrar_por_estado_pago(self, estado: str):
         """🎯 Filtrar pagos por estado"""
         self.filtro_estado_pago = estado
         logger.info(f"🎯 Filtro estado pago: {estado}")
+        await self.cargar_lista_pagos()
 
-    def filtrar_por_metodo_pago(self, metodo: str):
+    @rx.event
+    async def filtrar_por_metodo_pago(self, metodo: str):
         """💳 Filtrar pagos por método de pago"""
         self.filtro_metodo_pago = metodo
         logger.info(f"💳 Filtro método pago: {metodo}")
+        await self.cargar_lista_pagos()
 
-    def filtrar_por_periodo(self, periodo: str):
+    @rx.event
+    async def filtrar_por_periodo(self, periodo: str):
         """📅 Filtrar pagos por período"""
         from datetime import timedelta
         hoy = date.today()
@@ -208,10 +257,14 @@ class EstadoPagos(rx.State,mixin=True):
             inicio = hoy - timedelta(days=365)
             self.rango_fecha_inicio = inicio.isoformat()
             self.rango_fecha_fin = hoy.isoformat()
+        elif periodo == "todos":
+            self.rango_fecha_inicio = ""
+            self.rango_fecha_fin = ""
         else:  # personalizado
             pass  # El usuario definirá las fechas
 
         logger.info(f"📅 Filtro período: {periodo} ({self.rango_fecha_inicio} - {self.rango_fecha_fin})")
+        await self.cargar_lista_pagos()
 
     def exportar_pagos(self):
         """📥 Exportar historial de pagos (placeholder)"""
@@ -235,7 +288,7 @@ class EstadoPagos(rx.State,mixin=True):
         try:
             pago_usd = float(self.formulario_pago_dual.monto_pagado_usd or 0)
             pago_bs = float(self.formulario_pago_dual.monto_pagado_bs or 0)
-            tasa = float(self.formulario_pago_dual.tasa_cambio or 36.50)
+            tasa = float(self.formulario_pago_dual.tasa_cambio or self.tasa_del_dia)
 
             bs_a_usd = pago_bs / tasa if tasa > 0 else 0
             return pago_usd + bs_a_usd
@@ -260,7 +313,7 @@ class EstadoPagos(rx.State,mixin=True):
         """💱 Convertir USD pagado a BS"""
         try:
             pago_usd = float(self.formulario_pago_dual.monto_pagado_usd or 0)
-            tasa = float(self.formulario_pago_dual.tasa_cambio or 36.50)
+            tasa = float(self.formulario_pago_dual.tasa_cambio or self.tasa_del_dia)
             return pago_usd * tasa if tasa > 0 else 0
         except:
             return 0.0
@@ -270,7 +323,7 @@ class EstadoPagos(rx.State,mixin=True):
         """💱 Convertir BS pagado a USD"""
         try:
             pago_bs = float(self.formulario_pago_dual.monto_pagado_bs or 0)
-            tasa = float(self.formulario_pago_dual.tasa_cambio or 36.50)
+            tasa = float(self.formulario_pago_dual.tasa_cambio or self.tasa_del_dia)
             return pago_bs / tasa if tasa > 0 else 0
         except:
             return 0.0
@@ -403,11 +456,40 @@ class EstadoPagos(rx.State,mixin=True):
             self.modal_pago_dual_abierto = False
             self.procesando_pago = False
 
+    @rx.event
+    async def registrar_lote_pagos(self, pagos_form: List[Dict[str, str]]):
+        """📦 REGISTRAR LOTE DE RECIBOS (cierre del día) con una sola recarga final"""
+        try:
+            self.procesando_pago = True
+            self.resultados_lote_pagos = []
+
+            pagos_service.set_user_context(self.id_usuario, self.perfil_usuario)
+            resultado = await pagos_service.create_dual_payments_batch(pagos_form, self.id_usuario)
+            self.resultados_lote_pagos = resultado.get('resultados', [])
+
+            creados = resultado.get('creados', 0)
+            fallidos = resultado.get('fallidos', 0)
+
+            # Una sola recarga de la página para todo el lote
+            if creados:
+                await self.recargar_todo_pagos()
+
+            if fallidos:
+                self.mostrar_toast(f"{creados} pagos registrados, {fallidos} con errores", "warning")
+            else:
+                self.mostrar_toast(f"{creados} pagos registrados", "success")
+
+        except Exception as e:
+            logger.error(f"❌ Error registrando lote de pagos: {str(e)}")
+            self.mostrar_toast(f"Error registrando lote de pagos: {str(e)}", "error")
+        finally:
+            self.procesando_pago = False
+
     @rx.event
     def set_tasa_del_dia(self, valor: str):
         """💱 SETTER SIMPLE para actualizar tasa desde input"""
         try:
-            nueva_tasa = float(valor) if valor else 36.50
+            nueva_tasa = float(valor) if valor else TASA_CAMBIO_DEFAULT
             if nueva_tasa > 0:
                 self.tasa_del_dia = nueva_tasa
                 logger.info(f"✅ Tasa actualizada desde input: {nueva_tasa} BS/USD")
@@ -427,20 +509,33 @@ class EstadoPagos(rx.State,mixin=True):
     def set_tasa_temporal(self, valor: str):
         """💱 ACTUALIZAR SOLO TASA TEMPORAL (no guarda hasta darle Actualizar)"""
         try:
-            nueva_tasa = float(valor) if valor else 36.50
+            nueva_tasa = float(valor) if valor else self.tasa_del_dia
             if nueva_tasa > 0:
                 self.tasa_temporal = nueva_tasa
         except ValueError:
             pass  # Ignorar valores inválidos mientras se escribe
     
+    @rx.event
+    async def cargar_tasa_del_dia(self):
+        """💱 CARGAR TASA VIGENTE DESDE EL SERVICIO (cache de proceso → BD)"""
+        try:
+            self.tasa_del_dia = await tasa_cambio_service.get_tasa_actual()
+            self.tasa_temporal = self.tasa_del_dia
+        except Exception as e:
+            logger.error(f"❌ Error cargando tasa del día: {str(e)}")
+
     @rx.event
     async def actualizar_tasa_del_dia(self, nueva_tasa: float):
         """💱 ACTUALIZAR TASA DE CAMBIO DEL DÍA (con recálculo de formulario)"""
         try:
             if nueva_tasa <= 0:
                 logger.warning("⚠️ Tasa de cambio debe ser mayor a 0")
-            # Actualizar tasa actual
-            self.tasa_del_dia = nueva_tasa
+                return
+            # Persistir tasa del día (queda disponible para todas las sesiones)
+            tasa_cambio_service.set_user_context(self.id_usuario, self.perfil_usuario)
+            self.tasa_del_dia = await tasa_cambio_service.registrar_tasa_del_dia(nueva_tasa, self.id_usuario)
+            self.formulario_pago_dual.tasa_cambio = self.tasa_del_dia
+            self.formulario_pago_dual.tasa_cambio_del_dia = str(self.tasa_del_dia)
             print("tasa actualizada")
             # Recalcular formulario automáticamente
             await self.recalcular_formulario_dual()
@@ -646,7 +741,11 @@ class EstadoPagos(rx.State,mixin=True):
                 self.formulario_pago_dual.monto_total_usd = consulta_encontrada.total_usd
                 self.formulario_pago_dual.monto_total_bs = consulta_encontrada.total_bs
                 self.formulario_pago_dual.concepto = consulta_encontrada.concepto
+
+                # Tasa registrada del día (no el valor por defecto del formulario)
+                self.tasa_del_dia = await tasa_cambio_service.get_tasa_actual()
                 self.formulario_pago_dual.tasa_cambio = self.tasa_del_dia
+                self.formulario_pago_dual.tasa_cambio_del_dia = str(self.tasa_del_dia)
 
                 # ✨ GUARDAR DATOS ADICIONALES en variables simples del estado
                 self.consulta_actual_numero_historia = consulta_encontrada.paciente_numero_historia or "Sin HC"
@@ -749,10 +848,13 @@ class EstadoPagos(rx.State,mixin=True):
         self.filtro_rango_monto = {"min": 0.0, "max": 999999.0}
         self.rango_fecha_inicio = ""
         self.rango_fecha_fin = ""
+        self.pagina_actual_pagos = 1
+        self.total_paginas_pagos = 1
+        self.total_pagos = 0
 
         # 💰 LIMPIAR VARIABLES SISTEMA DUAL
         self.formulario_pago_dual = PagoFormModel()
-        self.tasa_del_dia = 36.50
+        self.tasa_del_dia = tasa_cambio_service.get_tasa_en_cache() or TASA_CAMBIO_DEFAULT
         self.estadisticas_dual = {}
         self.recaudacion_usd_hoy = 0.0
         self.recaudacion_bs_hoy = 0.0
@@ -770,6 +872,8 @@ class EstadoPagos(rx.State,mixin=True):
         self.moneda_principal_vista = "USD"
         self.mostrar_conversion_automatica = True
 
+        self.resultados_lote_pagos = []
+
         # Limpiar estados de carga
         self.cargando_consultas_pendientes = False
         self.cargando_operacion_pago = False
@@ -784,6 +888,7 @@ class EstadoPagos(rx.State,mixin=True):
         
     async def cargar_datos_pagos_page(self):
         """Carga todos los datos necesarios al entrar a la página de pagos"""
+        await self.cargar_tasa_del_dia()
         await self.cargar_consultas_pendientes_pago()
         await self.cargar_lista_pagos()
         await self.cargar_estadisticas_duales()
@@ -20,6 +20,7 @@ import logging
 
 # Servicios y modelos
 from dental_system.services.servicios_service import servicios_service
+from dental_system.services.catalogo_servicios import catalogo_servicios
 from dental_system.models import (
     ServicioModel,
     EstadisticaCategoriaModel,
@@ -45,6 +46,7 @@ class EstadoServicios(rx.State,mixin=True):
     # ==========================================
     lista_servicios: List[ServicioModel] = []
     total_servicios: int = 0
+    catalogo_servicios_version: int = 0  # versión del catálogo en memoria (búsquedas por id/nombre)
 
     # ==========================================
     # 🎯 SERVICIO SELECCIONADO (COMO EMPLEADO_SELECCIONADO)
@@ -273,6 +275,7 @@ class EstadoServicios(rx.State,mixin=True):
             
             # Convertir a modelos tipados
             self.lista_servicios = servicios_data
+            self.catalogo_servicios_version = catalogo_servicios.get_version()
             # Log exitoso
             print(f"✅ Lista servicios cargada: {len(servicios_data)} servicios")
             
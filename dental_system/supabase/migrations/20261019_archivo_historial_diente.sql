@@ -0,0 +1,165 @@
+-- ============================================================================
+-- MIGRACIÓN: Archivo del historial de condiciones dentales
+-- ============================================================================
+-- Fecha: 2026-10-19
+-- Problema: cada cambio de condición deja la fila anterior con activo = FALSE
+--           en la tabla diente, que crece sin límite; las consultas del
+--           odontograma (activo = TRUE) recorren índices inflados por historial
+--           que casi nunca se lee
+-- Solución:
+--   1. Tabla de archivo diente_historial (misma forma que diente)
+--   2. compactar_historial_diente(): mueve por lotes las filas inactivas más
+--      viejas que el horizonte y reporta filas movidas y tamaños antes/después
+--   3. Vista vista_historial_diente (diente + archivo) para que el historial
+--      de un diente siga completo
+-- La tabla caliente queda con las filas activas + el historial reciente.
+-- Ejecución periódica: compactar_historial_diente.py (raíz) o pg_cron (abajo)
+
+-- ============================================================================
+-- PASO 1: Tabla de archivo
+-- ============================================================================
+-- Sin FKs: el archivo no debe bloquear borrados/cambios en tablas vivas
+
+CREATE TABLE IF NOT EXISTS public.diente_historial (
+    id uuid NOT NULL,
+    paciente_id uuid NOT NULL,
+    diente_numero integer NOT NULL,
+    superficie character varying NOT NULL,
+    tipo_condicion character varying NOT NULL,
+    intervencion_id uuid,
+    fecha_registro timestamp with time zone NOT NULL,
+    activo boolean NOT NULL DEFAULT FALSE,
+    color_hex character varying,
+    archivado_en timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT diente_historial_pkey PRIMARY KEY (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_diente_historial_paciente_diente
+ON public.diente_historial (paciente_id, diente_numero, fecha_registro DESC);
+
+COMMENT ON TABLE public.diente_historial IS
+'Historial archivado de diente (filas inactivas más viejas que el horizonte de compactar_historial_diente).';
+
+-- ============================================================================
+-- PASO 2: Índice para encontrar candidatas sin recorrer la tabla
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_diente_inactivas_fecha
+ON public.diente (fecha_registro)
+WHERE activo = FALSE;
+
+-- ============================================================================
+-- PASO 3: Función de compactación
+-- ============================================================================
+-- Retorna:
+-- {
+--   "movidas": 48210, "pendientes": 0,
+--   "horizonte_dias": 180, "limite": "2026-04-22T...",
+--   "indices_bytes_antes": ..., "indices_bytes_despues": ...,
+--   "tabla_bytes_antes": ..., "tabla_bytes_despues": ...
+-- }
+-- Los tamaños bajan después del siguiente VACUUM (autovacuum o manual):
+-- el DELETE solo marca las tuplas como muertas.
+
+CREATE OR REPLACE FUNCTION public.compactar_historial_diente(
+    p_horizonte_dias integer DEFAULT 180,
+    p_lote integer DEFAULT 50000
+) RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_limite timestamptz;
+    v_indices_antes bigint := pg_indexes_size('public.diente');
+    v_tabla_antes bigint := pg_table_size('public.diente');
+    v_movidas int := 0;
+    v_pendientes bigint := 0;
+BEGIN
+    IF p_horizonte_dias IS NULL OR p_horizonte_dias < 1 THEN
+        RAISE EXCEPTION 'El horizonte debe ser de al menos 1 día';
+    END IF;
+
+    v_limite := CURRENT_TIMESTAMP - make_interval(days => p_horizonte_dias);
+
+    -- Mover un lote (DELETE ... RETURNING → INSERT en la misma sentencia)
+    WITH candidatas AS (
+        SELECT id
+        FROM public.diente
+        WHERE activo = FALSE
+          AND fecha_registro < v_limite
+        ORDER BY fecha_registro
+        LIMIT p_lote
+        FOR UPDATE SKIP LOCKED
+    ),
+    movidas AS (
+        DELETE FROM public.diente d
+        USING candidatas c
+        WHERE d.id = c.id
+        RETURNING d.id, d.paciente_id, d.diente_numero, d.superficie, d.tipo_condicion,
+                  d.intervencion_id, d.fecha_registro, d.activo, d.color_hex
+    )
+    INSERT INTO public.diente_historial (
+        id, paciente_id, diente_numero, superficie, tipo_condicion,
+        intervencion_id, fecha_registro, activo, color_hex
+    )
+    SELECT id, paciente_id, diente_numero, superficie, tipo_condicion,
+           intervencion_id, fecha_registro, activo, color_hex
+    FROM movidas;
+
+    GET DIAGNOSTICS v_movidas = ROW_COUNT;
+
+    SELECT COUNT(*) INTO v_pendientes
+    FROM public.diente
+    WHERE activo = FALSE
+      AND fecha_registro < v_limite;
+
+    RETURN jsonb_build_object(
+        'movidas', v_movidas,
+        'pendientes', v_pendientes,
+        'horizonte_dias', p_horizonte_dias,
+        'limite', v_limite,
+        'indices_bytes_antes', v_indices_antes,
+        'indices_bytes_despues', pg_indexes_size('public.diente'),
+        'tabla_bytes_antes', v_tabla_antes,
+        'tabla_bytes_despues', pg_table_size('public.diente')
+    );
+END;
+$$;
+
+COMMENT ON FUNCTION public.compactar_historial_diente(integer, integer) IS
+'Mueve a diente_historial las filas inactivas más viejas que el horizonte (por lotes) y reporta filas movidas y tamaños.';
+
+-- ============================================================================
+-- PASO 4: Vista del historial completo (caliente + archivo)
+-- ============================================================================
+
+CREATE OR REPLACE VIEW public.vista_historial_diente AS
+SELECT id, paciente_id, diente_numero, superficie, tipo_condicion,
+       intervencion_id, fecha_registro, activo, FALSE AS archivado
+FROM public.diente
+UNION ALL
+SELECT id, paciente_id, diente_numero, superficie, tipo_condicion,
+       intervencion_id, fecha_registro, activo, TRUE AS archivado
+FROM public.diente_historial;
+
+COMMENT ON VIEW public.vista_historial_diente IS
+'Historial completo de condiciones por diente: tabla diente + diente_historial.';
+
+-- ============================================================================
+-- PASO 5 (opcional): Programar con pg_cron
+-- ============================================================================
+-- SELECT cron.schedule(
+--     'compactar-historial-diente', '0 3 * * 0',
+--     $$SELECT public.compactar_historial_diente(180)$$
+-- );
+
+-- ============================================================================
+-- VERIFICACIÓN
+-- ============================================================================
+-- SELECT public.compactar_historial_diente(180, 1000);
+-- VACUUM (ANALYZE) public.diente;   -- fuera de transacción
+-- SELECT pg_size_pretty(pg_indexes_size('public.diente'));
+
+SELECT
+    (SELECT COUNT(*) FROM public.diente WHERE activo = TRUE) AS activas,
+    (SELECT COUNT(*) FROM public.diente WHERE activo = FALSE) AS historial_reciente,
+    (SELECT COUNT(*) FROM public.diente_historial) AS archivadas;
@@ -0,0 +1,161 @@
+-- 💰 BALANCE POR PACIENTE MANTENIDO INCREMENTALMENTE
+-- Problema: get_patient_balance y el historial del paciente leían y sumaban
+--           TODOS los pagos del paciente en cada vista (cientos en ortodoncia)
+-- Solución: tabla paciente_balance con una fila por paciente, actualizada por
+--           trigger con el delta de cada INSERT / UPDATE / DELETE en pago.
+--           Leer el balance es una búsqueda por PK y "pacientes con deuda"
+--           usa un índice parcial.
+
+-- =====================================================
+-- PASO 1: TABLA DE BALANCES
+-- =====================================================
+CREATE TABLE IF NOT EXISTS public.paciente_balance (
+    paciente_id UUID PRIMARY KEY REFERENCES public.paciente(id) ON DELETE CASCADE,
+    total_facturado_usd NUMERIC DEFAULT 0 NOT NULL,
+    total_facturado_bs NUMERIC DEFAULT 0 NOT NULL,
+    total_pagado_usd NUMERIC DEFAULT 0 NOT NULL,
+    total_pagado_bs NUMERIC DEFAULT 0 NOT NULL,
+    total_descuentos_usd NUMERIC DEFAULT 0 NOT NULL,
+    saldo_pendiente_usd NUMERIC DEFAULT 0 NOT NULL,
+    saldo_pendiente_bs NUMERIC DEFAULT 0 NOT NULL,
+    pagos_completados INTEGER DEFAULT 0 NOT NULL,
+    pagos_pendientes INTEGER DEFAULT 0 NOT NULL,
+    pagos_anulados INTEGER DEFAULT 0 NOT NULL,
+    fecha_actualizacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE public.paciente_balance IS 'Totales de pagos por paciente, mantenidos por trigger sobre pago';
+
+-- Lista de pacientes con deuda: solo indexa las filas con saldo
+CREATE INDEX IF NOT EXISTS idx_paciente_balance_con_deuda
+ON public.paciente_balance (saldo_pendiente_usd DESC)
+WHERE saldo_pendiente_usd > 0 OR saldo_pendiente_bs > 0;
+
+-- =====================================================
+-- PASO 2: APLICAR EL APORTE DE UNA FILA DE PAGO (signo +1 / -1)
+-- =====================================================
+-- Reglas (mismas que el cálculo anterior en PagosService):
+--   * Facturado, pagado y descuentos: todo pago no anulado
+--   * Saldo pendiente y pagos_pendientes: solo pagos en estado pendiente
+CREATE OR REPLACE FUNCTION aplicar_pago_a_balance(p_pago public.pago, p_signo INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_vigente BOOLEAN;
+    v_con_saldo BOOLEAN;
+BEGIN
+    v_vigente := COALESCE(p_pago.estado_pago, 'completado') <> 'anulado';
+    v_con_saldo := p_pago.estado_pago = 'pendiente';
+
+    INSERT INTO public.paciente_balance AS b (
+        paciente_id,
+        total_facturado_usd, total_facturado_bs,
+        total_pagado_usd, total_pagado_bs,
+        total_descuentos_usd,
+        saldo_pendiente_usd, saldo_pendiente_bs,
+        pagos_completados, pagos_pendientes, pagos_anulados,
+        fecha_actualizacion
+    )
+    VALUES (
+        p_pago.paciente_id,
+        CASE WHEN v_vigente THEN p_signo * COALESCE(p_pago.monto_total_usd, 0) ELSE 0 END,
+        CASE WHEN v_vigente THEN p_signo * COALESCE(p_pago.monto_total_bs, 0) ELSE 0 END,
+        CASE WHEN v_vigente THEN p_signo * COALESCE(p_pago.monto_pagado_usd, 0) ELSE 0 END,
+        CASE WHEN v_vigente THEN p_signo * COALESCE(p_pago.monto_pagado_bs, 0) ELSE 0 END,
+        CASE WHEN v_vigente THEN p_signo * COALESCE(p_pago.descuento_usd, 0) ELSE 0 END,
+        CASE WHEN v_con_saldo THEN p_signo * COALESCE(p_pago.saldo_pendiente_usd, 0) ELSE 0 END,
+        CASE WHEN v_con_saldo THEN p_signo * COALESCE(p_pago.saldo_pendiente_bs, 0) ELSE 0 END,
+        CASE WHEN p_pago.estado_pago = 'completado' THEN p_signo ELSE 0 END,
+        CASE WHEN v_con_saldo THEN p_signo ELSE 0 END,
+        CASE WHEN p_pago.estado_pago = 'anulado' THEN p_signo ELSE 0 END,
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (paciente_id) DO UPDATE SET
+        total_facturado_usd = b.total_facturado_usd + EXCLUDED.total_facturado_usd,
+        total_facturado_bs = b.total_facturado_bs + EXCLUDED.total_facturado_bs,
+        total_pagado_usd = b.total_pagado_usd + EXCLUDED.total_pagado_usd,
+        total_pagado_bs = b.total_pagado_bs + EXCLUDED.total_pagado_bs,
+        total_descuentos_usd = b.total_descuentos_usd + EXCLUDED.total_descuentos_usd,
+        saldo_pendiente_usd = b.saldo_pendiente_usd + EXCLUDED.saldo_pendiente_usd,
+        saldo_pendiente_bs = b.saldo_pendiente_bs + EXCLUDED.saldo_pendiente_bs,
+        pagos_completados = b.pagos_completados + EXCLUDED.pagos_completados,
+        pagos_pendientes = b.pagos_pendientes + EXCLUDED.pagos_pendientes,
+        pagos_anulados = b.pagos_anulados + EXCLUDED.pagos_anulados,
+        fecha_actualizacion = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- PASO 3: TRIGGER SOBRE PAGO (RESTA OLD, SUMA NEW)
+-- =====================================================
+CREATE OR REPLACE FUNCTION trigger_actualizar_balance_paciente()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM aplicar_pago_a_balance(OLD, -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM aplicar_pago_a_balance(NEW, 1);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_balance_paciente ON public.pago;
+
+CREATE TRIGGER trigger_balance_paciente
+    AFTER INSERT OR UPDATE OR DELETE ON public.pago
+    FOR EACH ROW
+    EXECUTE FUNCTION trigger_actualizar_balance_paciente();
+
+COMMENT ON FUNCTION trigger_actualizar_balance_paciente IS 'Mantiene paciente_balance con el delta de cada cambio en pago';
+
+-- =====================================================
+-- PASO 4: CARGA INICIAL DESDE LOS PAGOS EXISTENTES
+-- =====================================================
+-- El trigger ya está activo: se bloquean las escrituras en pago mientras se
+-- recalcula, para que ningún pago quede contado dos veces ni se pierda
+-- entre el TRUNCATE y la carga.
+BEGIN;
+
+LOCK TABLE public.pago IN SHARE MODE;
+
+TRUNCATE public.paciente_balance;
+
+INSERT INTO public.paciente_balance (
+    paciente_id,
+    total_facturado_usd, total_facturado_bs,
+    total_pagado_usd, total_pagado_bs,
+    total_descuentos_usd,
+    saldo_pendiente_usd, saldo_pendiente_bs,
+    pagos_completados, pagos_pendientes, pagos_anulados
+)
+SELECT
+    paciente_id,
+    COALESCE(SUM(monto_total_usd) FILTER (WHERE COALESCE(estado_pago, 'completado') <> 'anulado'), 0),
+    COALESCE(SUM(monto_total_bs) FILTER (WHERE COALESCE(estado_pago, 'completado') <> 'anulado'), 0),
+    COALESCE(SUM(monto_pagado_usd) FILTER (WHERE COALESCE(estado_pago, 'completado') <> 'anulado'), 0),
+    COALESCE(SUM(monto_pagado_bs) FILTER (WHERE COALESCE(estado_pago, 'completado') <> 'anulado'), 0),
+    COALESCE(SUM(descuento_usd) FILTER (WHERE COALESCE(estado_pago, 'completado') <> 'anulado'), 0),
+    COALESCE(SUM(saldo_pendiente_usd) FILTER (WHERE estado_pago = 'pendiente'), 0),
+    COALESCE(SUM(saldo_pendiente_bs) FILTER (WHERE estado_pago = 'pendiente'), 0),
+    COUNT(*) FILTER (WHERE estado_pago = 'completado'),
+    COUNT(*) FILTER (WHERE estado_pago = 'pendiente'),
+    COUNT(*) FILTER (WHERE estado_pago = 'anulado')
+FROM public.pago
+GROUP BY paciente_id;
+
+COMMIT;
+
+-- =====================================================
+-- VERIFICACIÓN: el balance incremental debe coincidir con el recálculo
+-- =====================================================
+SELECT b.paciente_id, b.total_pagado_usd, r.total_pagado_usd AS recalculado
+FROM public.paciente_balance b
+JOIN (
+    SELECT paciente_id, SUM(monto_pagado_usd) FILTER (WHERE COALESCE(estado_pago, 'completado') <> 'anulado') AS total_pagado_usd
+    FROM public.pago
+    GROUP BY paciente_id
+) r ON r.paciente_id = b.paciente_id
+WHERE b.total_pagado_usd IS DISTINCT FROM COALESCE(r.total_pagado_usd, 0);
@@ -0,0 +1,115 @@
+-- 🔍 BÚSQUEDA DIFUSA E INDEXADA DE PACIENTES
+-- Problema: get_filtered_patients armaba un OR de seis ILIKE '%termino%'
+--           (nombres, documento, historia). Ningún índice B-tree sirve para
+--           un comodín inicial: cada tecla era un seq scan de paciente, y
+--           "Gonzales" no encontraba "González"
+-- Solución: columna nombre_busqueda normalizada (minúsculas, sin acentos),
+--           índice trigram sobre ella y función buscar_pacientes con ranking
+--           y límite acotado
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- =====================================================
+-- PASO 1: NORMALIZACIÓN (IMMUTABLE para poder indexar)
+-- =====================================================
+-- unaccent() es STABLE; se fija el diccionario para declararla IMMUTABLE
+CREATE OR REPLACE FUNCTION normalizar_texto_busqueda(p_texto TEXT)
+RETURNS TEXT AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, COALESCE(p_texto, '')));
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+COMMENT ON FUNCTION normalizar_texto_busqueda IS 'Minúsculas y sin acentos (González → gonzalez)';
+
+-- =====================================================
+-- PASO 2: COLUMNA NORMALIZADA + ÍNDICES
+-- =====================================================
+ALTER TABLE public.paciente
+ADD COLUMN IF NOT EXISTS nombre_busqueda TEXT
+GENERATED ALWAYS AS (
+    normalizar_texto_busqueda(
+        primer_nombre || ' ' ||
+        COALESCE(segundo_nombre, '') || ' ' ||
+        primer_apellido || ' ' ||
+        COALESCE(segundo_apellido, '')
+    )
+) STORED;
+
+COMMENT ON COLUMN public.paciente.nombre_busqueda IS 'Nombre completo normalizado para búsqueda (generado)';
+
+CREATE INDEX IF NOT EXISTS idx_paciente_nombre_busqueda_trgm
+ON public.paciente USING GIN (nombre_busqueda gin_trgm_ops);
+
+-- Prefijo de documento: idx_paciente_documento_prefijo (20261019_indices_listado_pagos.sql)
+CREATE INDEX IF NOT EXISTS idx_paciente_historia_prefijo
+ON public.paciente (lower(numero_historia) text_pattern_ops);
+
+-- =====================================================
+-- PASO 3: FUNCIÓN DE BÚSQUEDA CON RANKING
+-- =====================================================
+-- Orden del ranking:
+--   1. Documento o historia exactos
+--   2. Prefijo de documento / historia
+--   3. Nombre que contiene el término
+--   4. Similitud por palabra (tolera errores: gonzales ≈ gonzalez)
+-- % y _ del término se escapan: se buscan literalmente, no como comodines.
+-- Límite máx. 201: la app pide una fila extra (hasta 200 + 1) para saber
+-- si hay más resultados de los que muestra.
+-- RETURN QUERY EXECUTE ... USING: la consulta se planifica en cada llamada
+-- con los patrones reales. Con RETURN QUERY estático plpgsql puede pasar a
+-- un plan genérico, en el que LIKE 'x%' y <% no usan los índices
+-- de prefijo ni el trigram.
+CREATE OR REPLACE FUNCTION buscar_pacientes(
+    p_termino TEXT,
+    p_genero TEXT DEFAULT NULL,
+    p_activo BOOLEAN DEFAULT NULL,
+    p_limite INTEGER DEFAULT 50
+)
+RETURNS SETOF public.paciente AS $$
+DECLARE
+    v_termino TEXT := normalizar_texto_busqueda(trim(p_termino));
+    v_limite INTEGER := LEAST(GREATEST(COALESCE(p_limite, 50), 1), 201);
+    v_patron TEXT;
+BEGIN
+    IF v_termino = '' THEN
+        RETURN;
+    END IF;
+
+    -- Término literal para LIKE (escape por defecto: \)
+    v_patron := replace(replace(replace(v_termino, '\', '\\'), '%', '\%'), '_', '\_');
+
+    -- $1 término, $2 prefijo, $3 contiene, $4 género, $5 activo, $6 límite
+    RETURN QUERY EXECUTE $q$
+        SELECT p.*
+        FROM public.paciente p
+        WHERE ($4::text IS NULL OR p.genero = $4)
+          AND ($5::boolean IS NULL OR p.activo = $5)
+          AND (
+              p.numero_documento LIKE $2
+              OR lower(p.numero_historia) LIKE $2
+              OR p.nombre_busqueda LIKE $3
+              OR $1 <% p.nombre_busqueda
+          )
+        ORDER BY
+            CASE
+                WHEN p.numero_documento = $1 OR lower(p.numero_historia) = $1 THEN 0
+                WHEN p.numero_documento LIKE $2 OR lower(p.numero_historia) LIKE $2 THEN 1
+                WHEN p.nombre_busqueda LIKE $3 THEN 2
+                ELSE 3
+            END,
+            word_similarity($1, p.nombre_busqueda) DESC,
+            p.numero_historia DESC
+        LIMIT $6
+    $q$
+    USING v_termino, v_patron || '%', '%' || v_patron || '%', p_genero, p_activo, v_limite;
+END;
+$$ LANGUAGE plpgsql STABLE
+SET pg_trgm.word_similarity_threshold = 0.45;
+
+COMMENT ON FUNCTION buscar_pacientes IS 'Búsqueda difusa de pacientes (trigram + sin acentos) con ranking y límite máx. 201';
+
+-- =====================================================
+-- TESTING
+-- =====================================================
+SELECT numero_historia, primer_nombre, primer_apellido
+FROM buscar_pacientes('gonzales', NULL, TRUE, 10);
@@ -0,0 +1,188 @@
+-- ============================================================================
+-- MIGRACIÓN: Creación atómica de intervención (1 RPC)
+-- ============================================================================
+-- Fecha: 2026-10-19
+-- Problema: crear_intervencion_con_servicios hacía, desde Python, la búsqueda
+--           de personal, el INSERT de intervencion y luego un INSERT por cada
+--           combinación diente × superficie en historia_medica (una obturación
+--           de 6 dientes y 3 superficies = 18+ viajes), sin rollback si alguno
+--           fallaba. Finalizar la intervención sumaba otra llamada para el
+--           odontograma y otra para el estado de la consulta.
+-- Solución: función crear_intervencion_completa() que en UNA transacción:
+--   1. Resuelve personal desde el usuario
+--   2. Inserta la intervención con sus totales
+--   3. Expande servicios → filas de historia_medica por conjuntos (LATERAL)
+--   4. Aplica los cambios de odontograma (actualizar_condiciones_batch)
+--   5. Pasa la consulta al estado indicado (entre_odontologos), validando la transición
+-- Requiere: 20261019_odontograma_lote_atomico.sql
+
+-- ============================================================================
+-- PASO 1: Función principal
+-- ============================================================================
+-- p_servicios: [{
+--     "servicio_id": uuid,
+--     "cantidad": int,                 -- opcional, por defecto 1
+--     "precio_unitario_bs": numeric,
+--     "precio_unitario_usd": numeric,
+--     "alcance": "boca_completa" | "diente_completo" | "superficie_especifica",
+--     "dientes": [11, 12],             -- vacío/ausente en boca_completa
+--     "superficies": ["oclusal"]       -- solo en superficie_especifica
+-- }, ...]
+-- p_condiciones: mismo formato que actualizar_condiciones_batch (sin
+--                intervencion_id: se asigna la intervención creada)
+
+CREATE OR REPLACE FUNCTION public.crear_intervencion_completa(
+    p_consulta_id uuid,
+    p_usuario_id uuid,
+    p_procedimiento text,
+    p_servicios jsonb,
+    p_condiciones jsonb DEFAULT '[]'::jsonb,
+    p_nuevo_estado_consulta text DEFAULT NULL
+) RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_personal_id uuid;
+    v_paciente_id uuid;
+    v_estado_consulta text;
+    v_intervencion_id uuid;
+    v_total_bs numeric;
+    v_total_usd numeric;
+    v_registros int := 0;
+    v_odontograma jsonb := NULL;
+    v_estado_cambiado boolean := FALSE;
+BEGIN
+    IF p_servicios IS NULL OR jsonb_typeof(p_servicios) <> 'array' OR jsonb_array_length(p_servicios) = 0 THEN
+        RAISE EXCEPTION 'Al menos un servicio es requerido';
+    END IF;
+
+    -- 1. Usuario → personal
+    SELECT id INTO v_personal_id
+    FROM public.personal
+    WHERE usuario_id = p_usuario_id;
+
+    IF v_personal_id IS NULL THEN
+        RAISE EXCEPTION 'No se encontró personal asociado al usuario %', p_usuario_id;
+    END IF;
+
+    -- Consulta bloqueada hasta el final de la transacción
+    SELECT paciente_id, estado INTO v_paciente_id, v_estado_consulta
+    FROM public.consulta
+    WHERE id = p_consulta_id
+    FOR UPDATE;
+
+    IF v_paciente_id IS NULL THEN
+        RAISE EXCEPTION 'Consulta % no encontrada', p_consulta_id;
+    END IF;
+
+    -- 2. Totales (precio × cantidad por servicio) e intervención
+    SELECT
+        COALESCE(SUM((s->>'precio_unitario_bs')::numeric * COALESCE((s->>'cantidad')::int, 1)), 0),
+        COALESCE(SUM((s->>'precio_unitario_usd')::numeric * COALESCE((s->>'cantidad')::int, 1)), 0)
+    INTO v_total_bs, v_total_usd
+    FROM jsonb_array_elements(p_servicios) AS s;
+
+    INSERT INTO public.intervencion (
+        consulta_id, odontologo_id, procedimiento_realizado, total_bs, total_usd, estado
+    ) VALUES (
+        p_consulta_id, v_personal_id,
+        COALESCE(NULLIF(p_procedimiento, ''), 'Intervención con ' || jsonb_array_length(p_servicios) || ' servicios'),
+        v_total_bs, v_total_usd, 'completada'
+    ) RETURNING id INTO v_intervencion_id;
+
+    -- 3. historia_medica: una fila por servicio × diente × superficie
+    --    boca_completa          → 1 fila (diente NULL, superficie NULL)
+    --    diente_completo        → 1 fila por diente (superficie NULL)
+    --    superficie_especifica  → 1 fila por diente y superficie
+    INSERT INTO public.historia_medica (
+        intervencion_id, servicio_id,
+        precio_unitario_bs, precio_unitario_usd,
+        precio_total_bs, precio_total_usd,
+        diente_numero, superficie
+    )
+    SELECT
+        v_intervencion_id,
+        (s->>'servicio_id')::uuid,
+        (s->>'precio_unitario_bs')::numeric,
+        (s->>'precio_unitario_usd')::numeric,
+        (s->>'precio_unitario_bs')::numeric,
+        (s->>'precio_unitario_usd')::numeric,
+        d.diente_numero,
+        sup.superficie
+    FROM jsonb_array_elements(p_servicios) AS s
+    CROSS JOIN LATERAL (
+        SELECT NULL::int AS diente_numero
+        WHERE s->>'alcance' = 'boca_completa'
+        UNION ALL
+        SELECT x::int
+        FROM jsonb_array_elements_text(COALESCE(s->'dientes', '[]'::jsonb)) AS x
+        WHERE COALESCE(s->>'alcance', 'superficie_especifica') <> 'boca_completa'
+    ) AS d
+    CROSS JOIN LATERAL (
+        SELECT NULL::text AS superficie
+        WHERE COALESCE(s->>'alcance', 'superficie_especifica') <> 'superficie_especifica'
+        UNION ALL
+        SELECT y
+        FROM jsonb_array_elements_text(COALESCE(s->'superficies', '["oclusal"]'::jsonb)) AS y
+        WHERE COALESCE(s->>'alcance', 'superficie_especifica') = 'superficie_especifica'
+    ) AS sup;
+
+    GET DIAGNOSTICS v_registros = ROW_COUNT;
+
+    -- 4. Odontograma (mismo lote atómico de actualizar_condiciones_batch)
+    IF p_condiciones IS NOT NULL AND jsonb_typeof(p_condiciones) = 'array' AND jsonb_array_length(p_condiciones) > 0 THEN
+        v_odontograma := public.actualizar_condiciones_batch((
+            SELECT jsonb_agg(c || jsonb_build_object('intervencion_id', v_intervencion_id))
+            FROM jsonb_array_elements(p_condiciones) AS c
+        ));
+    END IF;
+
+    -- 5. Estado de la consulta (mismas transiciones que
+    --    ConsultasService._is_valid_status_transition; desde en_atencion se
+    --    permite cualquiera). Una transición inválida revierte todo.
+    IF p_nuevo_estado_consulta IS NOT NULL THEN
+        IF v_estado_consulta <> 'en_atencion' AND NOT (
+            (v_estado_consulta = 'en_espera' AND p_nuevo_estado_consulta IN ('en_atencion', 'cancelada'))
+            OR (v_estado_consulta = 'entre_odontologos' AND p_nuevo_estado_consulta IN ('en_atencion', 'en_espera'))
+            OR (v_estado_consulta = 'cancelada' AND p_nuevo_estado_consulta = 'en_espera')
+            OR (v_estado_consulta = 'programada' AND p_nuevo_estado_consulta IN ('en_atencion', 'en_espera', 'cancelada', 'no_asistio'))
+            OR (v_estado_consulta = 'en_progreso' AND p_nuevo_estado_consulta IN ('completada', 'en_atencion', 'cancelada'))
+            OR (v_estado_consulta = 'no_asistio' AND p_nuevo_estado_consulta IN ('en_espera', 'programada'))
+        ) THEN
+            RAISE EXCEPTION 'Transición de estado no válida: consulta % en estado %, no se puede cambiar a %',
+                p_consulta_id, v_estado_consulta, p_nuevo_estado_consulta;
+        END IF;
+
+        UPDATE public.consulta
+        SET estado = p_nuevo_estado_consulta
+        WHERE id = p_consulta_id;
+        v_estado_cambiado := TRUE;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'success', TRUE,
+        'intervencion_id', v_intervencion_id,
+        'paciente_id', v_paciente_id,
+        'total_bs', v_total_bs,
+        'total_usd', v_total_usd,
+        'servicios_count', jsonb_array_length(p_servicios),
+        'registros_creados', v_registros,
+        'odontograma', v_odontograma,
+        'estado_consulta_actualizado', v_estado_cambiado
+    );
+END;
+$$;
+
+COMMENT ON FUNCTION public.crear_intervencion_completa(uuid, uuid, text, jsonb, jsonb, text) IS
+'Crea intervención + historia_medica (expandida por conjuntos) + cambios de odontograma + estado de consulta en una sola transacción.';
+
+-- ============================================================================
+-- TESTING
+-- ============================================================================
+-- SELECT public.crear_intervencion_completa(
+--     '<consulta_uuid>', '<usuario_uuid>', 'Obturaciones',
+--     '[{"servicio_id": "<uuid>", "precio_unitario_bs": 730, "precio_unitario_usd": 20,
+--        "alcance": "superficie_especifica", "dientes": [16, 26], "superficies": ["oclusal", "mesial"]}]'::jsonb,
+--     '[{"paciente_id": "<paciente_uuid>", "diente_numero": 16, "superficie": "oclusal", "tipo_condicion": "obturacion"}]'::jsonb,
+--     'entre_odontologos'
+-- );
@@ -0,0 +1,60 @@
+-- 📊 ESTADÍSTICAS DE PACIENTES AGREGADAS EN LA BD
+-- Problema: get_patient_stats descargaba la tabla paciente completa (todas las
+--           columnas) para contar cinco enteros, y leía created_at (la columna
+--           es fecha_registro), por lo que nuevos_mes siempre daba 0
+-- Solución: una función que recorre paciente una sola vez con agregados
+--           FILTER y devuelve contadores + histograma de edades en un JSON
+
+-- =====================================================
+-- FUNCIÓN: estadisticas_pacientes()
+-- =====================================================
+CREATE OR REPLACE FUNCTION estadisticas_pacientes()
+RETURNS JSONB AS $$
+DECLARE
+    v_inicio_mes DATE := date_trunc('month', CURRENT_DATE)::date;
+    v_resultado JSONB;
+BEGIN
+    WITH base AS (
+        SELECT
+            activo,
+            genero,
+            fecha_registro,
+            CASE
+                WHEN fecha_nacimiento IS NULL THEN NULL
+                ELSE EXTRACT(YEAR FROM age(CURRENT_DATE, fecha_nacimiento))::int
+            END AS edad
+        FROM public.paciente
+    )
+    SELECT jsonb_build_object(
+        'total', COUNT(*),
+        'activos', COUNT(*) FILTER (WHERE activo),
+        'hombres', COUNT(*) FILTER (WHERE genero = 'masculino'),
+        'mujeres', COUNT(*) FILTER (WHERE genero = 'femenino'),
+        'nuevos_mes', COUNT(*) FILTER (WHERE fecha_registro >= v_inicio_mes),
+        'hombres_activos', COUNT(*) FILTER (WHERE activo AND genero = 'masculino'),
+        'mujeres_activas', COUNT(*) FILTER (WHERE activo AND genero = 'femenino'),
+        'nuevos_mes_activos', COUNT(*) FILTER (WHERE activo AND fecha_registro >= v_inicio_mes),
+        'edad_promedio', COALESCE(ROUND(AVG(edad) FILTER (WHERE activo), 1), 0),
+        -- Mismos rangos que el filtro de edad de la página de pacientes (solo activos)
+        'histograma_edad', jsonb_build_array(
+            jsonb_build_object('rango', '0-17', 'cantidad', COUNT(*) FILTER (WHERE activo AND edad BETWEEN 0 AND 17)),
+            jsonb_build_object('rango', '18-35', 'cantidad', COUNT(*) FILTER (WHERE activo AND edad BETWEEN 18 AND 35)),
+            jsonb_build_object('rango', '36-50', 'cantidad', COUNT(*) FILTER (WHERE activo AND edad BETWEEN 36 AND 50)),
+            jsonb_build_object('rango', '51-65', 'cantidad', COUNT(*) FILTER (WHERE activo AND edad BETWEEN 51 AND 65)),
+            jsonb_build_object('rango', '66+', 'cantidad', COUNT(*) FILTER (WHERE activo AND edad >= 66)),
+            jsonb_build_object('rango', 'sin_fecha', 'cantidad', COUNT(*) FILTER (WHERE activo AND edad IS NULL))
+        )
+    )
+    INTO v_resultado
+    FROM base;
+
+    RETURN v_resultado;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION estadisticas_pacientes IS 'Contadores de pacientes e histograma de edades en una sola lectura';
+
+-- =====================================================
+-- TESTING
+-- =====================================================
+SELECT estadisticas_pacientes();
@@ -0,0 +1,33 @@
+-- 📋 ÍNDICES PARA EL HISTORIAL CLÍNICO POR PÁGINAS
+-- Problema: el historial del paciente se cargaba en un solo embed profundo
+--           (consultas → intervenciones → servicios → pagos)
+-- Solución: resumen con conteos, consultas paginadas (más recientes primero)
+--           y detalle de intervenciones al expandir; estos índices sostienen
+--           cada una de esas lecturas
+
+-- =====================================================
+-- CONSULTA: páginas por paciente ordenadas por llegada
+-- =====================================================
+CREATE INDEX IF NOT EXISTS idx_consulta_paciente_llegada
+ON public.consulta (paciente_id, fecha_llegada DESC);
+
+-- =====================================================
+-- INTERVENCION: detalle por consulta y conteo por paciente
+-- =====================================================
+CREATE INDEX IF NOT EXISTS idx_intervencion_consulta_inicio
+ON public.intervencion (consulta_id, hora_inicio);
+
+-- =====================================================
+-- HISTORIA_MEDICA: servicios de cada intervención
+-- =====================================================
+CREATE INDEX IF NOT EXISTS idx_historia_medica_intervencion
+ON public.historia_medica (intervencion_id);
+
+-- =====================================================
+-- VERIFICACIÓN
+-- =====================================================
+EXPLAIN
+SELECT id FROM public.consulta
+WHERE paciente_id = (SELECT id FROM public.paciente LIMIT 1)
+ORDER BY fecha_llegada DESC
+LIMIT 11;
@@ -0,0 +1,51 @@
+-- 📄 ÍNDICES PARA EL LISTADO PAGINADO DE PAGOS
+-- Problema: la página de pagos cargaba TODOS los pagos con su paciente y
+--           filtraba en memoria
+-- Solución: filtros, búsqueda y paginación en el servidor (get_payments_page);
+--           estos índices mantienen cada página en tiempo constante
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- =====================================================
+-- PAGO: orden por fecha y filtros combinados
+-- =====================================================
+CREATE INDEX IF NOT EXISTS idx_pago_fecha_id
+ON public.pago (fecha_pago DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_pago_estado_fecha
+ON public.pago (estado_pago, fecha_pago DESC);
+
+CREATE INDEX IF NOT EXISTS idx_pago_paciente_fecha
+ON public.pago (paciente_id, fecha_pago DESC);
+
+-- Búsqueda por prefijo de recibo (LIKE 'REC202510%')
+CREATE INDEX IF NOT EXISTS idx_pago_numero_recibo_prefijo
+ON public.pago (numero_recibo varchar_pattern_ops);
+
+-- Filtro por método: metodos_pago @> '[{"tipo": "efectivo"}]'
+CREATE INDEX IF NOT EXISTS idx_pago_metodos_pago
+ON public.pago USING GIN (metodos_pago jsonb_path_ops);
+
+-- =====================================================
+-- PACIENTE: búsqueda por nombre / documento desde pagos
+-- =====================================================
+CREATE INDEX IF NOT EXISTS idx_paciente_primer_nombre_trgm
+ON public.paciente USING GIN (primer_nombre gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_paciente_primer_apellido_trgm
+ON public.paciente USING GIN (primer_apellido gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_paciente_segundo_apellido_trgm
+ON public.paciente USING GIN (segundo_apellido gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_paciente_documento_prefijo
+ON public.paciente (numero_documento varchar_pattern_ops);
+
+-- =====================================================
+-- VERIFICACIÓN
+-- =====================================================
+EXPLAIN
+SELECT id FROM public.pago
+WHERE estado_pago = 'pendiente'
+ORDER BY fecha_pago DESC
+LIMIT 15;
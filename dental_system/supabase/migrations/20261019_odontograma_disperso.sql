@@ -0,0 +1,225 @@
+-- ============================================================================
+-- MIGRACIÓN: Odontograma disperso (solo superficies NO sanas activas)
+-- ============================================================================
+-- Fecha: 2026-10-19
+-- Problema: el trigger crear_odontograma_inicial insertaba, fila por fila en
+--           un bucle PL/pgSQL, 160 condiciones "sano" por cada paciente nuevo,
+--           y get_patient_odontogram las volvía a leer todas en cada apertura.
+--           La mayoría de los pacientes tiene menos de 10 superficies no
+--           sanas: más del 90% de la tabla diente era ruido para sus índices.
+-- Solución: "sano" queda implícito por ausencia.
+--   1. Se elimina el trigger (crear paciente ya no toca diente)
+--   2. Se compactan las filas existentes (semillas borradas, "sano" a historial)
+--   3. Los cambios a "sano" se guardan como historial (activo = FALSE):
+--      el odontograma activo solo contiene condiciones reales
+--   4. El servicio rellena las superficies faltantes con "sano" al decodificar
+--      (utils/odontograma_compacto.codificar_filas)
+-- Requiere: 20261019_odontograma_lote_atomico.sql
+
+-- ============================================================================
+-- PASO 1: Eliminar trigger y función de odontograma inicial
+-- ============================================================================
+
+DO $$
+DECLARE
+    v_tabla regclass;
+BEGIN
+    FOR v_tabla IN
+        SELECT tgrelid::regclass
+        FROM pg_trigger
+        WHERE tgname = 'trigger_crear_odontograma_inicial'
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_crear_odontograma_inicial ON %s', v_tabla);
+        RAISE NOTICE 'Trigger trigger_crear_odontograma_inicial eliminado de %', v_tabla;
+    END LOOP;
+END $$;
+
+DROP FUNCTION IF EXISTS public.crear_odontograma_inicial();
+
+-- ============================================================================
+-- PASO 2: Compactar filas existentes
+-- ============================================================================
+
+-- 2.1 Semillas del trigger: "sano", sin intervención, creadas junto con el
+--     paciente (primer registro de odontograma de cada paciente)
+DELETE FROM public.diente d
+USING (
+    SELECT paciente_id, MIN(fecha_registro) AS primera
+    FROM public.diente
+    GROUP BY paciente_id
+) s
+WHERE d.paciente_id = s.paciente_id
+  AND d.fecha_registro = s.primera
+  AND d.tipo_condicion = 'sano'
+  AND d.intervencion_id IS NULL;
+
+-- 2.2 "sano" registrado después (tratamientos, cambios manuales): se conserva
+--     como historial pero deja de formar parte del odontograma activo
+UPDATE public.diente
+SET activo = FALSE
+WHERE activo = TRUE
+  AND tipo_condicion = 'sano';
+
+-- ============================================================================
+-- PASO 3: Índice parcial para el odontograma activo
+-- ============================================================================
+-- Sostiene la carga (paciente_id, activo) y la verificación de versión del
+-- cache (última fecha_registro + count)
+
+CREATE INDEX IF NOT EXISTS idx_diente_paciente_activas
+ON public.diente (paciente_id, fecha_registro DESC)
+WHERE activo = TRUE;
+
+-- ============================================================================
+-- PASO 4: Lote de condiciones en modo disperso
+-- ============================================================================
+-- Igual que 20261019_odontograma_lote_atomico.sql salvo que las filas "sano"
+-- se insertan con activo = FALSE (quedan en el historial del diente).
+
+CREATE OR REPLACE FUNCTION public.actualizar_condiciones_batch(
+    actualizaciones jsonb
+) RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_desactivadas int := 0;
+    v_condiciones jsonb := '[]'::jsonb;
+BEGIN
+    IF actualizaciones IS NULL
+       OR jsonb_typeof(actualizaciones) <> 'array'
+       OR jsonb_array_length(actualizaciones) = 0 THEN
+        RETURN jsonb_build_object('exitosos', 0, 'desactivadas', 0, 'condiciones', v_condiciones);
+    END IF;
+
+    -- Validación previa: cualquier fila incompleta aborta el lote completo
+    IF EXISTS (
+        SELECT 1
+        FROM jsonb_array_elements(actualizaciones) AS u
+        WHERE NULLIF(u->>'paciente_id', '') IS NULL
+           OR NULLIF(u->>'diente_numero', '') IS NULL
+           OR NULLIF(u->>'superficie', '') IS NULL
+           OR NULLIF(u->>'tipo_condicion', '') IS NULL
+    ) THEN
+        RAISE EXCEPTION 'Actualización inválida: paciente_id, diente_numero, superficie y tipo_condicion son obligatorios';
+    END IF;
+
+    -- Cambios normalizados (última ocurrencia por superficie)
+    CREATE TEMP TABLE _cambios_odontograma ON COMMIT DROP AS
+    SELECT DISTINCT ON (paciente_id, diente_numero, superficie)
+        paciente_id, diente_numero, superficie, tipo_condicion, intervencion_id, orden
+    FROM (
+        SELECT
+            (u->>'paciente_id')::uuid AS paciente_id,
+            (u->>'diente_numero')::int AS diente_numero,
+            u->>'superficie' AS superficie,
+            u->>'tipo_condicion' AS tipo_condicion,
+            NULLIF(u->>'intervencion_id', '')::uuid AS intervencion_id,
+            t.orden
+        FROM jsonb_array_elements(actualizaciones) WITH ORDINALITY AS t(u, orden)
+    ) AS entrada
+    ORDER BY paciente_id, diente_numero, superficie, orden DESC;
+
+    -- PASO A: Desactivar condiciones vigentes (historial), un solo UPDATE
+    UPDATE public.diente d
+    SET activo = FALSE
+    FROM _cambios_odontograma c
+    WHERE d.paciente_id = c.paciente_id
+      AND d.diente_numero = c.diente_numero
+      AND d.superficie = c.superficie
+      AND d.activo = TRUE;
+
+    GET DIAGNOSTICS v_desactivadas = ROW_COUNT;
+
+    -- PASO B: Insertar condiciones nuevas ("sano" directo al historial)
+    WITH insertadas AS (
+        INSERT INTO public.diente (
+            paciente_id, diente_numero, superficie, tipo_condicion, intervencion_id, activo
+        )
+        SELECT paciente_id, diente_numero, superficie, tipo_condicion, intervencion_id,
+               tipo_condicion <> 'sano'
+        FROM _cambios_odontograma
+        ORDER BY orden
+        RETURNING id, diente_numero, superficie, tipo_condicion
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'id', id,
+        'diente_numero', diente_numero,
+        'superficie', superficie,
+        'tipo_condicion', tipo_condicion
+    )), '[]'::jsonb)
+    INTO v_condiciones
+    FROM insertadas;
+
+    DROP TABLE IF EXISTS _cambios_odontograma;
+
+    RETURN jsonb_build_object(
+        'exitosos', jsonb_array_length(v_condiciones),
+        'desactivadas', v_desactivadas,
+        'condiciones', v_condiciones
+    );
+END;
+$$;
+
+COMMENT ON FUNCTION public.actualizar_condiciones_batch(jsonb) IS
+'Aplica un lote de cambios de odontograma en una transacción (modo disperso: "sano" se guarda solo como historial).';
+
+-- ============================================================================
+-- PASO 5: Cambio individual sobre el mismo lote
+-- ============================================================================
+-- La versión de 20251007 apuntaba a condiciones_diente y siempre dejaba una
+-- fila activa; ahora delega en actualizar_condiciones_batch.
+-- p_material / p_descripcion / p_registrado_por se mantienen por
+-- compatibilidad de firma (la tabla diente no tiene esas columnas).
+
+DROP FUNCTION IF EXISTS public.actualizar_condicion_diente(
+    uuid, integer, character varying, character varying, uuid, character varying, text, uuid
+);
+
+CREATE OR REPLACE FUNCTION public.actualizar_condicion_diente(
+    p_paciente_id uuid,
+    p_diente_numero integer,
+    p_superficie character varying,
+    p_nueva_condicion character varying,
+    p_intervencion_id uuid DEFAULT NULL,
+    p_material character varying DEFAULT NULL,
+    p_descripcion text DEFAULT NULL,
+    p_registrado_por uuid DEFAULT NULL
+) RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_resultado jsonb;
+BEGIN
+    v_resultado := public.actualizar_condiciones_batch(jsonb_build_array(jsonb_build_object(
+        'paciente_id', p_paciente_id,
+        'diente_numero', p_diente_numero,
+        'superficie', p_superficie,
+        'tipo_condicion', p_nueva_condicion,
+        'intervencion_id', p_intervencion_id
+    )));
+
+    RETURN (v_resultado->'condiciones'->0->>'id')::uuid;
+END;
+$$;
+
+COMMENT ON FUNCTION public.actualizar_condicion_diente(uuid, integer, character varying, character varying, uuid, character varying, text, uuid) IS
+'Cambio de una superficie (delegado a actualizar_condiciones_batch, modo disperso).';
+
+-- ============================================================================
+-- VERIFICACIÓN
+-- ============================================================================
+-- Fuera de la transacción de la migración, para recuperar espacio:
+-- VACUUM (ANALYZE) public.diente;
+
+-- Ninguna fila activa "sano" (esperado: 0)
+SELECT COUNT(*) AS sanas_activas
+FROM public.diente
+WHERE activo = TRUE AND tipo_condicion = 'sano';
+
+-- Filas activas por paciente (esperado: pocas, solo condiciones reales)
+SELECT paciente_id, COUNT(*) AS superficies_no_sanas
+FROM public.diente
+WHERE activo = TRUE
+GROUP BY paciente_id
+ORDER BY superficies_no_sanas DESC
+LIMIT 10;
@@ -0,0 +1,128 @@
+-- ============================================================================
+-- MIGRACIÓN: Actualización de odontograma en lote (atómica y por conjuntos)
+-- ============================================================================
+-- Fecha: 2026-10-19
+-- Problema: actualizar_condiciones_batch (Python) hacía por cada superficie
+--           un UPDATE (desactivar) + un INSERT: hasta 320 viajes a la BD para
+--           un diagnóstico de boca completa, y un fallo a mitad dejaba el
+--           odontograma aplicado a medias
+-- Solución: una sola llamada RPC que recibe el arreglo JSON de cambios,
+--           desactiva las condiciones previas con un UPDATE por conjuntos e
+--           inserta las nuevas con un INSERT multi-fila, todo en la misma
+--           transacción (si algo falla no se aplica nada)
+
+-- ============================================================================
+-- PASO 1: Eliminar versiones anteriores (apuntaban a condiciones_diente)
+-- ============================================================================
+
+DROP FUNCTION IF EXISTS public.actualizar_condiciones_batch(jsonb);
+DROP FUNCTION IF EXISTS public.actualizar_condiciones_batch_v3_backup(jsonb);
+
+-- ============================================================================
+-- PASO 2: Función de lote sobre la tabla diente
+-- ============================================================================
+-- Entrada: [{"paciente_id", "diente_numero", "superficie", "tipo_condicion",
+--            "intervencion_id"?}, ...]
+-- Si una misma superficie aparece varias veces gana la última del arreglo
+-- (mismo resultado que aplicar los cambios uno por uno).
+--
+-- Retorna:
+-- {
+--   "exitosos": 15,
+--   "desactivadas": 12,
+--   "condiciones": [{"id", "diente_numero", "superficie", "tipo_condicion"}, ...]
+-- }
+
+CREATE OR REPLACE FUNCTION public.actualizar_condiciones_batch(
+    actualizaciones jsonb
+) RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_desactivadas int := 0;
+    v_condiciones jsonb := '[]'::jsonb;
+BEGIN
+    IF actualizaciones IS NULL
+       OR jsonb_typeof(actualizaciones) <> 'array'
+       OR jsonb_array_length(actualizaciones) = 0 THEN
+        RETURN jsonb_build_object('exitosos', 0, 'desactivadas', 0, 'condiciones', v_condiciones);
+    END IF;
+
+    -- Validación previa: cualquier fila incompleta aborta el lote completo
+    IF EXISTS (
+        SELECT 1
+        FROM jsonb_array_elements(actualizaciones) AS u
+        WHERE NULLIF(u->>'paciente_id', '') IS NULL
+           OR NULLIF(u->>'diente_numero', '') IS NULL
+           OR NULLIF(u->>'superficie', '') IS NULL
+           OR NULLIF(u->>'tipo_condicion', '') IS NULL
+    ) THEN
+        RAISE EXCEPTION 'Actualización inválida: paciente_id, diente_numero, superficie y tipo_condicion son obligatorios';
+    END IF;
+
+    -- Cambios normalizados (última ocurrencia por superficie)
+    CREATE TEMP TABLE _cambios_odontograma ON COMMIT DROP AS
+    SELECT DISTINCT ON (paciente_id, diente_numero, superficie)
+        paciente_id, diente_numero, superficie, tipo_condicion, intervencion_id, orden
+    FROM (
+        SELECT
+            (u->>'paciente_id')::uuid AS paciente_id,
+            (u->>'diente_numero')::int AS diente_numero,
+            u->>'superficie' AS superficie,
+            u->>'tipo_condicion' AS tipo_condicion,
+            NULLIF(u->>'intervencion_id', '')::uuid AS intervencion_id,
+            t.orden
+        FROM jsonb_array_elements(actualizaciones) WITH ORDINALITY AS t(u, orden)
+    ) AS entrada
+    ORDER BY paciente_id, diente_numero, superficie, orden DESC;
+
+    -- PASO A: Desactivar condiciones vigentes (historial), un solo UPDATE
+    UPDATE public.diente d
+    SET activo = FALSE
+    FROM _cambios_odontograma c
+    WHERE d.paciente_id = c.paciente_id
+      AND d.diente_numero = c.diente_numero
+      AND d.superficie = c.superficie
+      AND d.activo = TRUE;
+
+    GET DIAGNOSTICS v_desactivadas = ROW_COUNT;
+
+    -- PASO B: Insertar condiciones nuevas, un solo INSERT multi-fila
+    WITH insertadas AS (
+        INSERT INTO public.diente (
+            paciente_id, diente_numero, superficie, tipo_condicion, intervencion_id, activo
+        )
+        SELECT paciente_id, diente_numero, superficie, tipo_condicion, intervencion_id, TRUE
+        FROM _cambios_odontograma
+        ORDER BY orden
+        RETURNING id, diente_numero, superficie, tipo_condicion
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'id', id,
+        'diente_numero', diente_numero,
+        'superficie', superficie,
+        'tipo_condicion', tipo_condicion
+    )), '[]'::jsonb)
+    INTO v_condiciones
+    FROM insertadas;
+
+    DROP TABLE IF EXISTS _cambios_odontograma;
+
+    RETURN jsonb_build_object(
+        'exitosos', jsonb_array_length(v_condiciones),
+        'desactivadas', v_desactivadas,
+        'condiciones', v_condiciones
+    );
+END;
+$$;
+
+COMMENT ON FUNCTION public.actualizar_condiciones_batch(jsonb) IS
+'Aplica un lote de cambios de odontograma en una transacción: UPDATE por conjuntos (desactivar) + INSERT multi-fila. Retorna los ids nuevos.';
+
+-- ============================================================================
+-- TESTING
+-- ============================================================================
+-- SELECT public.actualizar_condiciones_batch('[
+--   {"paciente_id": "<uuid>", "diente_numero": 11, "superficie": "oclusal", "tipo_condicion": "caries"},
+--   {"paciente_id": "<uuid>", "diente_numero": 11, "superficie": "mesial",  "tipo_condicion": "caries"}
+-- ]'::jsonb);
@@ -0,0 +1,126 @@
+-- ============================================================================
+-- MIGRACIÓN: Orden de llegada asignado por la BD al insertar la consulta
+-- ============================================================================
+-- Fecha: 2026-10-19
+-- Problema: la posición en la cola del odontólogo se calculaba desde Python
+--           (_calcular_siguiente_orden_cola_doctor) cargando la cola del día
+--           completa con paciente y personal embebidos solo para obtener
+--           MAX(orden_cola_odontologo) + 1. El trigger asignar_orden_llegada
+--           de esquema.sql apuntaba a la tabla antigua "consultas" y a la
+--           columna orden_llegada_general, que ya no existen.
+-- Solución:
+--   1. Índice (odontólogo, fecha_llegada) INCLUDE (orden, estado): el MAX
+--      del día se resuelve con un index-only scan
+--   2. asignar_orden_llegada() reescrita para public.consulta, serializada
+--      por odontólogo y día con un advisory lock de transacción (dos
+--      llegadas simultáneas no obtienen la misma posición)
+--   3. Trigger BEFORE INSERT: create_consultation ya no lee la cola
+-- Requiere: 20261019_reordenar_cola_atomico.sql (misma definición de cola)
+
+-- ============================================================================
+-- PASO 1: Índice para el máximo por odontólogo y día
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_consulta_cola_odontologo_llegada
+ON public.consulta (primer_odontologo_id, fecha_llegada)
+INCLUDE (orden_cola_odontologo, estado);
+
+-- ============================================================================
+-- PASO 2: Eliminar el trigger heredado (tabla "consultas")
+-- ============================================================================
+
+DO $$
+DECLARE
+    v_tabla regclass;
+BEGIN
+    FOR v_tabla IN
+        SELECT tgrelid::regclass
+        FROM pg_trigger
+        WHERE tgname = 'trigger_asignar_orden_llegada'
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_asignar_orden_llegada ON %s', v_tabla);
+        RAISE NOTICE 'Trigger trigger_asignar_orden_llegada eliminado de %', v_tabla;
+    END LOOP;
+END $$;
+
+-- ============================================================================
+-- PASO 3: Función de asignación
+-- ============================================================================
+-- Cola = consultas del mismo odontólogo y día en programada / en_espera
+-- (igual que reindexar_cola_odontologo). Si el INSERT ya trae una posición
+-- se respeta.
+
+CREATE OR REPLACE FUNCTION public.asignar_orden_llegada()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_dia date;
+BEGIN
+    IF NEW.orden_cola_odontologo IS NOT NULL OR NEW.primer_odontologo_id IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    NEW.fecha_llegada := COALESCE(NEW.fecha_llegada, CURRENT_TIMESTAMP);
+    v_dia := NEW.fecha_llegada::date;
+
+    -- Una asignación a la vez por odontólogo y día (se libera al terminar la transacción)
+    PERFORM pg_advisory_xact_lock(
+        hashtextextended('cola:' || NEW.primer_odontologo_id::text || ':' || v_dia::text, 0)
+    );
+
+    SELECT COALESCE(MAX(orden_cola_odontologo), 0) + 1
+    INTO NEW.orden_cola_odontologo
+    FROM public.consulta
+    WHERE primer_odontologo_id = NEW.primer_odontologo_id
+      AND fecha_llegada >= v_dia::timestamp
+      AND fecha_llegada < (v_dia + 1)::timestamp
+      AND estado IN ('programada', 'en_espera');
+
+    RETURN NEW;
+END;
+$$;
+
+COMMENT ON FUNCTION public.asignar_orden_llegada() IS
+'Asigna orden_cola_odontologo = MAX del día del odontólogo + 1 al insertar una consulta (serializado por odontólogo y día).';
+
+-- ============================================================================
+-- PASO 4: Trigger
+-- ============================================================================
+
+CREATE TRIGGER trigger_asignar_orden_llegada
+    BEFORE INSERT ON public.consulta
+    FOR EACH ROW
+    EXECUTE FUNCTION public.asignar_orden_llegada();
+
+-- ============================================================================
+-- PASO 5: Sanear las colas de hoy (consultas creadas sin posición)
+-- ============================================================================
+
+SELECT primer_odontologo_id,
+       public.reindexar_cola_odontologo(primer_odontologo_id, CURRENT_DATE) AS reindexadas
+FROM (
+    SELECT DISTINCT primer_odontologo_id
+    FROM public.consulta
+    WHERE fecha_llegada >= CURRENT_DATE::timestamp
+      AND fecha_llegada < (CURRENT_DATE + 1)::timestamp
+) AS colas_hoy;
+
+-- ============================================================================
+-- VERIFICACIÓN
+-- ============================================================================
+-- Plan esperado: Index Only Scan using idx_consulta_cola_odontologo_llegada
+-- EXPLAIN SELECT MAX(orden_cola_odontologo)
+-- FROM public.consulta
+-- WHERE primer_odontologo_id = '<odontologo_uuid>'
+--   AND fecha_llegada >= CURRENT_DATE::timestamp
+--   AND fecha_llegada < (CURRENT_DATE + 1)::timestamp
+--   AND estado IN ('programada', 'en_espera');
+
+-- Consultas de hoy en espera sin posición (esperado: 0)
+SELECT COUNT(*) AS sin_posicion
+FROM public.consulta
+WHERE orden_cola_odontologo IS NULL
+  AND estado = 'en_espera'
+  AND fecha_llegada >= CURRENT_DATE::timestamp
+  AND fecha_llegada < (CURRENT_DATE + 1)::timestamp;
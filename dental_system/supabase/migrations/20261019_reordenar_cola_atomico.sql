@@ -0,0 +1,197 @@
+-- ============================================================================
+-- MIGRACIÓN: Reordenamiento atómico de la cola del odontólogo
+-- ============================================================================
+-- Fecha: 2026-10-19
+-- Problema: subir/bajar un paciente (intercambiar_orden_cola) hacía desde
+--           Python: leer la cola del día, un UPDATE por cada fila fuera de
+--           orden (reindexar_cola_doctor), volver a leer la cola y 2 UPDATE
+--           más para el intercambio. Sin bloqueo: dos recepcionistas
+--           moviendo pacientes a la vez podían dejar posiciones repetidas
+--           o huecos en orden_cola_odontologo.
+-- Solución:
+--   1. reindexar_cola_odontologo(): deja la cola en 1, 2, 3... con UNA
+--      sentencia por conjuntos (row_number)
+--   2. mover_consulta_en_cola(): bloquea las filas de la cola (FOR UPDATE),
+--      reindexa y mueve la consulta N posiciones en la misma transacción.
+--      Retorna la cola completa resultante para que la pantalla no quede
+--      desactualizada si otra recepcionista la movió antes
+-- Un clic = 1 llamada RPC.
+
+-- ============================================================================
+-- PASO 1: Reindexación por conjuntos
+-- ============================================================================
+-- Cola activa = consultas del día (p_fecha) del odontólogo en estado
+-- programada / en_espera. Orden actual primero, llegada como desempate.
+
+CREATE OR REPLACE FUNCTION public.reindexar_cola_odontologo(
+    p_odontologo_id uuid,
+    p_fecha date DEFAULT CURRENT_DATE
+) RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_actualizadas int := 0;
+BEGIN
+    WITH ordenada AS (
+        SELECT id,
+               row_number() OVER (
+                   ORDER BY orden_cola_odontologo NULLS LAST, fecha_llegada, id
+               ) AS posicion
+        FROM public.consulta
+        WHERE primer_odontologo_id = p_odontologo_id
+          AND estado IN ('programada', 'en_espera')
+          AND fecha_llegada >= p_fecha::timestamp
+          AND fecha_llegada < (p_fecha + 1)::timestamp
+    )
+    UPDATE public.consulta c
+    SET orden_cola_odontologo = o.posicion
+    FROM ordenada o
+    WHERE c.id = o.id
+      AND c.orden_cola_odontologo IS DISTINCT FROM o.posicion;
+
+    GET DIAGNOSTICS v_actualizadas = ROW_COUNT;
+    RETURN v_actualizadas;
+END;
+$$;
+
+COMMENT ON FUNCTION public.reindexar_cola_odontologo(uuid, date) IS
+'Renumera 1..N la cola activa del día de un odontólogo en una sola sentencia.';
+
+-- ============================================================================
+-- PASO 2: Mover una consulta dentro de su cola
+-- ============================================================================
+-- p_desplazamiento: -1 = subir una posición, +1 = bajar una posición
+-- (relativo a la posición real en BD, no a la que ve la pantalla).
+-- Retorna:
+-- {
+--   "success": true, "message": "...",
+--   "orden_anterior": 3, "orden_nuevo": 2, "total_en_cola": 5,
+--   "reindexadas": 0,
+--   "cola": [{"id": "<uuid>", "orden": 1}, ...]   -- cola completa tras el movimiento
+-- }
+
+CREATE OR REPLACE FUNCTION public.mover_consulta_en_cola(
+    p_consulta_id uuid,
+    p_desplazamiento integer,
+    p_fecha date DEFAULT CURRENT_DATE
+) RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_odontologo_id uuid;
+    v_estado text;
+    v_total int;
+    v_reindexadas int;
+    v_actual int;
+    v_nuevo int;
+    v_cola jsonb;
+BEGIN
+    IF p_desplazamiento IS NULL OR p_desplazamiento = 0 THEN
+        RETURN jsonb_build_object('success', FALSE, 'message', 'Las posiciones son iguales.');
+    END IF;
+
+    SELECT primer_odontologo_id, estado INTO v_odontologo_id, v_estado
+    FROM public.consulta
+    WHERE id = p_consulta_id;
+
+    IF v_odontologo_id IS NULL THEN
+        RETURN jsonb_build_object('success', FALSE, 'message', 'Consulta a mover no encontrada en la cola activa.');
+    END IF;
+
+    -- Bloquear la cola completa del odontólogo (orden por id: sin deadlocks
+    -- entre dos movimientos simultáneos sobre la misma cola)
+    PERFORM 1
+    FROM public.consulta
+    WHERE primer_odontologo_id = v_odontologo_id
+      AND estado IN ('programada', 'en_espera')
+      AND fecha_llegada >= p_fecha::timestamp
+      AND fecha_llegada < (p_fecha + 1)::timestamp
+    ORDER BY id
+    FOR UPDATE;
+
+    -- Con la cola bloqueada: sanear y leer la posición real
+    v_reindexadas := public.reindexar_cola_odontologo(v_odontologo_id, p_fecha);
+
+    SELECT orden_cola_odontologo, estado INTO v_actual, v_estado
+    FROM public.consulta
+    WHERE id = p_consulta_id;
+
+    IF v_estado NOT IN ('programada', 'en_espera') OR v_actual IS NULL THEN
+        RETURN jsonb_build_object('success', FALSE, 'message', 'Consulta a mover no encontrada en la cola activa.');
+    END IF;
+
+    SELECT COUNT(*) INTO v_total
+    FROM public.consulta
+    WHERE primer_odontologo_id = v_odontologo_id
+      AND estado IN ('programada', 'en_espera')
+      AND fecha_llegada >= p_fecha::timestamp
+      AND fecha_llegada < (p_fecha + 1)::timestamp;
+
+    v_nuevo := v_actual + p_desplazamiento;
+
+    IF v_nuevo < 1 OR v_nuevo > v_total THEN
+        RETURN jsonb_build_object(
+            'success', FALSE,
+            'message', format('No hay consulta en la posición destino (%s).', v_nuevo),
+            'orden_anterior', v_actual,
+            'total_en_cola', v_total,
+            'reindexadas', v_reindexadas
+        );
+    END IF;
+
+    -- Mover: las consultas entre origen y destino se corren una posición
+    UPDATE public.consulta
+    SET orden_cola_odontologo = CASE
+            WHEN id = p_consulta_id THEN v_nuevo
+            WHEN v_nuevo < v_actual THEN orden_cola_odontologo + 1
+            ELSE orden_cola_odontologo - 1
+        END
+    WHERE primer_odontologo_id = v_odontologo_id
+      AND estado IN ('programada', 'en_espera')
+      AND fecha_llegada >= p_fecha::timestamp
+      AND fecha_llegada < (p_fecha + 1)::timestamp
+      AND orden_cola_odontologo BETWEEN LEAST(v_actual, v_nuevo) AND GREATEST(v_actual, v_nuevo);
+
+    -- Cola completa (aún bloqueada): incluye movimientos de otras sesiones
+    SELECT jsonb_agg(jsonb_build_object('id', id, 'orden', orden_cola_odontologo)
+                     ORDER BY orden_cola_odontologo)
+    INTO v_cola
+    FROM public.consulta
+    WHERE primer_odontologo_id = v_odontologo_id
+      AND estado IN ('programada', 'en_espera')
+      AND fecha_llegada >= p_fecha::timestamp
+      AND fecha_llegada < (p_fecha + 1)::timestamp;
+
+    RETURN jsonb_build_object(
+        'success', TRUE,
+        'message', format('Paciente movido a posición %s', v_nuevo),
+        'orden_anterior', v_actual,
+        'orden_nuevo', v_nuevo,
+        'total_en_cola', v_total,
+        'reindexadas', v_reindexadas,
+        'cola', COALESCE(v_cola, '[]'::jsonb)
+    );
+END;
+$$;
+
+COMMENT ON FUNCTION public.mover_consulta_en_cola(uuid, integer, date) IS
+'Mueve una consulta N posiciones en la cola del día de su odontólogo (cola bloqueada, reindexada y reordenada en una transacción).';
+
+-- ============================================================================
+-- VERIFICACIÓN
+-- ============================================================================
+-- SELECT public.mover_consulta_en_cola('<consulta_uuid>', -1, CURRENT_DATE);
+-- SELECT public.reindexar_cola_odontologo('<odontologo_uuid>', CURRENT_DATE);
+
+-- Posiciones repetidas o huecos en las colas de hoy (esperado: 0 filas)
+SELECT primer_odontologo_id,
+       COUNT(*) AS en_cola,
+       COUNT(DISTINCT orden_cola_odontologo) AS posiciones_distintas,
+       MAX(orden_cola_odontologo) AS ultima_posicion
+FROM public.consulta
+WHERE estado IN ('programada', 'en_espera')
+  AND fecha_llegada >= CURRENT_DATE::timestamp
+  AND fecha_llegada < (CURRENT_DATE + 1)::timestamp
+GROUP BY primer_odontologo_id
+HAVING COUNT(*) <> COUNT(DISTINCT orden_cola_odontologo)
+    OR MAX(orden_cola_odontologo) <> COUNT(*);
@@ -0,0 +1,144 @@
+-- ============================================================================
+-- MIGRACIÓN: Snapshots de odontograma para reconstrucción en una fecha
+-- ============================================================================
+-- Fecha: 2026-10-19
+-- Problema: ver "el odontograma como estaba en la visita X" obligaba a
+--           reproducir todo el historial (activo = false) diente por diente
+-- Solución: snapshots periódicos por paciente + reproducción del delta
+--   1. Tabla odontograma_snapshot: condiciones NO sanas vigentes en fecha_corte
+--   2. Trigger por sentencia en diente: crea un snapshot en cada intervención
+--      o cada SNAPSHOT_CADA_CAMBIOS (25) cambios; si no, solo suma el contador
+--   3. OdontologiaService.get_odontograma_en_fecha(): 1 lectura de snapshot
+--      (el más reciente <= fecha) + delta de vista_historial_diente entre
+--      el snapshot y la fecha
+-- Requiere: 20261019_odontograma_disperso.sql, 20261019_archivo_historial_diente.sql
+
+-- ============================================================================
+-- PASO 1: Tabla de snapshots
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.odontograma_snapshot (
+    id uuid NOT NULL DEFAULT gen_random_uuid(),
+    paciente_id uuid NOT NULL,
+    fecha_corte timestamp with time zone NOT NULL,
+    intervencion_id uuid,
+    condiciones jsonb NOT NULL DEFAULT '[]'::jsonb,  -- [{diente_numero, superficie, tipo_condicion}]
+    cambios_posteriores integer NOT NULL DEFAULT 0,   -- cambios en diente desde este snapshot
+    creado_en timestamp with time zone NOT NULL DEFAULT clock_timestamp(),
+    CONSTRAINT odontograma_snapshot_pkey PRIMARY KEY (id),
+    CONSTRAINT odontograma_snapshot_paciente_id_fkey FOREIGN KEY (paciente_id) REFERENCES public.paciente(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_odontograma_snapshot_paciente_fecha
+ON public.odontograma_snapshot (paciente_id, fecha_corte DESC, creado_en DESC);
+
+-- Delta: cambios de un paciente entre dos fechas (tabla caliente)
+CREATE INDEX IF NOT EXISTS idx_diente_paciente_fecha
+ON public.diente (paciente_id, fecha_registro);
+
+COMMENT ON TABLE public.odontograma_snapshot IS
+'Foto del odontograma (solo superficies no sanas) por paciente; base para reconstruir el odontograma en cualquier fecha.';
+
+-- ============================================================================
+-- PASO 2: Trigger por sentencia (una ejecución por lote, no por fila)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION public.snapshot_odontograma_tras_cambios()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    c_cada_cambios CONSTANT int := 25;
+    r record;
+    v_snapshot_id uuid;
+    v_cambios int;
+BEGIN
+    FOR r IN
+        SELECT paciente_id,
+               COUNT(*) AS cambios,
+               MAX(fecha_registro) AS fecha,
+               (array_agg(intervencion_id) FILTER (WHERE intervencion_id IS NOT NULL))[1] AS intervencion_id
+        FROM nuevas
+        GROUP BY paciente_id
+    LOOP
+        v_snapshot_id := NULL;
+        v_cambios := 0;
+
+        SELECT id, cambios_posteriores INTO v_snapshot_id, v_cambios
+        FROM public.odontograma_snapshot
+        WHERE paciente_id = r.paciente_id
+        ORDER BY fecha_corte DESC, creado_en DESC
+        LIMIT 1
+        FOR UPDATE;
+
+        v_cambios := COALESCE(v_cambios, 0) + r.cambios;
+
+        IF v_snapshot_id IS NULL OR r.intervencion_id IS NOT NULL OR v_cambios >= c_cada_cambios THEN
+            INSERT INTO public.odontograma_snapshot (paciente_id, fecha_corte, intervencion_id, condiciones)
+            SELECT r.paciente_id, r.fecha, r.intervencion_id,
+                   COALESCE(jsonb_agg(jsonb_build_object(
+                       'diente_numero', d.diente_numero,
+                       'superficie', d.superficie,
+                       'tipo_condicion', d.tipo_condicion
+                   )), '[]'::jsonb)
+            FROM public.diente d
+            WHERE d.paciente_id = r.paciente_id
+              AND d.activo = TRUE;
+        ELSE
+            UPDATE public.odontograma_snapshot
+            SET cambios_posteriores = v_cambios
+            WHERE id = v_snapshot_id;
+        END IF;
+    END LOOP;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_snapshot_odontograma ON public.diente;
+
+CREATE TRIGGER trigger_snapshot_odontograma
+    AFTER INSERT ON public.diente
+    REFERENCING NEW TABLE AS nuevas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.snapshot_odontograma_tras_cambios();
+
+COMMENT ON FUNCTION public.snapshot_odontograma_tras_cambios() IS
+'Crea un snapshot de odontograma por intervención o cada 25 cambios (trigger por sentencia sobre diente).';
+
+-- ============================================================================
+-- PASO 3: Snapshot inicial de los pacientes con odontograma
+-- ============================================================================
+-- Fechas anteriores a este punto se reconstruyen reproduciendo el historial
+-- completo (sin snapshot base), igual de correcto pero más largo.
+
+INSERT INTO public.odontograma_snapshot (paciente_id, fecha_corte, condiciones)
+SELECT d.paciente_id,
+       MAX(d.fecha_registro),
+       COALESCE(jsonb_agg(jsonb_build_object(
+           'diente_numero', d.diente_numero,
+           'superficie', d.superficie,
+           'tipo_condicion', d.tipo_condicion
+       )) FILTER (WHERE d.activo), '[]'::jsonb)
+FROM public.diente d
+WHERE NOT EXISTS (
+    SELECT 1 FROM public.odontograma_snapshot s WHERE s.paciente_id = d.paciente_id
+)
+GROUP BY d.paciente_id;
+
+-- ============================================================================
+-- VERIFICACIÓN
+-- ============================================================================
+-- Snapshot base para una fecha + tamaño del delta a reproducir
+-- SELECT s.fecha_corte, jsonb_array_length(s.condiciones) AS superficies,
+--        (SELECT COUNT(*) FROM public.vista_historial_diente h
+--         WHERE h.paciente_id = s.paciente_id
+--           AND h.fecha_registro > s.fecha_corte
+--           AND h.fecha_registro <= '<fecha>') AS delta
+-- FROM public.odontograma_snapshot s
+-- WHERE s.paciente_id = '<paciente_uuid>' AND s.fecha_corte <= '<fecha>'
+-- ORDER BY s.fecha_corte DESC, s.creado_en DESC
+-- LIMIT 1;
+
+SELECT COUNT(*) AS snapshots, COUNT(DISTINCT paciente_id) AS pacientes
+FROM public.odontograma_snapshot;
@@ -0,0 +1,39 @@
+-- 💱 HISTORIAL DIARIO DE TASA DE CAMBIO BS/USD
+-- Problema: la tasa del día vivía solo en el estado de cada sesión (36.50 fijo al
+--           iniciar) y los reportes sumaban BS + USD sin convertir
+-- Solución: una fila por día en tasa_cambio; la app la cachea en memoria y los
+--           reportes convierten cada pago con la tasa vigente en su fecha
+
+-- =====================================================
+-- PASO 1: TABLA DE TASAS (UNA FILA POR DÍA)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS public.tasa_cambio (
+    fecha DATE PRIMARY KEY,
+    tasa_bs_usd NUMERIC(12,4) NOT NULL CHECK (tasa_bs_usd > 0),
+    registrado_por UUID REFERENCES public.usuario(id),
+    fecha_registro TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    fecha_actualizacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE public.tasa_cambio IS 'Tasa BS/USD registrada por día. Un día sin fila usa la última tasa anterior';
+COMMENT ON COLUMN public.tasa_cambio.tasa_bs_usd IS 'Bolívares por 1 USD';
+
+-- =====================================================
+-- PASO 2: SEMBRAR HISTORIAL DESDE LOS PAGOS EXISTENTES
+-- =====================================================
+INSERT INTO public.tasa_cambio (fecha, tasa_bs_usd)
+SELECT
+    fecha_pago::date,
+    ROUND(AVG(tasa_cambio_bs_usd), 4)
+FROM public.pago
+WHERE tasa_cambio_bs_usd > 0
+GROUP BY fecha_pago::date
+ON CONFLICT (fecha) DO NOTHING;
+
+-- =====================================================
+-- VERIFICACIÓN
+-- =====================================================
+SELECT fecha, tasa_bs_usd
+FROM public.tasa_cambio
+ORDER BY fecha DESC
+LIMIT 10;
@@ -0,0 +1,220 @@
+"""
+🦷 ODONTOGRAMA COMPACTO - 32 DIENTES × 5 SUPERFICIES
+====================================================
+
+Representación de posición fija para estado y cable:
+
+    codigos: List[int] de 160 posiciones
+    posición = indice_diente(diente) * 5 + indice_superficie(superficie)
+
+    Dientes   : 11..18, 21..28, 31..38, 41..48 (DIENTES_FDI_PERMANENTES)
+    Superficies: oclusal, mesial, distal, vestibular, lingual
+    Código    : posición en CODIGOS_CONDICION (0 = sano)
+
+Sin claves int/str mezcladas ni diccionarios anidados: un cambio de
+superficie es una posición del arreglo y el estado de un diente es
+un corte de 5 códigos.
+
+⚠️ CODIGOS_CONDICION solo puede crecer al final: los códigos viajan
+al navegador y se comparan contra fotos guardadas.
+"""
+
+from typing import Any, Dict, List, Optional
+import logging
+
+from dental_system.constants import DIENTES_FDI_PERMANENTES, TODAS_LAS_SUPERFICIES
+
+logger = logging.getLogger(__name__)
+
+
+# Orden fijo de condiciones (mismo orden que el CHECK de diente.tipo_condicion)
+CODIGOS_CONDICION = (
+    "sano", "caries", "obturacion", "corona", "puente", "implante",
+    "ausente", "extraccion_indicada", "endodoncia", "protesis",
+    "fractura", "mancha", "desgaste", "sensibilidad", "movilidad",
+    "impactado", "en_erupcion", "retenido", "supernumerario", "otro"
+)
+CODIGO_POR_CONDICION = {condicion: codigo for codigo, condicion in enumerate(CODIGOS_CONDICION)}
+CODIGO_SANO = 0
+CODIGO_OTRO = CODIGO_POR_CONDICION["otro"]
+
+ORDEN_DIENTES = tuple(DIENTES_FDI_PERMANENTES)
+ORDEN_SUPERFICIES = tuple(TODAS_LAS_SUPERFICIES)
+SUPERFICIES_POR_DIENTE = len(ORDEN_SUPERFICIES)
+TAMANO_ODONTOGRAMA = len(ORDEN_DIENTES) * SUPERFICIES_POR_DIENTE  # 160
+
+INDICE_DIENTE = {diente: i for i, diente in enumerate(ORDEN_DIENTES)}
+INDICE_SUPERFICIE = {superficie: i for i, superficie in enumerate(ORDEN_SUPERFICIES)}
+
+
+# ==========================================
+# 📍 POSICIONES
+# ==========================================
+
+def indice_diente(diente_numero: int) -> int:
+    """Posición del diente (0-31) en el orden fijo"""
+    return INDICE_DIENTE[int(diente_numero)]
+
+
+def posicion(diente_numero: int, superficie: str) -> int:
+    """Posición (0-159) de una superficie en el arreglo compacto"""
+    return indice_diente(diente_numero) * SUPERFICIES_POR_DIENTE + INDICE_SUPERFICIE[superficie]
+
+
+def diente_y_superficie(pos: int) -> tuple:
+    """Inversa de posicion(): (diente_numero, superficie)"""
+    return ORDEN_DIENTES[pos // SUPERFICIES_POR_DIENTE], ORDEN_SUPERFICIES[pos % SUPERFICIES_POR_DIENTE]
+
+
+def codigo_condicion(condicion: Optional[str]) -> int:
+    """Nombre → código (desconocidas se guardan como 'otro')"""
+    if not condicion:
+        return CODIGO_SANO
+    codigo = CODIGO_POR_CONDICION.get(condicion)
+    if codigo is None:
+        logger.warning(f"⚠️ Condición desconocida '{condicion}', se codifica como 'otro'")
+        return CODIGO_OTRO
+    return codigo
+
+
+def nombre_condicion(codigo: int) -> str:
+    """Código → nombre"""
+    return CODIGOS_CONDICION[codigo] if 0 <= codigo < len(CODIGOS_CONDICION) else "otro"
+
+
+# ==========================================
+# 🔄 CODIFICAR / DECODIFICAR
+# ==========================================
+
+def odontograma_vacio() -> List[int]:
+    """160 superficies sanas"""
+    return [CODIGO_SANO] * TAMANO_ODONTOGRAMA
+
+
+def codificar_filas(filas: List[Dict[str, Any]]) -> List[int]:
+    """
+    Filas de la tabla diente → arreglo compacto
+
+    Una fila con superficie 'completo' aplica a las 5 superficies; las filas
+    de superficie específica tienen prioridad sobre ella.
+    """
+    codigos = odontograma_vacio()
+    especificas = []
+
+    for fila in filas:
+        diente = fila.get("diente_numero")
+        if diente is None or int(diente) not in INDICE_DIENTE:
+            continue
+        superficie = fila.get("superficie")
+        codigo = codigo_condicion(fila.get("tipo_condicion"))
+
+        if superficie == "completo":
+            inicio = indice_diente(diente) * SUPERFICIES_POR_DIENTE
+            codigos[inicio:inicio + SUPERFICIES_POR_DIENTE] = [codigo] * SUPERFICIES_POR_DIENTE
+        elif superficie in INDICE_SUPERFICIE:
+            especificas.append((posicion(diente, superficie), codigo))
+
+    for pos, codigo in especificas:
+        codigos[pos] = codigo
+
+    return codigos
+
+
+def codificar_odontograma(condiciones: Dict[Any, Dict[str, Any]]) -> List[int]:
+    """
+    {diente: {superficie: condicion}} → arreglo compacto
+
+    Acepta claves int o str y valores str o {"condicion": ...}.
+    """
+    filas = []
+    for diente, superficies in (condiciones or {}).items():
+        for superficie, valor in (superficies or {}).items():
+            if isinstance(valor, dict):
+                valor = valor.get("condicion", "sano")
+            filas.append({"diente_numero": diente, "superficie": superficie, "tipo_condicion": valor})
+    return codificar_filas(filas)
+
+
+def aplicar_cambios(codigos: List[int], filas: List[Dict[str, Any]]) -> List[int]:
+    """
+    Reproducir cambios (ordenados por fecha) sobre un arreglo
+
+    Cada fila reemplaza lo que había en su superficie ('completo' = las 5);
+    una fila "sano" deja la superficie en 0. Retorna un arreglo nuevo.
+    """
+    resultado = list(codigos) if len(codigos) == TAMANO_ODONTOGRAMA else odontograma_vacio()
+    for fila in filas:
+        diente = fila.get("diente_numero")
+        if diente is None or int(diente) not in INDICE_DIENTE:
+            continue
+        superficie = fila.get("superficie")
+        codigo = codigo_condicion(fila.get("tipo_condicion"))
+
+        if superficie == "completo":
+            inicio = indice_diente(diente) * SUPERFICIES_POR_DIENTE
+            resultado[inicio:inicio + SUPERFICIES_POR_DIENTE] = [codigo] * SUPERFICIES_POR_DIENTE
+        elif superficie in INDICE_SUPERFICIE:
+            resultado[posicion(diente, superficie)] = codigo
+    return resultado
+
+
+def decodificar_odontograma(codigos: List[int]) -> Dict[int, Dict[str, str]]:
+    """Arreglo compacto → {diente: {superficie: condicion}} (los 32 dientes)"""
+    resultado = {}
+    for i, diente in enumerate(ORDEN_DIENTES):
+        inicio = i * SUPERFICIES_POR_DIENTE
+        resultado[diente] = {
+            superficie: nombre_condicion(codigos[inicio + j])
+            for j, superficie in enumerate(ORDEN_SUPERFICIES)
+        }
+    return resultado
+
+
+def codigos_diente(codigos: List[int], diente_numero: int) -> List[int]:
+    """Los 5 códigos de un diente"""
+    inicio = indice_diente(diente_numero) * SUPERFICIES_POR_DIENTE
+    return codigos[inicio:inicio + SUPERFICIES_POR_DIENTE]
+
+
+def posiciones_distintas(actual: List[int], base: List[int]) -> List[int]:
+    """Posiciones cuyo código difiere entre dos arreglos"""
+    if len(base) != TAMANO_ODONTOGRAMA:
+        base = odontograma_vacio()
+    return [pos for pos, (a, b) in enumerate(zip(actual, base)) if a != b]
+
+
+# ==========================================
+# 📊 STATUS GENERAL DEL DIENTE
+# ==========================================
+
+# De más crítico a menos crítico: (código de condición, status para la UI)
+PRIORIDAD_STATUS = (
+    (CODIGO_POR_CONDICION["ausente"], "ausente"),
+    (CODIGO_POR_CONDICION["fractura"], "fractura"),
+    (CODIGO_POR_CONDICION["caries"], "caries"),
+    (CODIGO_POR_CONDICION["endodoncia"], "endodoncia"),
+    (CODIGO_POR_CONDICION["obturacion"], "obturado"),
+    (CODIGO_POR_CONDICION["corona"], "corona"),
+    (CODIGO_POR_CONDICION["implante"], "implante"),
+)
+
+
+def status_diente(codigos_superficies: List[int]) -> str:
+    """Status general de un diente a partir de sus 5 códigos"""
+    presentes = set(codigos_superficies)
+    for codigo, status in PRIORIDAD_STATUS:
+        if codigo in presentes:
+            return status
+    return "sano"
+
+
+def datos_diente(indice: int, codigos: List[int]) -> Dict[str, Any]:
+    """Entrada del grid para el diente en `indice` (0-31)"""
+    inicio = indice * SUPERFICIES_POR_DIENTE
+    superficies = codigos[inicio:inicio + SUPERFICIES_POR_DIENTE]
+    return {
+        "number": ORDEN_DIENTES[indice],
+        "status": status_diente(superficies),
+        "has_conditions": any(superficies),  # 0 = sano
+        "conditions": [nombre_condicion(c) for c in superficies]
+    }
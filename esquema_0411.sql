@@ -120,8 +120,25 @@ CREATE TABLE public.paciente (
     fecha_registro timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
     fecha_actualizacion timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
     activo boolean DEFAULT true,
+    nombre_busqueda text GENERATED ALWAYS AS (normalizar_texto_busqueda((((((((primer_nombre) :: text || ' ' :: text) || (COALESCE(segundo_nombre, '' :: character varying)) :: text) || ' ' :: text) || (primer_apellido) :: text) || ' ' :: text) || (COALESCE(segundo_apellido, '' :: character varying)) :: text))) STORED,
     CONSTRAINT paciente_pkey PRIMARY KEY (id)
 );
+CREATE TABLE public.paciente_balance (
+    paciente_id uuid NOT NULL,
+    total_facturado_usd numeric NOT NULL DEFAULT 0,
+    total_facturado_bs numeric NOT NULL DEFAULT 0,
+    total_pagado_usd numeric NOT NULL DEFAULT 0,
+    total_pagado_bs numeric NOT NULL DEFAULT 0,
+    total_descuentos_usd numeric NOT NULL DEFAULT 0,
+    saldo_pendiente_usd numeric NOT NULL DEFAULT 0,
+    saldo_pendiente_bs numeric NOT NULL DEFAULT 0,
+    pagos_completados integer NOT NULL DEFAULT 0,
+    pagos_pendientes integer NOT NULL DEFAULT 0,
+    pagos_anulados integer NOT NULL DEFAULT 0,
+    fecha_actualizacion timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT paciente_balance_pkey PRIMARY KEY (paciente_id),
+    CONSTRAINT paciente_balance_paciente_id_fkey FOREIGN KEY (paciente_id) REFERENCES public.paciente(id)
+);
 CREATE TABLE public.pago (
     id uuid NOT NULL DEFAULT uuid_generate_v4(),
     numero_recibo character varying NOT NULL UNIQUE,
@@ -219,6 +236,15 @@ CREATE TABLE public.servicio (
     ),
     CONSTRAINT servicio_pkey PRIMARY KEY (id)
 );
+CREATE TABLE public.tasa_cambio (
+    fecha date NOT NULL,
+    tasa_bs_usd numeric NOT NULL CHECK (tasa_bs_usd > 0 :: numeric),
+    registrado_por uuid,
+    fecha_registro timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
+    fecha_actualizacion timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT tasa_cambio_pkey PRIMARY KEY (fecha),
+    CONSTRAINT tasa_cambio_registrado_por_fkey FOREIGN KEY (registrado_por) REFERENCES public.usuario(id)
+);
 CREATE TABLE public.usuario (
     id uuid NOT NULL DEFAULT uuid_generate_v4(),
     email character varying NOT NULL UNIQUE CHECK (